@@ -0,0 +1,3 @@
+from quartr import create_app
+
+app = create_app()
@@ -0,0 +1,49 @@
+from typing import List
+
+from mongo_db import mongo_query_from_filter
+from paranuara.async_db import AsyncParanuaraDB
+from paranuara.company import Company, company_from_json
+from paranuara.db import CompanyNotFound, PersonNotFound
+from paranuara.person import Person, person_from_json
+from paranuara.person_filter import PersonFilter
+
+
+class AsyncMongoDB(AsyncParanuaraDB):
+    """
+        `MongoDB` over a motor database, the event loop serves other requests
+        while a lookup waits on mongo.
+    """
+
+    supports_fetch_people_by_ids_where = True
+
+    def __init__(self, db) -> None:
+        self.db = db
+
+    async def fetch_company_by_id(self, company_id: int) -> Company:
+        result = await self.db.company.find_one({"index": company_id})
+        if result is None:
+            raise CompanyNotFound
+        return company_from_json(result)
+
+    async def fetch_people_by_company_id(self, company_id: int) -> List[Person]:
+        return await self._find_people({"company_id": company_id})
+
+    async def fetch_person_by_id(self, person_id: int) -> Person:
+        result = await self.db.person.find_one({"index": person_id})
+        if result is None:
+            raise PersonNotFound
+        return person_from_json(result)
+
+    async def fetch_people_by_ids(self, person_ids: List[int]) -> List[Person]:
+        return await self._find_people({"index": {"$in": person_ids}})
+
+    async def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        query = mongo_query_from_filter(person_filter)
+        query["index"] = {"$in": person_ids}
+        return await self._find_people(query)
+
+    async def _find_people(self, query) -> List[Person]:
+        results = await self.db.person.find(query).to_list(length=None)
+        return [person_from_json(result) for result in results]
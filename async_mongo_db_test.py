@@ -0,0 +1,77 @@
+import asyncio
+from unittest import TestCase, skipIf
+
+from paranuara.company import Company
+from paranuara.query_test import generate_person
+
+try:
+    import mongomock
+
+    from async_mongo_db import AsyncMongoDB
+    from mongo_db import load_mongo
+    from paranuara.async_query import AsyncParanuaraQuery
+    from paranuara.db import CompanyNotFound, PersonNotFound
+except ImportError:
+    mongomock = None
+
+
+class FakeAsyncCursor:
+    def __init__(self, cursor) -> None:
+        self.cursor = cursor
+
+    async def to_list(self, length):
+        return list(self.cursor)[:length]
+
+
+class FakeAsyncCollection:
+    """
+        The subset of a motor collection used by `AsyncMongoDB`, over mongomock
+    """
+
+    def __init__(self, collection) -> None:
+        self.collection = collection
+
+    async def find_one(self, query):
+        await asyncio.sleep(0)
+        return self.collection.find_one(query)
+
+    def find(self, query):
+        return FakeAsyncCursor(self.collection.find(query))
+
+
+class FakeAsyncDatabase:
+    def __init__(self, db) -> None:
+        self.db = db
+
+    def __getattr__(self, name):
+        return FakeAsyncCollection(getattr(self.db, name))
+
+
+@skipIf(mongomock is None, "mongomock is not installed")
+class AsyncMongoDBTest(TestCase):
+    def setUp(self):
+        people = [
+            generate_person(1, friends=[3, 4])._replace(mongo_id="1", company_id=1),
+            generate_person(2, friends=[3, 4])._replace(mongo_id="2"),
+            generate_person(3, eye_color="brown")._replace(mongo_id="3"),
+            generate_person(4, eye_color="brown", has_died=True)._replace(mongo_id="4"),
+        ]
+        db = mongomock.MongoClient().db
+        load_mongo(db, [Company(id=1, name="one")], people, fingerprint="abc")
+        self.db = AsyncMongoDB(FakeAsyncDatabase(db))
+        self.query = AsyncParanuaraQuery(self.db)
+
+    def test_company_employees(self):
+        people = asyncio.run(self.query.query_company_employees(1))
+
+        self.assertEqual([person.id for person in people], [1])
+        with self.assertRaises(CompanyNotFound):
+            asyncio.run(self.query.query_company_employees(2))
+
+    def test_join_friends(self):
+        result = asyncio.run(self.query.query_join_friends(1, 2))
+
+        self.assertEqual((result.person1.id, result.person2.id), (1, 2))
+        self.assertEqual([friend.id for friend in result.friends_in_common], [3])
+        with self.assertRaises(PersonNotFound):
+            asyncio.run(self.query.query_join_friends(1, 9))
@@ -0,0 +1,199 @@
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from array import array
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional, Tuple
+
+from cli_util import add_companies_arg, add_people_arg
+from paranuara.json_stream import iter_json_array
+from paranuara.latency import latency_summary
+from paranuara.snapshot import source_checksum
+
+BACKENDS = ("inmemory", "columnar", "mongo", "sqlite", "sharded")
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def ids_from_json(path: str) -> array:
+    with open(path) as fp:
+        return array("i", (value["index"] for value in iter_json_array(fp)))
+
+
+def run_backend(
+    db: str,
+    companies_file: str,
+    people_file: str,
+    requests: int,
+    seed: int,
+    mongo_uri: Optional[str],
+    snapshot_file: Optional[str],
+    sqlite_file: str,
+    shard_addresses: List[Tuple[str, int]],
+    shard_authkey: Optional[str],
+) -> Dict[str, Any]:
+    """
+        Loads the dataset into `db` and times `requests` requests per endpoint.
+        Run in a fresh process so the peak RSS only covers this backend, the
+        shards of the sharded backend run in their own processes.
+    """
+    from flaskr import create_app
+
+    started = time.perf_counter()
+    app = create_app(
+        {
+            "COMPANIES_FILE": companies_file,
+            "PEOPLE_FILE": people_file,
+            "SNAPSHOT_FILE": snapshot_file,
+            "DB": db,
+            "MONGO_URI": mongo_uri,
+            "SQLITE_FILE": sqlite_file,
+            "SHARD_ADDRESSES": shard_addresses,
+            "SHARD_AUTHKEY": shard_authkey,
+        }
+    )
+    load_seconds = time.perf_counter() - started
+
+    client = app.test_client()
+    rng = random.Random(seed)
+    company_ids = ids_from_json(companies_file)
+    person_ids = ids_from_json(people_file)
+    endpoints = {
+        "company_employees": lambda: "/company/{}/employees".format(
+            rng.choice(company_ids)
+        ),
+        "person": lambda: "/person/{}".format(rng.choice(person_ids)),
+        "friends_join": lambda: "/person/{}/friends_join/{}".format(
+            rng.choice(person_ids), rng.choice(person_ids)
+        ),
+    }
+    latencies = {}
+    for name, url in endpoints.items():
+        samples = []
+        for _ in range(requests):
+            path = url()
+            request_started = time.perf_counter()
+            response = client.get(path)
+            response.get_data()
+            samples.append(time.perf_counter() - request_started)
+            assert response.status_code == 200, path
+        latencies[name] = latency_summary(samples)
+
+    return {
+        "load_seconds": load_seconds,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "endpoints": latencies,
+    }
+
+
+def main():
+    parser = ArgumentParser(
+        description="Time loading and serving a dataset with each database backend"
+    )
+    add_companies_arg(parser)
+    add_people_arg(parser)
+    parser.add_argument(
+        "--db",
+        choices=BACKENDS,
+        action="append",
+        help="backend to benchmark, repeat for several, defaults to the in-memory ones",
+    )
+    parser.add_argument(
+        "--requests", metavar="n", type=int, default=200, help="requests per endpoint"
+    )
+    parser.add_argument("--seed", metavar="n", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--mongo-uri",
+        metavar="uri",
+        default="mongodb://localhost:27017/paranuara_benchmark",
+        help="mongo connection string for the mongo backend",
+    )
+    parser.add_argument(
+        "--sqlite-file",
+        metavar="file",
+        default=os.path.join(tempfile.gettempdir(), "paranuara_benchmark.sqlite"),
+        help="sqlite file written by the sqlite backend",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="host:port",
+        action="append",
+        default=[],
+        help="address of a run_shard.py serving the same files, in shard order, "
+        "repeat for every shard of the sharded backend",
+    )
+    parser.add_argument(
+        "--shard-authkey",
+        metavar="key",
+        default=os.environ.get("PARANUARA_SHARD_AUTHKEY"),
+        help="run_shard.py --authkey of the shards, "
+        "defaults to $PARANUARA_SHARD_AUTHKEY",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="file",
+        help="snapshot to load from, see compile_snapshot.py",
+    )
+    parser.add_argument(
+        "--output", metavar="file", required=True, help="results json filename"
+    )
+    args = parser.parse_args()
+    args.companies.close()
+    args.people.close()
+    shard_addresses = []
+    for address in args.shard:
+        host, port = address.rsplit(":", 1)
+        shard_addresses.append((host, int(port)))
+
+    results: Dict[str, Any] = {
+        "dataset": {
+            "companies_file": args.companies.name,
+            "people_file": args.people.name,
+            "checksum": source_checksum([args.companies.name, args.people.name]),
+        },
+        "requests": args.requests,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "backends": {},
+    }
+    for db in args.db or ["inmemory", "columnar"]:
+        with get_context("spawn").Pool(1) as pool:
+            results["backends"][db] = pool.apply(
+                run_backend,
+                (
+                    db,
+                    args.companies.name,
+                    args.people.name,
+                    args.requests,
+                    args.seed,
+                    args.mongo_uri,
+                    args.snapshot,
+                    args.sqlite_file,
+                    shard_addresses,
+                    args.shard_authkey,
+                ),
+            )
+        print(
+            "{}: loaded in {:.2f}s, peak rss {} MB".format(
+                db,
+                results["backends"][db]["load_seconds"],
+                results["backends"][db]["peak_rss_bytes"] // (1024 * 1024),
+            )
+        )
+
+    with open(args.output, "w") as fp:
+        json.dump(results, fp, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
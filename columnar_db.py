@@ -0,0 +1,188 @@
+from bisect import bisect_right
+from itertools import islice
+from threading import Lock
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from paranuara.columnar import (
+    NO_COMPANY,
+    PeopleColumns,
+    PeopleColumnsBuilder,
+    friend_graph_from_columns,
+)
+from paranuara.company import Company
+from paranuara.company_stats import CompanyStats, company_stats_from_columns
+from paranuara.db import CompanyNotFound, ParanuaraDB, PersonNotFound
+from paranuara.friend_graph import FriendGraph
+from paranuara.graph import GraphAnalytics
+from paranuara.person import Person
+from paranuara.person_filter import PersonFilter
+
+
+class ColumnarDB(ParanuaraDB):
+    """
+        Keeps people in typed arrays (see `paranuara.columnar`) and only
+        materialises `Person` objects for the rows a request returns. Company
+        stats are counted on the first request for them, so workers mapping a
+        shared snapshot do not each count them on start up.
+    """
+
+    supports_fetch_common_friend_ids = True
+    supports_fetch_person_pair = True
+    supports_fetch_people_by_ids_where = True
+    supports_iter_people_by_company_id = True
+    supports_iter_people_where = True
+    supports_fetch_company_stats = True
+    supports_build_graph_analytics = True
+    supports_fetch_companies = True
+
+    def __init__(
+        self,
+        companies: Iterable[Company],
+        people: PeopleColumns,
+        friend_graph: Optional[FriendGraph] = None,
+    ) -> None:
+        self.companies = {company.id: company for company in companies}
+        self.people = people
+        self.friend_graph = friend_graph or friend_graph_from_columns(people)
+        self.company_stats: Optional[Dict[int, CompanyStats]] = None
+        self.company_stats_lock = Lock()
+
+    @classmethod
+    def from_people(
+        cls, companies: Iterable[Company], people: Iterable[Person]
+    ) -> "ColumnarDB":
+        return cls(companies, PeopleColumnsBuilder().add_all(people).build())
+
+    def fetch_company_by_id(self, company_id: int) -> Company:
+        try:
+            return self.companies[company_id]
+        except KeyError:
+            raise CompanyNotFound
+
+    def fetch_companies(self) -> List[Company]:
+        return [self.companies[company_id] for company_id in sorted(self.companies)]
+
+    def fetch_people_by_company_id(self, company_id: int) -> List[Person]:
+        return [
+            self.people.person(row) for row in self.people.rows_of_company(company_id)
+        ]
+
+    def iter_people_by_company_id(
+        self,
+        company_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        if after_id is None:
+            rows = self.people.rows_of_company(company_id)
+        else:
+            rows = self.people.rows_of_company_after(company_id, after_id)
+        return (self.people.person(row) for row in islice(rows, limit))
+
+    def fetch_person_by_id(self, person_id: int) -> Person:
+        row = self.people.row_of_id(person_id)
+        if row is None:
+            raise PersonNotFound
+        return self.people.person(row)
+
+    def fetch_people_by_ids(self, person_ids: List[int]) -> List[Person]:
+        rows = [self.people.row_of_id(person_id) for person_id in person_ids]
+        return [self.people.person(row) for row in rows if row is not None]
+
+    def fetch_person_pair(
+        self, person1_id: int, person2_id: int
+    ) -> Tuple[Person, Person]:
+        return self.fetch_person_by_id(person1_id), self.fetch_person_by_id(person2_id)
+
+    def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        # Evaluated on the encoded columns, rejected rows are never materialised
+        matches = self.row_matcher(person_filter)
+        rows = [self.people.row_of_id(person_id) for person_id in person_ids]
+        return [
+            self.people.person(row) for row in rows if row is not None and matches(row)
+        ]
+
+    def iter_people_where(
+        self,
+        person_filter: PersonFilter,
+        company_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        people = self.people
+        rows: Sequence[int]
+        if company_id is not None:
+            if after_id is None:
+                rows = people.rows_of_company(company_id)
+            else:
+                rows = people.rows_of_company_after(company_id, after_id)
+        else:
+            start = 0 if after_id is None else bisect_right(people.sorted_ids, after_id)
+            rows = people.sorted_rows[start:]
+        matches = self.row_matcher(person_filter)
+        return (people.person(row) for row in islice(filter(matches, rows), limit))
+
+    def row_matcher(self, person_filter: PersonFilter) -> Callable[[int], bool]:
+        """
+            Tests a row against `person_filter` on the encoded columns, values
+            the dataset does not hold are looked up once and match no row
+        """
+        people = self.people
+        checks: List[Callable[[int], bool]] = []
+        if person_filter.eye_color is not None:
+            eye_color = people.eye_colors.codes.get(person_filter.eye_color, -1)
+            checks.append(lambda row: people.eye_color[row] == eye_color)
+        if person_filter.has_died is not None:
+            has_died = person_filter.has_died
+            checks.append(lambda row: bool(people.has_died[row]) == has_died)
+        if person_filter.gender is not None:
+            gender = people.genders.codes.get(person_filter.gender, -1)
+            checks.append(lambda row: people.gender[row] == gender)
+        if person_filter.min_age is not None:
+            min_age = person_filter.min_age
+            checks.append(lambda row: people.age[row] >= min_age)
+        if person_filter.max_age is not None:
+            max_age = person_filter.max_age
+            checks.append(lambda row: people.age[row] <= max_age)
+        if person_filter.tags:
+            tags = {people.tag_values.codes.get(tag, -1) for tag in person_filter.tags}
+            checks.append(
+                lambda row: tags.issubset(
+                    people.tags[people.tag_offsets[row] : people.tag_offsets[row + 1]]
+                )
+            )
+        if person_filter.favourite_food:
+            foods = {
+                people.food_values.codes.get(food, -1)
+                for food in person_filter.favourite_food
+            }
+            checks.append(
+                lambda row: foods.issubset(
+                    people.foods[
+                        people.food_offsets[row] : people.food_offsets[row + 1]
+                    ]
+                )
+            )
+        return lambda row: all(check(row) for check in checks)
+
+    def fetch_common_friend_ids(self, person1_id: int, person2_id: int) -> List[int]:
+        return self.friend_graph.common_join_friend_ids(person1_id, person2_id)
+
+    def fetch_company_stats(self) -> Dict[int, CompanyStats]:
+        with self.company_stats_lock:
+            if self.company_stats is None:
+                self.company_stats = company_stats_from_columns(self.people)
+        return self.company_stats
+
+    def build_graph_analytics(self) -> GraphAnalytics:
+        def company_of(person_id: int) -> Optional[int]:
+            row = self.people.row_of_id(person_id)
+            # Friends can name people missing from the dataset
+            if row is None:
+                return None
+            company_id = self.people.company_id[row]
+            return None if company_id == NO_COMPANY else company_id
+
+        return GraphAnalytics(self.friend_graph, company_of)
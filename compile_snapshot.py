@@ -0,0 +1,24 @@
+from argparse import ArgumentParser
+
+from cli_util import add_companies_arg, add_people_arg
+from paranuara.snapshot import compile_snapshot
+
+
+def main():
+    parser = ArgumentParser(
+        description="Compile companies.json and people.json into a binary snapshot"
+    )
+    add_companies_arg(parser)
+    add_people_arg(parser)
+    parser.add_argument(
+        "--output", metavar="file", required=True, help="snapshot filename"
+    )
+    args = parser.parse_args()
+    args.companies.close()
+    args.people.close()
+    people = compile_snapshot(args.companies.name, args.people.name, args.output)
+    print("Wrote {} people to {}".format(people, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,95 @@
+import os
+from typing import Dict, Optional
+
+
 class BaseConfig:
     COMPANIES_FILE = "resources/companies.json"
     PEOPLE_FILE = "resources/people.json"
+    # Built by compile_snapshot.py, ignored when missing or out of date. Unset
+    # by default, as the json is then hashed on start up to check it, and
+    # mostly worth setting with the columnar backend, see DevConfig
+    SNAPSHOT_FILE: Optional[str] = None
+    # Compile a missing or stale SNAPSHOT_FILE while loading the columnar
+    # backend, so prefork workers all map one copy of the dataset
+    SNAPSHOT_COMPILE_ON_LOAD = False
     DB = "inmemory"
+    # Upper bound on the pre-serialised person json kept in memory, 0 disables
+    PERSON_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    # People whose username and fruit/vegetable split are kept, the most
+    # recently requested ones, 0 derives them on every request
+    PERSON_SUMMARY_MAX_ENTRIES = 100000
+    # gzip, or brotli when installed, responses the client accepts compressed
+    # when they are at least COMPRESSION_MIN_BYTES long
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_BYTES = 1024
+    # Upper bound on the compressed response bodies kept in memory, 0 disables
+    COMPRESSED_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    # Largest page of /company/<id>/employees?limit=
+    EMPLOYEES_PAGE_SIZE_MAX = 1000
+    # Largest page of GET /people, the filtered listing of everyone
+    PEOPLE_PAGE_SIZE_MAX = 1000
+    # Most ids, or id pairs, accepted by one POST /people or /friends_join
+    BATCH_MAX_ITEMS = 1000
+    # Entries kept per query type by the query result cache, one of
+    # "companies", "people", "people_where", "employees" and
+    # "common_friend_ids". Types left out are not cached and the cache is off
+    # when every type is left out
+    QUERY_CACHE_MAX_ENTRIES: Dict[str, int] = {}
+    # Seconds a cached query result is served for, None keeps it until evicted
+    QUERY_CACHE_TTL = 300
+    # Time every database call for /metrics, cheap enough to leave on
+    METRICS_ENABLED = True
+    # Seconds between checks for changed COMPANIES_FILE/PEOPLE_FILE contents,
+    # changed files are loaded in the background and swapped in. 0 disables
+    DATASET_RELOAD_INTERVAL = 0
+    # "full" rebuilds the backend on reload, "diff" only applies the people
+    # that were added, changed or removed when the backend supports it
+    DATASET_RELOAD_MODE = "full"
+    # Mongo and sqlite are shared, so the workers take turns on this file and
+    # the first applies the changes while the others only count the company
+    # stats again
+    DATASET_RELOAD_LOCK_FILE = "resources/paranuara.reload.lock"
+    # Serve the friend network analytics, when the backend has a friend graph.
+    # Each worker builds its own on the first request for them, about 20
+    # seconds and a few hundred MB at a million people
+    GRAPH_ANALYTICS_ENABLED = False
+    # Most hops /person/<id>/network searches and most people it returns
+    GRAPH_MAX_DEPTH = 3
+    GRAPH_MAX_RESULTS = 10000
+    # Build the /search index of names, company names, emails, tags and
+    # addresses with every dataset, not served by the sharded backend. Each
+    # worker builds its own from every person the backend holds, which takes
+    # memory a shared snapshot otherwise saves
+    SEARCH_ENABLED = False
+    # Most people one /search returns
+    SEARCH_MAX_RESULTS = 100
+
 
 class DevConfig(BaseConfig):
     DEVELOPMENT = True
+    # DB = "columnar"
+    # SNAPSHOT_FILE = "resources/paranuara.snapshot"
     # DB = "mongo"
     MONGO_URI = "mongodb://localhost:27017/paranuara"
-
+    # Set to False when load_mongo.py seeds the database ahead of deploys
+    MONGO_LOAD_ON_START = True
+    MONGO_BATCH_SIZE = 1000
+    # DB = "sqlite"
+    # Written from the json files on start up unless it already holds them,
+    # or ahead of deploys by load_sqlite.py
+    SQLITE_FILE = "resources/paranuara.sqlite"
+    SQLITE_LOAD_ON_START = True
+    SQLITE_BATCH_SIZE = 1000
+    # DB = "sharded"
+    # (host, port) of every shard started by run_shard.py, in shard order
+    SHARD_ADDRESSES = [("localhost", 6001), ("localhost", 6002)]
+    # Shared secret of the shards, run_shard.py --authkey. Shards unpickle
+    # what they are sent, so it has no default and starting fails without it
+    SHARD_AUTHKEY = os.environ.get("PARANUARA_SHARD_AUTHKEY")
+    # QUERY_CACHE_MAX_ENTRIES = {
+    #     "companies": 1000,
+    #     "people": 100000,
+    #     "people_where": 10000,
+    #     "employees": 1000,
+    #     "common_friend_ids": 100000,
+    # }
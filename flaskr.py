@@ -1,64 +1,570 @@
+import fcntl
+import hashlib
 import json
 import os
-from typing import Any, Dict, List
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from itertools import islice
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
 
 from flanker.addresslib import address
-from flask import Flask, abort, jsonify
+from flask import Flask, Response, abort, g, jsonify, request, url_for
 from flask_pymongo import PyMongo
+from werkzeug.http import is_resource_modified
 
+from columnar_db import ColumnarDB
 from in_memory_db import InMemoryDB
-from mongo_db import MongoDB
+from mongo_db import DEFAULT_BATCH_SIZE, MongoDB, load_mongo, record_fingerprint
+from paranuara.cache import FragmentCache
+from paranuara.caching_db import CachingDB
 from paranuara.company import Company, company_from_json
-from paranuara.db import CompanyNotFound, PersonNotFound
-from paranuara.person import (
-    Person,
-    fruits_from_foods,
-    json_from_person,
-    person_from_json,
-    vegetables_from_foods,
+from paranuara.company_stats import json_from_company_stats
+from paranuara.db import CompanyNotFound, ParanuaraDB, PersonNotFound
+from paranuara.graph import GraphAnalytics
+from paranuara.instrumented_db import InstrumentedDB
+from paranuara.json_stream import iter_json_array
+from paranuara.metrics import CONTENT_TYPE, SIZE_BUCKETS, MetricsRegistry
+from paranuara.person import Person, json_bytes_from_person, person_from_json
+from paranuara.person_filter import PersonFilter
+from paranuara.person_summary import (
+    DEFAULT_MAX_ENTRIES as PERSON_SUMMARY_MAX_ENTRIES,
+    PersonSummaries,
+    PersonSummary,
 )
 from paranuara.query import JoinPeopleResponse, ParanuaraQuery
+from paranuara.reloader import Reloadable
+from paranuara.search_index import SearchIndex, SearchIndexBuilder
+from paranuara.snapshot import dataset_checksum, ensure_snapshot, load_snapshot
+from paranuara.shard import ShardMisconfigured
+from sharded_db import ShardedDB, connect_shards
+from sqlite_db import DEFAULT_BATCH_SIZE as SQLITE_BATCH_SIZE, SQLiteDB, load_sqlite
 
+try:
+    import brotli
+except ImportError:
+    # Optional, responses are only gzipped without it
+    brotli = None
 
-def json_from_join_people_response(
-    join_people_response: JoinPeopleResponse
-) -> Dict[str, Any]:
-    return {
-        "person1": json_from_person(join_people_response.person1),
-        "person2": json_from_person(join_people_response.person2),
-        "friends_in_common": [
-            json_from_person(person)
-            for person in join_people_response.friends_in_common
-        ],
-    }
+# People serialised per chunk written to a streamed response
+STREAM_CHUNK_SIZE = 100
+
+# GET endpoints whose response only depends on the dataset and the url. They
+# get an ETag and Last-Modified, are answered 304 when the client has them and
+# have their compressed bodies cached
+DATASET_ENDPOINTS = frozenset(
+    [
+        "company_employees",
+        "person",
+        "friends_join",
+        "people_where",
+        "company_stats",
+        "all_company_stats",
+        "person_network",
+        "suggested_friends",
+        "company_friend_stats",
+        "friend_stats",
+        "search",
+    ]
+)
+
+# zlib level of gzipped responses and quality of brotli ones, middling as most
+# bodies are compressed once per dataset and then served from the cache
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Taken by the workers reloading a mongo or sqlite dataset, which one of them
+# applies for all
+DATASET_RELOAD_LOCK_FILE = "resources/paranuara.reload.lock"
+
+# Headers set by the endpoints that are cached with a compressed body, the
+# others are added again by `add_validators`
+CACHED_HEADERS = ("Link",)
+
+
+def cache_entry(response: Response, body: bytes) -> bytes:
+    """
+        The `CACHED_HEADERS` of `response`, one per line and empty when
+        missing, then `body`. Header values never hold a newline.
+    """
+    values = [
+        response.headers.get(name, "").encode("latin-1") for name in CACHED_HEADERS
+    ]
+    return b"\n".join(values + [body])
+
+
+def response_from_cache_entry(entry: bytes, encoding: str) -> Response:
+    *values, body = entry.split(b"\n", len(CACHED_HEADERS))
+    response = Response(body, mimetype="application/json")
+    for name, value in zip(CACHED_HEADERS, values):
+        if value:
+            response.headers[name] = value.decode("latin-1")
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def json_bytes_from_people(
+    people: Iterable[Person], person_json: Callable[[Person], bytes]
+) -> bytes:
+    return b"[" + b",".join(person_json(person) for person in people) + b"]"
+
+
+def json_bytes_from_join_people_response(
+    join_people_response: JoinPeopleResponse, person_json: Callable[[Person], bytes]
+) -> bytes:
+    # Spliced in the key order jsonify sorts them into
+    return (
+        b'{"friends_in_common":'
+        + json_bytes_from_people(join_people_response.friends_in_common, person_json)
+        + b',"person1":'
+        + person_json(join_people_response.person1)
+        + b',"person2":'
+        + person_json(join_people_response.person2)
+        + b"}"
+    )
+
+
+def json_response(body: bytes) -> Response:
+    return Response(body + b"\n", mimetype="application/json")
+
+
+def dataset_etag(version: str, path: str, query_string: bytes) -> str:
+    resource = hashlib.blake2b(path.encode() + b"?" + query_string, digest_size=8)
+    return "{}-{}".format(version[:16], resource.hexdigest())
+
+
+def dataset_last_modified(paths: List[str]) -> datetime:
+    return datetime.fromtimestamp(
+        int(max(os.path.getmtime(path) for path in paths)), timezone.utc
+    )
+
+
+def accepted_encoding() -> Optional[str]:
+    return request.accept_encodings.best_match(
+        ["gzip"] if brotli is None else ["br", "gzip"]
+    )
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # A gzip header with no mtime, so a body always compresses the same way
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+def username_from_email(email: str) -> Optional[str]:
+    parsed = address.parse(email)
+    if parsed:
+        return parsed.mailbox
+    return None
 
 
-def person_to_simple_json(person: Person) -> Dict[str, Any]:
-    email = address.parse(person.email)
-    username = None
-    if email:
-        username = email.mailbox
+def person_to_simple_json(person: Person, summary: PersonSummary) -> Dict[str, Any]:
     return {
-        "username": username,
+        "username": summary.username,
         "age": str(person.age),
-        "fruits": fruits_from_foods(person.favourite_food),
-        "vegetables": vegetables_from_foods(person.favourite_food),
+        "fruits": summary.fruits,
+        "vegetables": summary.vegetables,
     }
 
 
+def stream_json_array(
+    people: Iterable[Person], person_json: Callable[[Person], bytes]
+) -> Iterator[bytes]:
+    yield b"["
+    separator = b""
+    for chunk in chunks(people, STREAM_CHUNK_SIZE):
+        yield separator + b",".join(person_json(person) for person in chunk)
+        separator = b","
+    yield b"]\n"
+
+
+def stream_ndjson(
+    people: Iterable[Person], person_json: Callable[[Person], bytes]
+) -> Iterator[bytes]:
+    for chunk in chunks(people, STREAM_CHUNK_SIZE):
+        yield b"".join(person_json(person) + b"\n" for person in chunk)
+
+
+def chunks(people: Iterable[Person], size: int) -> Iterator[List[Person]]:
+    iterator = iter(people)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def int_arg(name: str) -> Optional[int]:
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return abort(400)
+
+
+def person_filter_arg() -> Optional[PersonFilter]:
+    """
+        The filter given by the eye_color, has_died, gender, min_age, max_age,
+        tag and favourite_food query string arguments, the last two repeat and
+        must all match. None when no filter is given.
+    """
+    has_died = request.args.get("has_died")
+    if has_died not in (None, "true", "false"):
+        return abort(400)
+    person_filter = PersonFilter(
+        eye_color=request.args.get("eye_color"),
+        has_died=None if has_died is None else has_died == "true",
+        gender=request.args.get("gender"),
+        min_age=int_arg("min_age"),
+        max_age=int_arg("max_age"),
+        tags=tuple(request.args.getlist("tag")),
+        favourite_food=tuple(request.args.getlist("favourite_food")),
+    )
+    return None if person_filter == PersonFilter() else person_filter
+
+
+def next_page_link(endpoint: str, after_id: int, limit: int, **values: Any) -> str:
+    """
+        Link header to the page after `after_id`, keeping the other query
+        string arguments of the request
+    """
+    args = request.args.to_dict(flat=False)
+    args.update(after=after_id, limit=limit)
+    return '<{}>; rel="next"'.format(url_for(endpoint, **values, **args))
+
+
+def is_person_id(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_person_id_pair(value: Any) -> bool:
+    return isinstance(value, list) and len(value) == 2 and all(map(is_person_id, value))
+
+
+def batch_arg(name: str, is_item: Callable[[Any], bool], max_items: int) -> List[Any]:
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return abort(400)
+    items = body.get(name)
+    if (
+        not isinstance(items, list)
+        or len(items) > max_items
+        or not all(map(is_item, items))
+    ):
+        return abort(400)
+    return items
+
+
+def compact_json_bytes(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
 class DBNotConfigured(Exception):
     pass
 
 
-def init_db(companies: List[Company], people: List[Person], app):
+def init_db(companies: Iterable[Company], people: Iterable[Person], checksum: str, app):
     if app.config["DB"] == "inmemory":
         return InMemoryDB(companies, people)
+    elif app.config["DB"] == "columnar":
+        return ColumnarDB.from_people(companies, people)
     elif app.config["DB"] == "mongo":
         assert app.config["MONGO_URI"]
-        return MongoDB(companies, people, PyMongo(app))
+        mongo = PyMongo(app)
+        if app.config.get("MONGO_LOAD_ON_START", True):
+            load_mongo(
+                mongo.db,
+                companies,
+                people,
+                fingerprint=checksum,
+                batch_size=app.config.get("MONGO_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+            )
+        return MongoDB(mongo)
+    elif app.config["DB"] == "sqlite":
+        if app.config.get("SQLITE_LOAD_ON_START", True):
+            load_sqlite(
+                app.config["SQLITE_FILE"],
+                companies,
+                people,
+                fingerprint=checksum,
+                batch_size=app.config.get("SQLITE_BATCH_SIZE", SQLITE_BATCH_SIZE),
+            )
+        return SQLiteDB(app.config["SQLITE_FILE"])
+    elif app.config["DB"] == "sharded":
+        # Shards unpickle what they are sent, so there is no default key
+        authkey = app.config.get("SHARD_AUTHKEY")
+        if not authkey:
+            raise ShardMisconfigured("SHARD_AUTHKEY is not set")
+        if isinstance(authkey, str):
+            authkey = authkey.encode("utf-8")
+        # The shard processes load their own slice of the dataset
+        return connect_shards(
+            [(host, int(port)) for host, port in app.config["SHARD_ADDRESSES"]], authkey
+        )
     raise DBNotConfigured()
 
 
+def ingest_companies(
+    companies: Iterable[Company], search_builder: Optional[SearchIndexBuilder]
+) -> Iterable[Company]:
+    if search_builder is None:
+        return companies
+    return search_builder.add_companies(companies)
+
+
+def ingest_people(
+    people: Iterable[Person],
+    person_summaries: PersonSummaries,
+    search_builder: Optional[SearchIndexBuilder],
+) -> Iterable[Person]:
+    people = person_summaries.add_all(people)
+    if search_builder is None:
+        return people
+    return search_builder.add_people(people)
+
+
+def load_db(
+    app,
+    person_summaries: PersonSummaries,
+    checksum: str,
+    search_builder: Optional[SearchIndexBuilder] = None,
+):
+    companies_file_name = app.config["COMPANIES_FILE"]
+    people_file_name = app.config["PEOPLE_FILE"]
+
+    snapshot_file_name = app.config.get("SNAPSHOT_FILE")
+    if snapshot_file_name:
+        if app.config["DB"] == "columnar" and app.config.get(
+            "SNAPSHOT_COMPILE_ON_LOAD", False
+        ):
+            # Every worker then maps the same file instead of building its
+            # own copy of the columns
+            ensure_snapshot(
+                companies_file_name, people_file_name, snapshot_file_name, checksum
+            )
+        snapshot = load_snapshot(snapshot_file_name, checksum)
+        if snapshot is None:
+            app.logger.warning(
+                "Snapshot %s is missing or stale, loading json", snapshot_file_name
+            )
+        elif app.config["DB"] == "columnar":
+            return ColumnarDB(
+                snapshot.companies, snapshot.people, snapshot.friend_graph
+            )
+        else:
+            return init_db(
+                ingest_companies(snapshot.companies, search_builder),
+                ingest_people(
+                    snapshot.people.iter_people(), person_summaries, search_builder
+                ),
+                checksum,
+                app,
+            )
+
+    # Stream both files straight into the backend, the parsed json is never
+    # held in memory as a whole
+    with open(companies_file_name) as companies_file, open(
+        people_file_name
+    ) as people_file:
+        companies = (
+            company_from_json(company_dict)
+            for company_dict in iter_json_array(companies_file)
+        )
+        people = (
+            person_from_json(person_dict)
+            for person_dict in iter_json_array(people_file)
+        )
+        return init_db(
+            ingest_companies(companies, search_builder),
+            ingest_people(people, person_summaries, search_builder),
+            checksum,
+            app,
+        )
+
+
+def apply_json_changes(
+    app,
+    db: ParanuaraDB,
+    person_summaries: PersonSummaries,
+    checksum: str,
+    search_builder: Optional[SearchIndexBuilder] = None,
+) -> ParanuaraDB:
+    with open(app.config["COMPANIES_FILE"]) as companies_file, open(
+        app.config["PEOPLE_FILE"]
+    ) as people_file:
+        companies = list(
+            ingest_companies(
+                (
+                    company_from_json(company_dict)
+                    for company_dict in iter_json_array(companies_file)
+                ),
+                search_builder,
+            )
+        )
+        people = (
+            person_from_json(person_dict)
+            for person_dict in iter_json_array(people_file)
+        )
+        db, diff = db.apply_changes(
+            companies, ingest_people(people, person_summaries, search_builder)
+        )
+    if isinstance(db, MongoDB):
+        record_fingerprint(db.mongo.db, checksum)
+    elif isinstance(db, SQLiteDB):
+        db.record_fingerprint(checksum)
+    app.logger.info(
+        "Dataset %s changed %d people and removed %d",
+        checksum,
+        len(diff.upserted),
+        len(diff.removed_ids),
+    )
+    return db
+
+
+def apply_shared_json_changes(
+    app,
+    db: Union[MongoDB, SQLiteDB],
+    person_summaries: PersonSummaries,
+    checksum: str,
+    search_builder: Optional[SearchIndexBuilder] = None,
+) -> ParanuaraDB:
+    """
+        Mongo and sqlite are shared by every worker, which all notice the
+        change. They take turns on `DATASET_RELOAD_LOCK_FILE`, the first
+        applies the changes and records the fingerprint, the others find it
+        recorded and only count the company stats again.
+    """
+    lock_path = app.config.get("DATASET_RELOAD_LOCK_FILE", DATASET_RELOAD_LOCK_FILE)
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if db.stored_fingerprint() != checksum:
+            return apply_json_changes(
+                app, db, person_summaries, checksum, search_builder
+            )
+    app.logger.info("Dataset %s was already applied by another worker", checksum)
+    db.refresh_company_stats()
+    return db
+
+
+def reload_db(
+    app,
+    previous_db: ParanuaraDB,
+    person_summaries: PersonSummaries,
+    checksum: str,
+    search_builder: Optional[SearchIndexBuilder] = None,
+) -> ParanuaraDB:
+    if isinstance(previous_db, ShardedDB):
+        # The shards only load their files when restarted, the same clients
+        # are kept and asked which files they serve now
+        previous_db.check_shards()
+        return previous_db
+    # Mongo and sqlite can only be updated in place, once for every worker
+    if isinstance(previous_db, (MongoDB, SQLiteDB)):
+        return apply_shared_json_changes(
+            app, previous_db, person_summaries, checksum, search_builder
+        )
+    if (
+        previous_db.supports_apply_changes
+        and app.config.get("DATASET_RELOAD_MODE", "full") == "diff"
+    ):
+        return apply_json_changes(
+            app, previous_db, person_summaries, checksum, search_builder
+        )
+    return load_db(app, person_summaries, checksum, search_builder)
+
+
+def served_version(db: ParanuaraDB, checksum: str) -> str:
+    """
+        Identifies the data `db` serves, the `checksum` of the json files
+        unless the shards loaded their own copies
+    """
+    if isinstance(db, ShardedDB):
+        return db.version  # type: ignore
+    return checksum
+
+
+def build_search_index(
+    app, search_builder: SearchIndexBuilder, backend: ParanuaraDB
+) -> Optional[SearchIndex]:
+    if not search_builder.complete:
+        # The backend did not read the json, it mapped a snapshot or the
+        # dataset was already loaded, so the index reads what the backend holds
+        # rather than every worker parsing the files again
+        if not (
+            backend.supports_fetch_companies and backend.supports_iter_people_where
+        ):
+            app.logger.info("Search is not served by the %s backend", app.config["DB"])
+            return None
+        search_builder = SearchIndexBuilder()
+        deque(search_builder.add_companies(backend.fetch_companies()), maxlen=0)
+        deque(
+            search_builder.add_people(backend.iter_people_where(PersonFilter())),
+            maxlen=0,
+        )
+    return search_builder.build()
+
+
+class Dataset:
+    """
+        Everything built from one version of the input files. Requests read
+        the current dataset once, so swapping in a reloaded one never changes
+        the data under a request in flight.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        backend: ParanuaraDB,
+        db: ParanuaraDB,
+        person_summaries: PersonSummaries,
+        person_fragments: FragmentCache,
+        compressed_bodies: FragmentCache,
+        last_modified: Optional[datetime],
+        build_graph: Optional[Callable[[], GraphAnalytics]] = None,
+        search: Optional[SearchIndex] = None,
+    ) -> None:
+        self.version = version
+        # The backend as loaded, `db` may wrap it with metrics and caching
+        self.backend = backend
+        self.db = db
+        self.query = ParanuaraQuery(db=db)
+        self.person_summaries = person_summaries
+        self.person_fragments = person_fragments
+        # Response bodies by (ETag, Content-Encoding)
+        self.compressed_bodies = compressed_bodies
+        # Modification time of the newest input file, when known
+        self.last_modified = last_modified
+        # The friend network analytics, built by the first request needing them
+        self.build_graph = build_graph
+        self.graph: Optional[GraphAnalytics] = None
+        self.graph_lock = Lock()
+        self.search = search
+        # /companies/stats, serialised on first use
+        self.company_stats_json: Optional[bytes] = None
+
+    def person_json(self, person: Person) -> bytes:
+        return self.person_fragments.get(
+            person.id, lambda: json_bytes_from_person(person)
+        )
+
+    def graph_analytics(self) -> Optional[GraphAnalytics]:
+        """
+            None when the backend has no friend graph or analytics are disabled
+        """
+        if self.build_graph is None:
+            return None
+        with self.graph_lock:
+            if self.graph is None:
+                self.graph = self.build_graph()
+        return self.graph
+
+
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__, instance_relative_config=True)
@@ -79,38 +585,528 @@ def create_app(test_config=None):
     except OSError:
         pass
 
-    companies_json = json.load(open(app.config["COMPANIES_FILE"]))
-    companies = [company_from_json(company_dict) for company_dict in companies_json]
+    metrics = MetricsRegistry()
+    request_seconds = metrics.histogram(
+        "paranuara_http_request_duration_seconds",
+        "Time spent handling a request, by route",
+        ["route", "method", "status"],
+    )
+    db_seconds = metrics.histogram(
+        "paranuara_db_call_duration_seconds",
+        "Time spent in a ParanuaraDB method",
+        ["backend", "method"],
+    )
+    serialisation_seconds = metrics.histogram(
+        "paranuara_serialisation_duration_seconds",
+        "Time spent encoding a response body, by route",
+        ["route"],
+    )
+    result_size = metrics.histogram(
+        "paranuara_result_size",
+        "Number of people, or batch items, in a response",
+        ["result"],
+        buckets=SIZE_BUCKETS,
+    )
+
+    def new_person_summaries() -> PersonSummaries:
+        return PersonSummaries(
+            username_from_email,
+            on_rejected_email=lambda person: app.logger.warning(
+                "Person %d has an email that cannot be parsed: %r",
+                person.id,
+                person.email,
+            ),
+            max_entries=app.config.get(
+                "PERSON_SUMMARY_MAX_ENTRIES", PERSON_SUMMARY_MAX_ENTRIES
+            ),
+        )
+
+    def new_search_builder() -> Optional[SearchIndexBuilder]:
+        if app.config.get("SEARCH_ENABLED", False):
+            return SearchIndexBuilder()
+        return None
+
+    def new_dataset(
+        version: str,
+        backend: ParanuaraDB,
+        person_summaries: PersonSummaries,
+        search_builder: Optional[SearchIndexBuilder],
+    ) -> Dataset:
+        db = backend
+        if app.config.get("METRICS_ENABLED", True):
+            db = InstrumentedDB(db, app.config["DB"], db_seconds)
+        query_cache_max_entries = app.config.get("QUERY_CACHE_MAX_ENTRIES", {})
+        if any(query_cache_max_entries.values()):
+            db = CachingDB(
+                db,
+                version,
+                query_cache_max_entries,
+                ttl=app.config.get("QUERY_CACHE_TTL"),
+            )
+        build_graph = None
+        if (
+            app.config.get("GRAPH_ANALYTICS_ENABLED", False)
+            and backend.supports_build_graph_analytics
+        ):
+            build_graph = backend.build_graph_analytics
+        search = None
+        if search_builder is not None:
+            search = build_search_index(app, search_builder, backend)
+        # Shards read their own copies of the files, whose times are unknown
+        last_modified = None
+        if not isinstance(backend, ShardedDB):
+            last_modified = dataset_last_modified(dataset_paths)
+        return Dataset(
+            version,
+            backend,
+            db,
+            person_summaries,
+            FragmentCache(app.config.get("PERSON_CACHE_MAX_BYTES", 0)),
+            FragmentCache(app.config.get("COMPRESSED_CACHE_MAX_BYTES", 0)),
+            last_modified,
+            build_graph,
+            search,
+        )
+
+    def reload_dataset(version: str, previous: Dataset) -> Dataset:
+        person_summaries = new_person_summaries()
+        search_builder = new_search_builder()
+        backend = reload_db(
+            app, previous.backend, person_summaries, version, search_builder
+        )
+        version = served_version(backend, version)
+        if backend is previous.backend and version == previous.version:
+            return previous
+        app.logger.info("Reloaded dataset %s", version)
+        return new_dataset(version, backend, person_summaries, search_builder)
+
+    dataset_paths = [app.config["COMPANIES_FILE"], app.config["PEOPLE_FILE"]]
+    # Identifies the loaded data, cached results are only valid for it
+    dataset_version = dataset_checksum(dataset_paths, app.config.get("SNAPSHOT_FILE"))
+    person_summaries = new_person_summaries()
+    search_builder = new_search_builder()
+    backend = load_db(app, person_summaries, dataset_version, search_builder)
+    datasets = Reloadable(
+        dataset_paths,
+        dataset_version,
+        new_dataset(
+            served_version(backend, dataset_version),
+            backend,
+            person_summaries,
+            search_builder,
+        ),
+        reload_dataset,
+    )
+    reload_interval = app.config.get("DATASET_RELOAD_INTERVAL", 0)
+    if reload_interval:
+        datasets.start_polling(
+            reload_interval,
+            on_error=lambda error: app.logger.exception("Reloading the dataset failed"),
+        )
+    app.extensions["paranuara_datasets"] = datasets
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        if "request_started" in g:
+            request_seconds.observe(
+                time.perf_counter() - g.request_started,
+                request.url_rule.rule if request.url_rule else "unmatched",
+                request.method,
+                str(response.status_code),
+            )
+        return response
+
+    def current_dataset() -> Dataset:
+        # Read once per request, so the validators and the body of a response
+        # come from the same dataset when a reload swaps it meanwhile
+        if "dataset" not in g:
+            g.dataset = datasets.current
+        return g.dataset
+
+    @app.before_request
+    def answer_from_cache():
+        if (
+            request.method not in ("GET", "HEAD")
+            or request.endpoint not in DATASET_ENDPOINTS
+        ):
+            return None
+        dataset = current_dataset()
+        g.etag = dataset_etag(dataset.version, request.path, request.query_string)
+        encoding = accepted_encoding()
+        if encoding is None or not app.config.get("COMPRESSION_ENABLED", True):
+            return None
+        entry = dataset.compressed_bodies.lookup((g.etag, encoding))
+        if entry is None:
+            return None
+        # Only 200 responses are cached, so the resource exists and a client
+        # holding it can be answered 304 without the endpoint running
+        if not is_modified(dataset):
+            return Response(status=304)
+        return response_from_cache_entry(entry, encoding)
 
-    people_json = json.load(open(app.config["PEOPLE_FILE"]))
-    people = [person_from_json(person_dict) for person_dict in people_json]
+    def is_modified(dataset: Dataset) -> bool:
+        return is_resource_modified(
+            request.environ, etag=g.etag, last_modified=dataset.last_modified
+        )
 
-    db = init_db(companies, people, app)
-    query = ParanuaraQuery(db=db)
+    @app.after_request
+    def add_validators(response):
+        if "etag" not in g or response.status_code not in (200, 304):
+            return response
+        dataset = current_dataset()
+        # Checked once the endpoint ran, a missing person or company is a 404
+        # whatever validators the client sends
+        if response.status_code == 200 and not is_modified(dataset):
+            response = Response(status=304)
+        response.set_etag(g.etag, weak=True)
+        if dataset.last_modified is not None:
+            response.last_modified = dataset.last_modified
+        response.vary.add("Accept-Encoding")
+        encoding = accepted_encoding()
+        if (
+            response.status_code == 200
+            and encoding is not None
+            and app.config.get("COMPRESSION_ENABLED", True)
+            and "Content-Encoding" not in response.headers
+            # Streamed bodies are sent as they are produced
+            and not response.is_streamed
+            and response.content_length >= app.config.get("COMPRESSION_MIN_BYTES", 1024)
+        ):
+            body = compress(response.get_data(), encoding)
+            dataset.compressed_bodies.store(
+                (g.etag, encoding), cache_entry(response, body)
+            )
+            response.set_data(body)
+            response.headers["Content-Encoding"] = encoding
+        return response
 
     @app.route("/company/<int:company_id>/employees")
     def company_employees(company_id):
+        dataset = current_dataset()
+        stream = request.args.get("stream")
+        if stream not in (None, "json", "ndjson"):
+            return abort(400)
+        after_id = int_arg("after")
+        limit = int_arg("limit")
+        if limit is not None and limit < 1:
+            return abort(400)
+        person_filter = person_filter_arg()
         try:
-            people = query.query_company_employees(company_id)
-            json = [json_from_person(person) for person in people]
-            return jsonify(json)
+            if (
+                stream is None
+                and after_id is None
+                and limit is None
+                and person_filter is None
+            ):
+                people = dataset.query.query_company_employees(company_id)
+                result_size.observe(len(people), "employees")
+                with serialisation_seconds.time("company_employees"):
+                    return json_response(
+                        json_bytes_from_people(people, dataset.person_json)
+                    )
+
+            if limit is not None or after_id is not None:
+                max_limit = app.config.get("EMPLOYEES_PAGE_SIZE_MAX", 1000)
+                limit = min(limit or max_limit, max_limit)
+            if person_filter is None:
+                people_iter = dataset.query.query_company_employees_page(
+                    company_id, after_id=after_id, limit=limit
+                )
+            else:
+                people_iter = dataset.query.query_company_employees_where(
+                    company_id, person_filter, after_id=after_id, limit=limit
+                )
         except CompanyNotFound:
             return abort(404)
 
+        if stream == "json":
+            return Response(
+                stream_json_array(people_iter, dataset.person_json),
+                mimetype="application/json",
+            )
+        if stream == "ndjson":
+            return Response(
+                stream_ndjson(people_iter, dataset.person_json),
+                mimetype="application/x-ndjson",
+            )
+
+        page = list(people_iter)
+        result_size.observe(len(page), "employees_page")
+        with serialisation_seconds.time("company_employees"):
+            response = json_response(json_bytes_from_people(page, dataset.person_json))
+        if len(page) == limit:
+            response.headers["Link"] = next_page_link(
+                "company_employees", page[-1].id, limit, company_id=company_id
+            )
+        return response
+
     @app.route("/person/<int:person_id>")
     def person(person_id):
+        dataset = current_dataset()
         try:
-            result = query.query_person(person_id)
-            return jsonify(person_to_simple_json(result))
+            result = dataset.query.query_person(person_id)
+            with serialisation_seconds.time("person"):
+                return jsonify(
+                    person_to_simple_json(result, dataset.person_summaries.get(result))
+                )
         except PersonNotFound:
             return abort(404)
 
     @app.route("/person/<int:person1_id>/friends_join/<int:person2_id>")
     def friends_join(person1_id, person2_id):
+        dataset = current_dataset()
         try:
-            query_result = query.query_join_friends(person1_id, person2_id)
-            return jsonify(json_from_join_people_response(query_result))
+            query_result = dataset.query.query_join_friends(person1_id, person2_id)
+            result_size.observe(
+                len(query_result.friends_in_common), "friends_in_common"
+            )
+            with serialisation_seconds.time("friends_join"):
+                return json_response(
+                    json_bytes_from_join_people_response(
+                        query_result, dataset.person_json
+                    )
+                )
         except PersonNotFound:
             raise abort(404)
 
+    @app.route("/people")
+    def people_where():
+        dataset = current_dataset()
+        if not dataset.db.supports_iter_people_where:
+            # The backend can only look people up by id
+            return abort(501)
+        person_filter = person_filter_arg() or PersonFilter()
+        after_id = int_arg("after")
+        limit = int_arg("limit")
+        if limit is not None and limit < 1:
+            return abort(400)
+        max_limit = app.config.get("PEOPLE_PAGE_SIZE_MAX", 1000)
+        limit = min(limit or max_limit, max_limit)
+        page = list(dataset.query.query_people_where(person_filter, after_id, limit))
+        result_size.observe(len(page), "people_page")
+        with serialisation_seconds.time("people_where"):
+            response = json_response(json_bytes_from_people(page, dataset.person_json))
+        if len(page) == limit:
+            response.headers["Link"] = next_page_link(
+                "people_where", page[-1].id, limit
+            )
+        return response
+
+    @app.route("/people", methods=["POST"])
+    def people_batch():
+        dataset = current_dataset()
+        person_ids = batch_arg(
+            "ids", is_person_id, app.config.get("BATCH_MAX_ITEMS", 1000)
+        )
+        people = dataset.query.query_people(person_ids)
+        result_size.observe(len(person_ids), "people_batch")
+        with serialisation_seconds.time("people_batch"):
+            return jsonify(
+                {
+                    "results": [
+                        {
+                            "id": person_id,
+                            "person": person_to_simple_json(
+                                people[person_id],
+                                dataset.person_summaries.get(people[person_id]),
+                            ),
+                        }
+                        if person_id in people
+                        else {"id": person_id, "error": "not found"}
+                        for person_id in person_ids
+                    ]
+                }
+            )
+
+    @app.route("/friends_join", methods=["POST"])
+    def friends_join_batch():
+        dataset = current_dataset()
+        pairs = [
+            (person1_id, person2_id)
+            for person1_id, person2_id in batch_arg(
+                "pairs", is_person_id_pair, app.config.get("BATCH_MAX_ITEMS", 1000)
+            )
+        ]
+        result_size.observe(len(pairs), "friends_join_batch")
+        join_results = dataset.query.query_join_friends_batch(pairs)
+        serialisation_started = time.perf_counter()
+        results = []
+        for (person1_id, person2_id), result in zip(pairs, join_results):
+            ids = {"person1_id": person1_id, "person2_id": person2_id}
+            if result is None:
+                results.append(compact_json_bytes(dict(ids, error="not found")))
+            else:
+                results.append(
+                    compact_json_bytes(ids)[:-1]
+                    + b',"result":'
+                    + json_bytes_from_join_people_response(result, dataset.person_json)
+                    + b"}"
+                )
+        response = json_response(b'{"results":[' + b",".join(results) + b"]}")
+        serialisation_seconds.observe(
+            time.perf_counter() - serialisation_started, "friends_join_batch"
+        )
+        return response
+
+    @app.route("/company/<int:company_id>/stats")
+    def company_stats(company_id):
+        dataset = current_dataset()
+        try:
+            stats = dataset.query.query_company_stats(company_id)
+        except CompanyNotFound:
+            return abort(404)
+        return jsonify(company_id=company_id, **json_from_company_stats(stats))
+
+    @app.route("/companies/stats")
+    def all_company_stats():
+        dataset = current_dataset()
+        if dataset.company_stats_json is None:
+            if not dataset.db.supports_fetch_company_stats:
+                return abort(501)
+            with serialisation_seconds.time("company_stats"):
+                dataset.company_stats_json = compact_json_bytes(
+                    {
+                        str(company_id): json_from_company_stats(stats)
+                        for company_id, stats in dataset.db.fetch_company_stats().items()
+                    }
+                )
+        return json_response(dataset.company_stats_json)
+
+    def current_graph() -> GraphAnalytics:
+        graph = current_dataset().graph_analytics()
+        if graph is None:
+            # The backend has no friend graph, or analytics are disabled
+            return abort(501)
+        return graph
+
+    def bounded_int_arg(name: str, default: int, maximum: int) -> int:
+        value = int_arg(name)
+        if value is None:
+            return default
+        if not 1 <= value <= maximum:
+            return abort(400)
+        return value
+
+    @app.route("/person/<int:person_id>/network")
+    def person_network(person_id):
+        graph = current_graph()
+        depth = bounded_int_arg("depth", 2, app.config.get("GRAPH_MAX_DEPTH", 3))
+        max_results = app.config.get("GRAPH_MAX_RESULTS", 10000)
+        limit = bounded_int_arg("limit", max_results, max_results)
+        try:
+            people, truncated = graph.people_within(person_id, depth, limit)
+        except PersonNotFound:
+            return abort(404)
+        result_size.observe(len(people), "network")
+        return jsonify(
+            person_id=person_id,
+            depth=depth,
+            people=[
+                {"id": friend_id, "distance": distance}
+                for friend_id, distance in people
+            ],
+            truncated=truncated,
+        )
+
+    @app.route("/person/<int:person_id>/suggested_friends")
+    def suggested_friends(person_id):
+        graph = current_graph()
+        limit = bounded_int_arg("limit", 10, app.config.get("GRAPH_MAX_RESULTS", 10000))
+        try:
+            suggestions = graph.suggested_friends(person_id, limit)
+        except PersonNotFound:
+            return abort(404)
+        return jsonify(
+            person_id=person_id,
+            suggestions=[
+                {"id": friend_id, "mutual_friends": count}
+                for friend_id, count in suggestions
+            ],
+        )
+
+    @app.route("/company/<int:company_id>/friend_stats")
+    def company_friend_stats(company_id):
+        graph = current_graph()
+        try:
+            current_dataset().db.fetch_company_by_id(company_id)
+        except CompanyNotFound:
+            return abort(404)
+        stats = graph.company(company_id)
+        return jsonify(
+            company_id=company_id,
+            employees=stats.employees,
+            friends=stats.degree._asdict(),
+            internal_links=stats.internal_links,
+            components=stats.components,
+            largest_component=stats.largest_component,
+            isolated=stats.isolated,
+        )
+
+    @app.route("/friend_stats")
+    def friend_stats():
+        graph = current_graph()
+        limit = bounded_int_arg("limit", 10, app.config.get("GRAPH_MAX_RESULTS", 10000))
+        return jsonify(
+            people=len(graph),
+            friends=graph.degree._asdict(),
+            friend_of=graph.in_degree._asdict(),
+            most_connected=[
+                {"id": person_id, "friends": count}
+                for person_id, count in graph.most_connected(limit)
+            ],
+        )
+
+    @app.route("/search")
+    def search():
+        dataset = current_dataset()
+        if dataset.search is None:
+            # Search is disabled
+            return abort(501)
+        query = request.args.get("q", "")
+        if not query.strip():
+            return abort(400)
+        max_results = app.config.get("SEARCH_MAX_RESULTS", 100)
+        limit = bounded_int_arg("limit", min(10, max_results), max_results)
+        results = dataset.search.search(query, limit)
+        people = dataset.query.query_people([result.id for result in results])
+        result_size.observe(len(results), "search")
+        with serialisation_seconds.time("search"):
+            return jsonify(
+                query=query,
+                results=[
+                    {
+                        "id": result.id,
+                        "name": people[result.id].name,
+                        "score": result.score,
+                        "person": person_to_simple_json(
+                            people[result.id],
+                            dataset.person_summaries.get(people[result.id]),
+                        ),
+                    }
+                    # Mongo and sqlite are updated in place, the index can
+                    # briefly name people they no longer hold
+                    for result in results
+                    if result.id in people
+                ],
+            )
+
+    @app.route("/metrics")
+    def metrics_exposition():
+        return Response(metrics.exposition(), content_type=CONTENT_TYPE)
+
+    @app.route("/cache/stats")
+    def cache_stats():
+        dataset = current_dataset()
+        stats = {
+            "person_fragments": dataset.person_fragments.stats(),
+            "compressed_bodies": dataset.compressed_bodies.stats(),
+        }
+        if isinstance(dataset.db, CachingDB):
+            stats["queries"] = dataset.db.stats()
+        return jsonify(stats)
+
     return app
@@ -0,0 +1,93 @@
+import os
+from argparse import ArgumentParser
+
+from paranuara.synthetic import (
+    SyntheticConfig,
+    generate_companies,
+    generate_people,
+    write_json_array,
+)
+
+
+def main():
+    defaults = SyntheticConfig()
+    parser = ArgumentParser(
+        description="Write a synthetic companies.json and people.json of any size"
+    )
+    parser.add_argument(
+        "--output-dir", metavar="dir", required=True, help="directory to write to"
+    )
+    parser.add_argument(
+        "--people", metavar="n", type=int, default=defaults.people, help="people"
+    )
+    parser.add_argument(
+        "--companies",
+        metavar="n",
+        type=int,
+        default=defaults.companies,
+        help="companies",
+    )
+    parser.add_argument(
+        "--brown-alive-ratio",
+        metavar="ratio",
+        type=float,
+        default=defaults.brown_alive_ratio,
+        help="share of people with brown eyes that are alive",
+    )
+    parser.add_argument(
+        "--friend-exponent",
+        metavar="alpha",
+        type=float,
+        default=defaults.friend_exponent,
+        help="pareto shape of the friend count, smaller is more skewed",
+    )
+    parser.add_argument(
+        "--max-friends",
+        metavar="n",
+        type=int,
+        default=defaults.max_friends,
+        help="largest friend count",
+    )
+    parser.add_argument(
+        "--huge-companies",
+        metavar="n",
+        type=int,
+        default=defaults.huge_companies,
+        help="companies sharing --huge-company-share of all people",
+    )
+    parser.add_argument(
+        "--huge-company-share",
+        metavar="ratio",
+        type=float,
+        default=defaults.huge_company_share,
+        help="share of people employed by the huge companies",
+    )
+    parser.add_argument(
+        "--seed", metavar="n", type=int, default=defaults.seed, help="random seed"
+    )
+    args = parser.parse_args()
+    config = SyntheticConfig(
+        people=args.people,
+        companies=args.companies,
+        brown_alive_ratio=args.brown_alive_ratio,
+        friend_exponent=args.friend_exponent,
+        max_friends=args.max_friends,
+        huge_companies=args.huge_companies,
+        huge_company_share=args.huge_company_share,
+        seed=args.seed,
+    )
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, "companies.json"), "w") as fp:
+        companies = write_json_array(fp, generate_companies(config))
+    with open(os.path.join(args.output_dir, "people.json"), "w") as fp:
+        people = write_json_array(fp, generate_people(config))
+    print(
+        "Wrote {} companies and {} people to {}".format(
+            companies, people, args.output_dir
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
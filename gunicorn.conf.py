@@ -0,0 +1,44 @@
+import glob
+import multiprocessing
+import os
+import tempfile
+
+from config import DevConfig
+from paranuara.snapshot import ensure_snapshot
+
+bind = "127.0.0.1:5000"
+workers = multiprocessing.cpu_count() * 2 + 1
+
+# Read by prometheus_client when it is imported, which must only happen in the
+# workers once it is set, so not from this file
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def on_starting(server):
+    # Compiled once in the master, the workers then memory map the same
+    # snapshot file and share its pages through the page cache
+    if DevConfig.DB == "columnar" and DevConfig.SNAPSHOT_FILE:
+        if ensure_snapshot(
+            DevConfig.COMPANIES_FILE, DevConfig.PEOPLE_FILE, DevConfig.SNAPSHOT_FILE
+        ):
+            server.log.info("Compiled %s", DevConfig.SNAPSHOT_FILE)
+
+    # Inherited by the workers, which all write their metrics there so
+    # whichever one answers /metrics serves the sum of every worker's. The
+    # samples of a previous run are deleted
+    metrics_dir = os.environ.get(MULTIPROC_DIR_ENV)
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+            os.remove(path)
+    else:
+        os.environ[MULTIPROC_DIR_ENV] = tempfile.mkdtemp(prefix="paranuara-metrics-")
+    server.log.info("Writing metrics to %s", os.environ[MULTIPROC_DIR_ENV])
+
+
+def child_exit(server, worker):
+    # Imported once the directory is set, the histograms of the worker are
+    # kept so the sums never go down
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,29 +1,247 @@
-from typing import List
+from bisect import bisect_right, insort
+from copy import copy
+from itertools import islice
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
 
+from paranuara.bitmap_index import BitmapIndexes
 from paranuara.company import Company
+from paranuara.company_stats import (
+    CompanyStats,
+    company_stats_from_people,
+    patch_company_stats,
+)
+from paranuara.dataset_diff import PeopleDiff, diff_people
 from paranuara.db import CompanyNotFound, ParanuaraDB, PersonNotFound
+from paranuara.friend_graph import FriendGraphBuilder, is_join_friend
+from paranuara.graph import GraphAnalytics
 from paranuara.person import Person
+from paranuara.person_filter import PersonFilter, person_matches
+
+PersonIndexKey = Callable[[Person], Hashable]
+
+# Indexes that are always built, extra ones can be declared via `person_indexes`
+DEFAULT_PERSON_INDEXES = {"company_id": lambda person: person.company_id}
+
+
+def build_index(
+    people: Iterable[Person], key: PersonIndexKey
+) -> Dict[Hashable, List[int]]:
+    """
+        Map every value of `key` to the ids of the people that have it, in the
+        order the people were loaded.
+    """
+    index: Dict[Hashable, List[int]] = {}
+    for person in people:
+        index.setdefault(key(person), []).append(person.id)
+    return index
 
 
 class InMemoryDB(ParanuaraDB):
-    def __init__(self, companies: List[Company], people: List[Person]) -> None:
-        self.companies = companies
-        self.people = people
+    supports_fetch_common_friend_ids = True
+    supports_fetch_person_pair = True
+    supports_fetch_people_by_ids_where = True
+    supports_iter_people_by_company_id = True
+    supports_iter_people_where = True
+    supports_apply_changes = True
+    supports_fetch_company_stats = True
+    supports_build_graph_analytics = True
+    supports_fetch_companies = True
+
+    def __init__(
+        self,
+        companies: Iterable[Company],
+        people: Iterable[Person],
+        person_indexes: Optional[Dict[str, PersonIndexKey]] = None,
+    ) -> None:
+        self.companies = {company.id: company for company in companies}
+        self.people = {person.id: person for person in people}
+        self.index_keys = dict(DEFAULT_PERSON_INDEXES)
+        self.index_keys.update(person_indexes or {})
+        self.person_indexes = {
+            name: build_index(self.people.values(), key)
+            for name, key in self.index_keys.items()
+        }
+        self.sorted_company_member_ids = {
+            company_id: sorted(person_ids)
+            for company_id, person_ids in self.person_indexes["company_id"].items()
+        }
+        self.friend_graph = (
+            FriendGraphBuilder().add_people(self.people.values()).build()
+        )
+        self.company_stats = company_stats_from_people(self.people.values())
+        self.bitmap_indexes = BitmapIndexes(self.people.values())
 
     def fetch_company_by_id(self, company_id: int) -> Company:
         try:
             return self.companies[company_id]
-        except IndexError:
+        except KeyError:
             raise CompanyNotFound
 
+    def fetch_companies(self) -> List[Company]:
+        return [self.companies[company_id] for company_id in sorted(self.companies)]
+
     def fetch_people_by_company_id(self, company_id: int) -> List[Person]:
-        return [person for person in self.people if person.company_id == company_id]
+        return self.fetch_people_by_index("company_id", company_id)
+
+    def iter_people_by_company_id(
+        self,
+        company_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        person_ids = self.sorted_company_member_ids.get(company_id, [])
+        start = 0 if after_id is None else bisect_right(person_ids, after_id)
+        stop = None if limit is None else start + limit
+        # Slicing jumps straight to the cursor, islice would walk up to it
+        return (self.people[person_id] for person_id in person_ids[start:stop])
 
     def fetch_person_by_id(self, person_id: int) -> Person:
         try:
             return self.people[person_id]
-        except IndexError:
+        except KeyError:
             raise PersonNotFound
 
     def fetch_people_by_ids(self, person_ids: List[int]) -> List[Person]:
-        return [self.people[person_id] for person_id in person_ids]
+        # Unknown ids are skipped, the same as the mongo `$in` lookup
+        return [
+            self.people[person_id]
+            for person_id in person_ids
+            if person_id in self.people
+        ]
+
+    def fetch_person_pair(
+        self, person1_id: int, person2_id: int
+    ) -> Tuple[Person, Person]:
+        return self.fetch_person_by_id(person1_id), self.fetch_person_by_id(person2_id)
+
+    def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        return [
+            person
+            for person in self.fetch_people_by_ids(person_ids)
+            if person_matches(person, person_filter)
+        ]
+
+    def iter_people_where(
+        self,
+        person_filter: PersonFilter,
+        company_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        scope = None
+        if company_id is not None:
+            scope = self.sorted_company_member_ids.get(company_id, [])
+        person_ids = self.bitmap_indexes.select(
+            person_filter,
+            scope,
+            lambda person_id: person_matches(self.people[person_id], person_filter),
+            after_id,
+        )
+        return (self.people[person_id] for person_id in islice(person_ids, limit))
+
+    def fetch_common_friend_ids(self, person1_id: int, person2_id: int) -> List[int]:
+        return self.friend_graph.common_join_friend_ids(person1_id, person2_id)
+
+    def fetch_company_stats(self) -> Dict[int, CompanyStats]:
+        return self.company_stats
+
+    def build_graph_analytics(self) -> GraphAnalytics:
+        return GraphAnalytics(
+            self.friend_graph, lambda person_id: self.people[person_id].company_id
+        )
+
+    def fetch_people_by_index(self, name: str, value: Hashable) -> List[Person]:
+        return [
+            self.people[person_id]
+            for person_id in self.person_indexes[name].get(value, [])
+        ]
+
+    def apply_changes(
+        self, companies: List[Company], people: Iterable[Person]
+    ) -> Tuple["InMemoryDB", PeopleDiff]:
+        """
+            Patches a copy of this db, which is left untouched. Only the index
+            entries of changed people are rewritten. People that are new or
+            moved to another index value keep index lists in id order, which
+            they are when people.json is, and are listed last otherwise.
+        """
+        diff = diff_people(list(self.people), self.fetch_people_by_ids, people)
+        db = copy(self)
+        db.companies = {company.id: company for company in companies}
+        db.people = dict(self.people)
+        db.person_indexes = {
+            name: dict(index) for name, index in self.person_indexes.items()
+        }
+        db.sorted_company_member_ids = dict(self.sorted_company_member_ids)
+
+        graph_changed = bool(diff.removed_ids)
+        # The previous version of every person that was removed or changed
+        old_people = []
+        for person_id in diff.removed_ids:
+            old_people.append(db.people.pop(person_id))
+            db._unindex(old_people[-1])
+        for person in diff.upserted:
+            old = db.people.get(person.id)
+            db.people[person.id] = person
+            if old is not None:
+                old_people.append(old)
+                for name, key in self.index_keys.items():
+                    if key(old) != key(person):
+                        db._unindex(old, [name])
+                        db._index(person, [name])
+            else:
+                db._index(person, list(self.index_keys))
+            graph_changed = graph_changed or (
+                old is None
+                or old.friends != person.friends
+                or is_join_friend(old) != is_join_friend(person)
+            )
+
+        if graph_changed:
+            db.friend_graph = (
+                FriendGraphBuilder().add_people(db.people.values()).build()
+            )
+        db.company_stats = patch_company_stats(
+            self.company_stats, old_people, diff.upserted
+        )
+        db.bitmap_indexes = self.bitmap_indexes.patched(old_people, diff.upserted)
+        return db, diff
+
+    def _index(self, person: Person, names: List[str]) -> None:
+        for name in names:
+            value = self.index_keys[name](person)
+            index = self.person_indexes[name]
+            person_ids = list(index.get(value, []))
+            if all(left < right for left, right in zip(person_ids, person_ids[1:])):
+                insort(person_ids, person.id)
+            else:
+                person_ids.append(person.id)
+            index[value] = person_ids
+            if name == "company_id":
+                member_ids = list(self.sorted_company_member_ids.get(value, []))
+                insort(member_ids, person.id)
+                self.sorted_company_member_ids[value] = member_ids
+
+    def _unindex(self, person: Person, names: Optional[List[str]] = None) -> None:
+        # Lists are replaced rather than mutated, the db this one was copied
+        # from still shares them
+        for name in self.index_keys if names is None else names:
+            value = self.index_keys[name](person)
+            index = self.person_indexes[name]
+            index[value] = [
+                person_id for person_id in index[value] if person_id != person.id
+            ]
+            if not index[value]:
+                del index[value]
+            if name == "company_id":
+                member_ids = [
+                    person_id
+                    for person_id in self.sorted_company_member_ids[value]
+                    if person_id != person.id
+                ]
+                if member_ids:
+                    self.sorted_company_member_ids[value] = member_ids
+                else:
+                    del self.sorted_company_member_ids[value]
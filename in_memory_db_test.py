@@ -0,0 +1,158 @@
+from unittest import TestCase
+
+from in_memory_db import InMemoryDB
+from paranuara.company import Company
+from paranuara.db import CompanyNotFound, PersonNotFound
+from paranuara.person_filter import PersonFilter
+from paranuara.query_test import generate_person
+
+
+def generate_employee(id, company_id, eye_color="red"):
+    return generate_person(id=id, eye_color=eye_color)._replace(company_id=company_id)
+
+
+class InMemoryDBTest_fetch_by_id(TestCase):
+    def test_sparse_out_of_order_people(self):
+        person5 = generate_person(id=5)
+        person2 = generate_person(id=2)
+        db = InMemoryDB(companies=[], people=[person5, person2])
+
+        self.assertEqual(db.fetch_person_by_id(2), person2)
+        self.assertEqual(db.fetch_person_by_id(5), person5)
+        with self.assertRaises(PersonNotFound):
+            db.fetch_person_by_id(0)
+
+    def test_sparse_out_of_order_companies(self):
+        company = Company(id=7, name="seven")
+        db = InMemoryDB(companies=[Company(id=3, name="three"), company], people=[])
+
+        self.assertEqual(db.fetch_company_by_id(7), company)
+        with self.assertRaises(CompanyNotFound):
+            db.fetch_company_by_id(1)
+        self.assertEqual(db.fetch_companies(), [Company(id=3, name="three"), company])
+
+    def test_fetch_people_by_ids_skips_unknown(self):
+        person1 = generate_person(id=1)
+        person2 = generate_person(id=2)
+        db = InMemoryDB(companies=[], people=[person1, person2])
+
+        self.assertEqual(db.fetch_people_by_ids([2, 9, 1]), [person2, person1])
+
+
+class InMemoryDBTest_indexes(TestCase):
+    def test_people_by_company_id(self):
+        employee1 = generate_employee(id=3, company_id=1)
+        employee2 = generate_employee(id=1, company_id=1)
+        other = generate_employee(id=2, company_id=2)
+        db = InMemoryDB(companies=[], people=[employee1, other, employee2])
+
+        self.assertEqual(db.fetch_people_by_company_id(1), [employee1, employee2])
+        self.assertEqual(db.fetch_people_by_company_id(3), [])
+
+    def test_declared_index(self):
+        brown = generate_employee(id=1, company_id=1, eye_color="brown")
+        blue = generate_employee(id=2, company_id=1, eye_color="blue")
+        db = InMemoryDB(
+            companies=[],
+            people=[brown, blue],
+            person_indexes={"eye_color": lambda person: person.eye_color},
+        )
+
+        self.assertEqual(db.fetch_people_by_index("eye_color", "brown"), [brown])
+        self.assertEqual(db.fetch_people_by_index("eye_color", "green"), [])
+
+    def test_iter_people_by_company_id(self):
+        employees = [generate_employee(id=id, company_id=1) for id in [4, 2, 8, 6]]
+        db = InMemoryDB(companies=[], people=employees)
+
+        self.assertEqual(
+            list(db.iter_people_by_company_id(1, after_id=2, limit=2)),
+            [employees[0], employees[3]],
+        )
+        self.assertEqual(list(db.iter_people_by_company_id(1, after_id=8)), [])
+        self.assertEqual(list(db.iter_people_by_company_id(2)), [])
+
+
+class InMemoryDBTest_iter_people_where(TestCase):
+    def setUp(self):
+        self.people = [
+            generate_employee(id=4, company_id=1, eye_color="brown"),
+            generate_employee(id=2, company_id=1),
+            generate_employee(id=8, company_id=1, eye_color="brown"),
+            generate_employee(id=6, company_id=2, eye_color="brown"),
+        ]
+        self.db = InMemoryDB(companies=[], people=self.people)
+
+    def test_company(self):
+        brown = PersonFilter(eye_color="brown")
+
+        self.assertEqual(
+            list(self.db.iter_people_where(brown, 1)), [self.people[0], self.people[2]]
+        )
+        self.assertEqual(
+            list(self.db.iter_people_where(brown, 1, after_id=4)), [self.people[2]]
+        )
+        self.assertEqual(list(self.db.iter_people_where(brown, 3)), [])
+
+    def test_everyone(self):
+        self.assertEqual(
+            list(self.db.iter_people_where(PersonFilter(eye_color="brown"), limit=2)),
+            [self.people[0], self.people[3]],
+        )
+        self.assertEqual(list(self.db.iter_people_where(PersonFilter(min_age=11))), [])
+
+    def test_after_apply_changes(self):
+        new_db, _ = self.db.apply_changes(
+            [], [self.people[0], self.people[1]._replace(eye_color="brown")]
+        )
+
+        self.assertEqual(
+            list(new_db.iter_people_where(PersonFilter(eye_color="brown"))),
+            [self.people[1]._replace(eye_color="brown"), self.people[0]],
+        )
+
+
+class InMemoryDBTest_apply_changes(TestCase):
+    def test_copy_with_changes(self):
+        employees = [generate_employee(id=id, company_id=1) for id in range(4)]
+        db = InMemoryDB(companies=[Company(id=1, name="one")], people=employees)
+        moved = employees[1]._replace(company_id=2)
+        added = generate_employee(id=9, company_id=1)
+
+        new_db, diff = db.apply_changes(
+            [Company(id=1, name="one"), Company(id=2, name="two")],
+            [employees[0], moved, employees[3], added],
+        )
+
+        self.assertEqual(diff.upserted, [moved, added])
+        self.assertEqual(diff.removed_ids, [2])
+        self.assertEqual(
+            new_db.fetch_people_by_company_id(1), [employees[0], employees[3], added]
+        )
+        self.assertEqual(new_db.fetch_people_by_company_id(2), [moved])
+        self.assertEqual(
+            list(new_db.iter_people_by_company_id(1, after_id=0)), [employees[3], added]
+        )
+        self.assertEqual(new_db.fetch_company_by_id(2).name, "two")
+        with self.assertRaises(PersonNotFound):
+            new_db.fetch_person_by_id(2)
+        # The db requests in flight may still read is untouched
+        self.assertEqual(db.fetch_people_by_company_id(1), employees)
+        self.assertEqual(db.fetch_person_by_id(2), employees[2])
+        self.assertEqual(new_db.fetch_company_stats()[1].headcount, 3)
+        self.assertEqual(new_db.fetch_company_stats()[2].headcount, 1)
+        self.assertEqual(db.fetch_company_stats()[1].headcount, 4)
+        self.assertNotIn(2, db.fetch_company_stats())
+
+    def test_friend_graph_rebuilt(self):
+        person1 = generate_person(id=1, friends=[3])
+        person2 = generate_person(id=2, friends=[3])
+        friend = generate_person(id=3, eye_color="brown")
+        db = InMemoryDB(companies=[], people=[person1, person2, friend])
+
+        new_db, _ = db.apply_changes(
+            [], [person1, person2, friend._replace(has_died=True)]
+        )
+
+        self.assertEqual(db.fetch_common_friend_ids(1, 2), [3])
+        self.assertEqual(new_db.fetch_common_friend_ids(1, 2), [])
@@ -0,0 +1,49 @@
+from argparse import ArgumentParser
+
+from pymongo import MongoClient
+
+from cli_util import add_companies_arg, add_people_arg
+from mongo_db import DEFAULT_BATCH_SIZE, load_mongo
+from paranuara.company import company_from_json
+from paranuara.json_stream import iter_json_array
+from paranuara.person import person_from_json
+from paranuara.snapshot import source_checksum
+
+
+def main():
+    parser = ArgumentParser(
+        description="Load companies.json and people.json into mongo"
+    )
+    add_companies_arg(parser)
+    add_people_arg(parser)
+    parser.add_argument(
+        "--mongo-uri",
+        metavar="uri",
+        default="mongodb://localhost:27017/paranuara",
+        help="mongo connection string, including the database name",
+    )
+    parser.add_argument(
+        "--batch-size",
+        metavar="n",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="documents per bulk write",
+    )
+    args = parser.parse_args()
+    fingerprint = source_checksum([args.companies.name, args.people.name])
+    companies = (
+        company_from_json(company_dict)
+        for company_dict in iter_json_array(args.companies)
+    )
+    people = (
+        person_from_json(person_dict) for person_dict in iter_json_array(args.people)
+    )
+    db = MongoClient(args.mongo_uri).get_database()
+    if load_mongo(db, companies, people, fingerprint, batch_size=args.batch_size):
+        print("Loaded dataset {}".format(fingerprint))
+    else:
+        print("Dataset {} is already loaded".format(fingerprint))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+from argparse import ArgumentParser
+
+from cli_util import add_companies_arg, add_people_arg
+from paranuara.company import company_from_json
+from paranuara.json_stream import iter_json_array
+from paranuara.person import person_from_json
+from paranuara.snapshot import source_checksum
+from sqlite_db import DEFAULT_BATCH_SIZE, load_sqlite
+
+
+def main():
+    parser = ArgumentParser(
+        description="Load companies.json and people.json into a sqlite file"
+    )
+    add_companies_arg(parser)
+    add_people_arg(parser)
+    parser.add_argument(
+        "--sqlite-file",
+        metavar="path",
+        default="resources/paranuara.sqlite",
+        help="sqlite database file, created when missing",
+    )
+    parser.add_argument(
+        "--batch-size",
+        metavar="n",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help="people per transaction",
+    )
+    args = parser.parse_args()
+    fingerprint = source_checksum([args.companies.name, args.people.name])
+    companies = (
+        company_from_json(company_dict)
+        for company_dict in iter_json_array(args.companies)
+    )
+    people = (
+        person_from_json(person_dict) for person_dict in iter_json_array(args.people)
+    )
+    if load_sqlite(
+        args.sqlite_file, companies, people, fingerprint, batch_size=args.batch_size
+    ):
+        print("Loaded dataset {}".format(fingerprint))
+    else:
+        print("Dataset {} is already loaded".format(fingerprint))
+
+
+if __name__ == "__main__":
+    main()
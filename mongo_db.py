@@ -1,26 +1,266 @@
-from typing import List
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+from pymongo import ASCENDING, DeleteMany, ReplaceOne
+
+from paranuara.columnar import cents_from_decimal
 from paranuara.company import Company, company_from_json, json_from_company
+from paranuara.company_stats import CompanyStats
+from paranuara.dataset_diff import PeopleDiff, diff_people
 from paranuara.db import CompanyNotFound, ParanuaraDB, PersonNotFound
-from paranuara.person import Person, json_from_person, person_from_json
+from paranuara.person import (
+    Person,
+    fruits_from_foods,
+    json_from_person,
+    person_from_json,
+    vegetables_from_foods,
+)
+from paranuara.person_filter import PersonFilter
 
+DEFAULT_BATCH_SIZE = 1000
 
-class MongoDB(ParanuaraDB):
-    def __init__(self, companies: List[Company], people: List[Person], mongo) -> None:
-        self.mongo = mongo
-        for company in companies:
-            company_dict = json_from_company(company)
-            self.mongo.db.company.replace_one(
-                {"index": company_dict["index"]}, company_dict, upsert=True
-            )
+# _id of the document in the `meta` collection recording the loaded dataset
+DATASET_META_ID = "dataset"
+
+# Bumped when the fields written to person documents change, so datasets
+# loaded by older versions are loaded again
+DOCUMENT_VERSION = 2
+
+# Person fields a `PersonFilter` can be served from an index on
+FILTER_INDEX_FIELDS = ("eyeColor", "gender", "age", "tags", "favouriteFood")
+
+
+def mongo_query_from_filter(person_filter: PersonFilter) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if person_filter.eye_color is not None:
+        query["eyeColor"] = person_filter.eye_color
+    if person_filter.has_died is not None:
+        query["has_died"] = person_filter.has_died
+    if person_filter.gender is not None:
+        query["gender"] = person_filter.gender
+    age: Dict[str, int] = {}
+    if person_filter.min_age is not None:
+        age["$gte"] = person_filter.min_age
+    if person_filter.max_age is not None:
+        age["$lte"] = person_filter.max_age
+    if age:
+        query["age"] = age
+    if person_filter.tags:
+        query["tags"] = {"$all": list(person_filter.tags)}
+    if person_filter.favourite_food:
+        query["favouriteFood"] = {"$all": list(person_filter.favourite_food)}
+    return query
+
+
+def batches(requests: Iterable[Any], batch_size: int) -> Iterator[List]:
+    iterator = iter(requests)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def document_from_person(person: Person) -> Dict[str, Any]:
+    """
+        The person's json plus its balance in integer cents, which the company
+        stats sum as mongo cannot parse the "$1,234.56" strings
+    """
+    document = json_from_person(person)
+    document["balanceCents"] = cents_from_decimal(person.balance)
+    return document
+
+
+def ensure_indexes(db) -> None:
+    db.company.create_index([("index", ASCENDING)], unique=True)
+    db.person.create_index([("index", ASCENDING)], unique=True)
+    # Serves company_id lookups and paging through a company by index
+    db.person.create_index([("company_id", ASCENDING), ("index", ASCENDING)])
+    # One index per filterable field, mongo's planner picks the most selective
+    # of the fields a filter names and checks the others on the documents
+    for field in FILTER_INDEX_FIELDS:
+        db.person.create_index([(field, ASCENDING), ("index", ASCENDING)])
+
+
+def load_mongo(
+    db,
+    companies: Iterable[Company],
+    people: Iterable[Person],
+    fingerprint: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> bool:
+    """
+        Upsert the dataset with unordered bulk writes of `batch_size` documents.
+        Loading is skipped, and False returned, when the dataset `fingerprint`
+        stored by the last complete load matches. Safe to run repeatedly.
+    """
+    ensure_indexes(db)
+    meta = db.meta.find_one({"_id": DATASET_META_ID})
+    if (
+        meta is not None
+        and meta.get("fingerprint") == fingerprint
+        and meta.get("document_version") == DOCUMENT_VERSION
+    ):
+        return False
+
+    companies = list(companies)
+    company_requests = (
+        ReplaceOne({"index": company.id}, json_from_company(company), upsert=True)
+        for company in companies
+    )
+    for batch in batches(company_requests, batch_size):
+        db.company.bulk_write(batch, ordered=False)
+    db.company.delete_many({"index": {"$nin": [company.id for company in companies]}})
+
+    person_ids: Set[int] = set()
+
+    def recorded(people: Iterable[Person]) -> Iterator[Person]:
         for person in people:
-            person_dict = json_from_person(person)
-            self.mongo.db.person.replace_one(
-                {"_id": person_dict["_id"]}, person_dict, upsert=True
+            person_ids.add(person.id)
+            yield person
+
+    write_people(db, recorded(people), batch_size)
+    # People left out of the new dataset, like `apply_changes` removes them
+    removed_ids = [
+        result["index"]
+        for result in db.person.find({}, {"index": 1})
+        if result["index"] not in person_ids
+    ]
+    for batch in batches(removed_ids, batch_size):
+        db.person.delete_many({"index": {"$in": batch}})
+
+    # Only recorded once everything is written so an interrupted load reruns
+    record_fingerprint(db, fingerprint)
+    return True
+
+
+def write_people(db, people: Iterable[Person], batch_size: int) -> None:
+    """
+        Upserts `people` by `index`, the id every query looks them up by. A
+        document's `_id` cannot be changed, so the documents holding a
+        person's index or `_id` under another `_id` or index are deleted first.
+    """
+    for batch in batches(people, batch_size):
+        mongo_ids = {person.id: person.mongo_id for person in batch}
+        conflicting = [
+            result["_id"]
+            for result in db.person.find(
+                {
+                    "$or": [
+                        {"index": {"$in": list(mongo_ids)}},
+                        {"_id": {"$in": list(mongo_ids.values())}},
+                    ]
+                },
+                {"index": 1},
             )
-        # TODO: setup index: company.index
-        # TODO: setup index: person.index
-        # TODO: setup index: person.company_id
+            if mongo_ids.get(result["index"]) != result["_id"]
+        ]
+        if conflicting:
+            db.person.delete_many({"_id": {"$in": conflicting}})
+        db.person.bulk_write(
+            [
+                ReplaceOne(
+                    {"index": person.id}, document_from_person(person), upsert=True
+                )
+                for person in batch
+            ],
+            ordered=False,
+        )
+
+
+def record_fingerprint(db, fingerprint: str) -> None:
+    db.meta.replace_one(
+        {"_id": DATASET_META_ID},
+        {
+            "_id": DATASET_META_ID,
+            "fingerprint": fingerprint,
+            "document_version": DOCUMENT_VERSION,
+        },
+        upsert=True,
+    )
+
+
+def read_fingerprint(db) -> Optional[str]:
+    meta = db.meta.find_one({"_id": DATASET_META_ID})
+    return None if meta is None else meta.get("fingerprint")
+
+
+def company_stats_from_mongo(
+    db, company_ids: Optional[List[int]] = None
+) -> Dict[int, CompanyStats]:
+    """
+        Aggregates the stats of every company, or only of `company_ids`, with
+        one aggregation pipeline per breakdown so only the grouped counts
+        leave mongo.
+    """
+    match: Dict[str, Any] = {"company_id": {"$ne": None}}
+    if company_ids is not None:
+        match = {"company_id": {"$in": company_ids}}
+
+    stats: Dict[int, CompanyStats] = {}
+    for result in db.person.aggregate(
+        [
+            {"$match": match},
+            {
+                "$group": {
+                    "_id": "$company_id",
+                    "headcount": {"$sum": 1},
+                    "dead": {"$sum": {"$cond": ["$has_died", 1, 0]}},
+                    "age_sum": {"$sum": "$age"},
+                    "balance_cents": {"$sum": "$balanceCents"},
+                }
+            },
+        ]
+    ):
+        company_stats = stats.setdefault(result["_id"], CompanyStats())
+        company_stats.headcount = result["headcount"]
+        company_stats.dead = result["dead"]
+        company_stats.age_sum = result["age_sum"]
+        company_stats.balance_cents = result["balance_cents"]
+
+    def count_by(key: Any, unwind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        pipeline: List[Dict[str, Any]] = [{"$match": match}]
+        if unwind is not None:
+            pipeline.append({"$unwind": unwind})
+        pipeline.append(
+            {
+                "$group": {
+                    "_id": {"company_id": "$company_id", "key": key},
+                    "count": {"$sum": 1},
+                }
+            }
+        )
+        return db.person.aggregate(pipeline)
+
+    decade = {"$subtract": ["$age", {"$mod": ["$age", 10]}]}
+    for result in count_by(decade):
+        company_stats = stats[result["_id"]["company_id"]]
+        company_stats.ages_by_decade[int(result["_id"]["key"])] = result["count"]
+    for result in count_by("$eyeColor"):
+        company_stats = stats[result["_id"]["company_id"]]
+        company_stats.eye_colors[result["_id"]["key"]] = result["count"]
+    for result in count_by("$favouriteFood", unwind="$favouriteFood"):
+        company_stats = stats[result["_id"]["company_id"]]
+        food = result["_id"]["key"]
+        if fruits_from_foods([food]):
+            company_stats.fruits[food] = result["count"]
+        if vegetables_from_foods([food]):
+            company_stats.vegetables[food] = result["count"]
+    return stats
+
+
+class MongoDB(ParanuaraDB):
+    supports_fetch_person_pair = True
+    supports_fetch_people_by_ids_where = True
+    supports_iter_people_by_company_id = True
+    supports_iter_people_where = True
+    supports_apply_changes = True
+    supports_fetch_company_stats = True
+    supports_fetch_companies = True
+
+    def __init__(self, mongo) -> None:
+        self.mongo = mongo
+        self.company_stats = company_stats_from_mongo(mongo.db)
 
     def fetch_company_by_id(self, company_id: int) -> Company:
         results = list(self.mongo.db.company.find({"index": company_id}))
@@ -29,12 +269,33 @@ class MongoDB(ParanuaraDB):
         else:
             return company_from_json(results[0])
 
+    def fetch_companies(self) -> List[Company]:
+        return [
+            company_from_json(result)
+            for result in self.mongo.db.company.find().sort("index")
+        ]
+
     def fetch_people_by_company_id(self, company_id: int) -> List[Person]:
         return [
             person_from_json(result)
             for result in self.mongo.db.person.find({"company_id": company_id})
         ]
 
+    def iter_people_by_company_id(
+        self,
+        company_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        query: Dict[str, Any] = {"company_id": company_id}
+        if after_id is not None:
+            query["index"] = {"$gt": after_id}
+        cursor = self.mongo.db.person.find(query).sort("index", ASCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        # The cursor fetches batches as the generator is consumed
+        return (person_from_json(result) for result in cursor)
+
     def fetch_person_by_id(self, person_id: int) -> Person:
         results = list(self.mongo.db.person.find({"index": person_id}))
         if len(results) == 0:
@@ -47,3 +308,104 @@ class MongoDB(ParanuaraDB):
             person_from_json(result)
             for result in self.mongo.db.person.find({"index": {"$in": person_ids}})
         ]
+
+    def fetch_person_pair(
+        self, person1_id: int, person2_id: int
+    ) -> Tuple[Person, Person]:
+        people = {
+            result["index"]: result
+            for result in self.mongo.db.person.find(
+                {"index": {"$in": [person1_id, person2_id]}}
+            )
+        }
+        if person1_id not in people or person2_id not in people:
+            raise PersonNotFound
+        return (
+            person_from_json(people[person1_id]),
+            person_from_json(people[person2_id]),
+        )
+
+    def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        query = mongo_query_from_filter(person_filter)
+        query["index"] = {"$in": person_ids}
+        return [person_from_json(result) for result in self.mongo.db.person.find(query)]
+
+    def iter_people_where(
+        self,
+        person_filter: PersonFilter,
+        company_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        query = mongo_query_from_filter(person_filter)
+        if company_id is not None:
+            query["company_id"] = company_id
+        if after_id is not None:
+            query["index"] = {"$gt": after_id}
+        cursor = self.mongo.db.person.find(query).sort("index", ASCENDING)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return (person_from_json(result) for result in cursor)
+
+    def fetch_company_stats(self) -> Dict[int, CompanyStats]:
+        return self.company_stats
+
+    def stored_fingerprint(self) -> Optional[str]:
+        return read_fingerprint(self.mongo.db)
+
+    def refresh_company_stats(self) -> None:
+        """
+            Counts the stats again, after another process changed the people
+        """
+        self.company_stats = company_stats_from_mongo(self.mongo.db)
+
+    def apply_changes(
+        self,
+        companies: List[Company],
+        people: Iterable[Person],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Tuple["MongoDB", PeopleDiff]:
+        """
+            Writes the differences in place, requests running meanwhile can
+            read a mix of both datasets. Companies are few and all rewritten.
+        """
+        db = self.mongo.db
+        old_ids = [result["index"] for result in db.person.find({}, {"index": 1})]
+        diff = diff_people(old_ids, self.fetch_people_by_ids, people, batch_size)
+        # Companies whose stats change, read before the people are rewritten
+        changed_company_ids: Set[int] = set()
+
+        def add_company_ids(changed: Iterable[Person]) -> None:
+            changed_company_ids.update(
+                person.company_id for person in changed if person.company_id is not None
+            )
+
+        add_company_ids(diff.upserted)
+        for batch in batches(
+            [person.id for person in diff.upserted] + diff.removed_ids, batch_size
+        ):
+            add_company_ids(self.fetch_people_by_ids(batch))
+
+        company_requests = [
+            ReplaceOne({"index": company.id}, json_from_company(company), upsert=True)
+            for company in companies
+        ]
+        company_requests.append(
+            DeleteMany({"index": {"$nin": [company.id for company in companies]}})
+        )
+        db.company.bulk_write(company_requests, ordered=False)
+
+        write_people(db, diff.upserted, batch_size)
+        for batch in batches(diff.removed_ids, batch_size):
+            db.person.delete_many({"index": {"$in": batch}})
+
+        company_stats = {
+            company_id: stats
+            for company_id, stats in self.company_stats.items()
+            if company_id not in changed_company_ids
+        }
+        company_stats.update(company_stats_from_mongo(db, list(changed_company_ids)))
+        self.company_stats = company_stats
+        return self, diff
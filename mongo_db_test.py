@@ -0,0 +1,185 @@
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import TestCase, skipIf
+
+from paranuara.company import Company
+from paranuara.query_test import generate_person
+
+try:
+    import mongomock
+
+    from mongo_db import MongoDB, load_mongo
+    from paranuara.company_stats import (
+        company_stats_from_people,
+        json_from_company_stats,
+    )
+    from paranuara.db import PersonNotFound
+    from paranuara.person_filter import JOIN_FRIEND_FILTER, PersonFilter
+except ImportError:
+    mongomock = None
+
+
+@skipIf(mongomock is None, "mongomock is not installed")
+class LoadMongoTest(TestCase):
+    def setUp(self):
+        self.db = mongomock.MongoClient().db
+        self.companies = [Company(id=0, name="NETBOOK"), Company(id=1, name="ZOLAR")]
+        self.people = [
+            generate_person(id=id)._replace(mongo_id=str(id), company_id=id % 2)
+            for id in range(5)
+        ]
+
+    def test_load(self):
+        loaded = load_mongo(
+            self.db, self.companies, self.people, fingerprint="abc", batch_size=2
+        )
+        db = MongoDB(SimpleNamespace(db=self.db))
+
+        self.assertTrue(loaded)
+        self.assertEqual(db.fetch_company_by_id(1), self.companies[1])
+        self.assertEqual(db.fetch_companies(), self.companies)
+        self.assertEqual(
+            [person.id for person in db.fetch_people_by_company_id(0)], [0, 2, 4]
+        )
+        self.assertIn("company_id_1_index_1", self.db.person.index_information())
+
+    def test_skips_loaded_fingerprint(self):
+        load_mongo(self.db, self.companies, self.people, fingerprint="abc")
+        self.db.person.delete_many({})
+
+        loaded = load_mongo(self.db, self.companies, self.people, fingerprint="abc")
+
+        self.assertFalse(loaded)
+        self.assertEqual(self.db.person.count_documents({}), 0)
+
+    def test_reloads_older_documents(self):
+        load_mongo(self.db, self.companies, self.people, fingerprint="abc")
+        self.db.meta.update_many({}, {"$unset": {"document_version": ""}})
+
+        loaded = load_mongo(self.db, self.companies, self.people, fingerprint="abc")
+
+        self.assertTrue(loaded)
+
+    def test_apply_changes(self):
+        load_mongo(self.db, self.companies, self.people, fingerprint="abc")
+        db = MongoDB(SimpleNamespace(db=self.db))
+        changed = self.people[1]._replace(age=99)
+        added = generate_person(id=7)._replace(mongo_id="7", company_id=0)
+
+        new_db, diff = db.apply_changes(
+            self.companies[:1], [self.people[0], changed, added]
+        )
+
+        self.assertEqual(diff.upserted, [changed, added])
+        self.assertEqual(diff.removed_ids, [2, 3, 4])
+        self.assertEqual(
+            new_db.fetch_people_by_ids([0, 1, 2, 7]), [self.people[0], changed, added]
+        )
+        self.assertEqual(self.db.company.count_documents({}), 1)
+
+    def test_company_stats(self):
+        self.people[3] = self.people[3]._replace(
+            has_died=True, age=42, balance=Decimal("10.25"), favourite_food=["apple"]
+        )
+        load_mongo(self.db, self.companies, self.people, fingerprint="abc")
+        db = MongoDB(SimpleNamespace(db=self.db))
+        expected = company_stats_from_people(self.people)
+
+        self.assertEqual(
+            {
+                company_id: json_from_company_stats(stats)
+                for company_id, stats in db.fetch_company_stats().items()
+            },
+            {
+                company_id: json_from_company_stats(stats)
+                for company_id, stats in expected.items()
+            },
+        )
+
+        changed = self.people[1]._replace(company_id=0)
+        db.apply_changes(self.companies, [self.people[0], changed, self.people[2]])
+
+        self.assertEqual(db.fetch_company_stats()[0].headcount, 3)
+        self.assertNotIn(1, db.fetch_company_stats())
+
+    def test_reload_is_idempotent(self):
+        load_mongo(self.db, self.companies, self.people, fingerprint="abc")
+        loaded = load_mongo(self.db, self.companies, self.people, fingerprint="def")
+
+        self.assertTrue(loaded)
+        self.assertEqual(self.db.person.count_documents({}), 5)
+
+    def test_reload_removes_stale_people(self):
+        load_mongo(self.db, self.companies, self.people, fingerprint="abc")
+        moved = self.people[1]._replace(mongo_id="new")
+
+        load_mongo(
+            self.db, self.companies[:1], [self.people[0], moved], fingerprint="def"
+        )
+        db = MongoDB(SimpleNamespace(db=self.db))
+
+        self.assertEqual(db.fetch_people_by_ids([0, 1, 2]), [self.people[0], moved])
+        self.assertEqual(self.db.company.count_documents({}), 1)
+
+    def test_apply_changes_new_mongo_id(self):
+        load_mongo(self.db, self.companies, self.people, fingerprint="abc")
+        db = MongoDB(SimpleNamespace(db=self.db))
+        # Person 1 takes the _id person 0 had
+        changed = [
+            self.people[0]._replace(mongo_id="other"),
+            self.people[1]._replace(mongo_id="0"),
+        ]
+
+        new_db, _ = db.apply_changes(self.companies, changed + self.people[2:])
+
+        self.assertEqual(new_db.fetch_people_by_ids([0, 1]), changed)
+
+
+@skipIf(mongomock is None, "mongomock is not installed")
+class MongoDBTest_join_friends(TestCase):
+    def setUp(self):
+        self.people = [
+            generate_person(id=0, eye_color="brown")._replace(mongo_id="0"),
+            generate_person(id=1, eye_color="brown", has_died=True)._replace(
+                mongo_id="1"
+            ),
+            generate_person(id=2, eye_color="blue")._replace(mongo_id="2"),
+        ]
+        mongo_db = mongomock.MongoClient().db
+        load_mongo(mongo_db, [], self.people, fingerprint="abc")
+        self.db = MongoDB(SimpleNamespace(db=mongo_db))
+
+    def test_fetch_person_pair(self):
+        self.assertEqual(
+            self.db.fetch_person_pair(2, 0), (self.people[2], self.people[0])
+        )
+        self.assertEqual(
+            self.db.fetch_person_pair(1, 1), (self.people[1], self.people[1])
+        )
+        with self.assertRaises(PersonNotFound):
+            self.db.fetch_person_pair(0, 3)
+
+    def test_fetch_people_by_ids_where(self):
+        self.assertEqual(
+            self.db.fetch_people_by_ids_where([0, 1, 2], JOIN_FRIEND_FILTER),
+            [self.people[0]],
+        )
+
+    def test_iter_people_where(self):
+        self.assertEqual(
+            list(self.db.iter_people_where(PersonFilter(eye_color="brown"))),
+            [self.people[0], self.people[1]],
+        )
+        self.assertEqual(
+            list(
+                self.db.iter_people_where(
+                    PersonFilter(max_age=10, tags=("tags",), has_died=False)
+                )
+            ),
+            [self.people[0], self.people[2]],
+        )
+        self.assertEqual(list(self.db.iter_people_where(PersonFilter(min_age=11))), [])
+        self.assertEqual(
+            list(self.db.iter_people_where(PersonFilter(), after_id=0, limit=1)),
+            [self.people[1]],
+        )
@@ -0,0 +1,89 @@
+from typing import Awaitable, Callable, List, Optional
+
+from paranuara.company import Company
+from paranuara.db import ParanuaraDB
+from paranuara.person import Person
+from paranuara.person_filter import PersonFilter
+
+
+class AsyncParanuaraDB:
+    """
+        The `ParanuaraDB` contract with every lookup returning an awaitable,
+        for backends whose lookups are network round trips.
+    """
+
+    # See `ParanuaraDB.supports_fetch_common_friend_ids`
+    supports_fetch_common_friend_ids = False
+    # See `ParanuaraDB.supports_fetch_people_by_ids_where`
+    supports_fetch_people_by_ids_where = False
+
+    def __init__(
+        self,
+        fetch_company_by_id: Callable[[int], Awaitable[Company]],
+        fetch_people_by_company_id: Callable[[int], Awaitable[List[Person]]],
+        fetch_person_by_id: Callable[[int], Awaitable[Person]],
+        fetch_people_by_ids: Callable[[List[int]], Awaitable[List[Person]]],
+        fetch_common_friend_ids: Optional[
+            Callable[[int, int], Awaitable[List[int]]]
+        ] = None,
+        fetch_people_by_ids_where: Optional[
+            Callable[[List[int], PersonFilter], Awaitable[List[Person]]]
+        ] = None,
+    ) -> None:
+        self.fetch_company_by_id = fetch_company_by_id
+        self.fetch_people_by_company_id = fetch_people_by_company_id
+        self.fetch_person_by_id = fetch_person_by_id
+        self.fetch_people_by_ids = fetch_people_by_ids
+        self._fetch_common_friend_ids = fetch_common_friend_ids
+        self._fetch_people_by_ids_where = fetch_people_by_ids_where
+        self.supports_fetch_common_friend_ids = fetch_common_friend_ids is not None
+        self.supports_fetch_people_by_ids_where = fetch_people_by_ids_where is not None
+
+    async def fetch_common_friend_ids(
+        self, person1_id: int, person2_id: int
+    ) -> List[int]:
+        if self._fetch_common_friend_ids is None:
+            raise NotImplementedError
+        return await self._fetch_common_friend_ids(person1_id, person2_id)
+
+    async def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        if self._fetch_people_by_ids_where is None:
+            raise NotImplementedError
+        return await self._fetch_people_by_ids_where(person_ids, person_filter)
+
+
+class AsyncDBAdapter(AsyncParanuaraDB):
+    """
+        Serves a `ParanuaraDB` through the async interface. The lookups run on
+        the event loop, so only backends that never block, like `InMemoryDB`
+        and `ColumnarDB`, should be adapted.
+    """
+
+    def __init__(self, db: ParanuaraDB) -> None:
+        self.db = db
+        self.supports_fetch_common_friend_ids = db.supports_fetch_common_friend_ids
+        self.supports_fetch_people_by_ids_where = db.supports_fetch_people_by_ids_where
+
+    async def fetch_company_by_id(self, company_id: int) -> Company:
+        return self.db.fetch_company_by_id(company_id)
+
+    async def fetch_people_by_company_id(self, company_id: int) -> List[Person]:
+        return self.db.fetch_people_by_company_id(company_id)
+
+    async def fetch_person_by_id(self, person_id: int) -> Person:
+        return self.db.fetch_person_by_id(person_id)
+
+    async def fetch_people_by_ids(self, person_ids: List[int]) -> List[Person]:
+        return self.db.fetch_people_by_ids(person_ids)
+
+    async def fetch_common_friend_ids(
+        self, person1_id: int, person2_id: int
+    ) -> List[int]:
+        return self.db.fetch_common_friend_ids(person1_id, person2_id)
+
+    async def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        return self.db.fetch_people_by_ids_where(person_ids, person_filter)
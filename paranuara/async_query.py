@@ -0,0 +1,66 @@
+import asyncio
+from typing import Dict, List
+
+from paranuara.async_db import AsyncParanuaraDB
+from paranuara.friend_graph import is_join_friend
+from paranuara.person import Person
+from paranuara.person_filter import JOIN_FRIEND_FILTER
+from paranuara.query import JoinPeopleResponse
+
+
+class AsyncParanuaraQuery:
+    """
+        `ParanuaraQuery` for an `AsyncParanuaraDB`, lookups that do not depend
+        on each other are awaited concurrently.
+    """
+
+    def __init__(self, db: AsyncParanuaraDB) -> None:
+        self.db = db
+
+    async def query_company_employees(self, company_id: int) -> List[Person]:
+        _, people = await asyncio.gather(
+            self.db.fetch_company_by_id(company_id),
+            self.db.fetch_people_by_company_id(company_id),
+        )
+        return people
+
+    async def query_join_friends(
+        self, person1_id: int, person2_id: int
+    ) -> JoinPeopleResponse:
+        if self.db.supports_fetch_common_friend_ids:
+            person1, person2, friend_ids_in_common = await asyncio.gather(
+                self.db.fetch_person_by_id(person1_id),
+                self.db.fetch_person_by_id(person2_id),
+                self.db.fetch_common_friend_ids(person1_id, person2_id),
+            )
+            # The backend already filtered, only fetch the people we return
+            friends_in_common = await self.db.fetch_people_by_ids(friend_ids_in_common)
+        else:
+            person1, person2 = await asyncio.gather(
+                self.db.fetch_person_by_id(person1_id),
+                self.db.fetch_person_by_id(person2_id),
+            )
+            friend_ids_in_common = sorted(set(person1.friends) & set(person2.friends))
+            if self.db.supports_fetch_people_by_ids_where:
+                friends_in_common = await self.db.fetch_people_by_ids_where(
+                    friend_ids_in_common, JOIN_FRIEND_FILTER
+                )
+            else:
+                friends_in_common = [
+                    friend
+                    for friend in await self.db.fetch_people_by_ids(
+                        friend_ids_in_common
+                    )
+                    if is_join_friend(friend)
+                ]
+
+        return JoinPeopleResponse(
+            person1=person1, person2=person2, friends_in_common=friends_in_common
+        )
+
+    async def query_person(self, person_id: int) -> Person:
+        return await self.db.fetch_person_by_id(person_id)
+
+    async def query_people(self, person_ids: List[int]) -> Dict[int, Person]:
+        people = await self.db.fetch_people_by_ids(list(dict.fromkeys(person_ids)))
+        return {person.id: person for person in people}
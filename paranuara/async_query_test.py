@@ -0,0 +1,114 @@
+import asyncio
+from unittest import TestCase
+
+from in_memory_db import InMemoryDB
+from paranuara.async_db import AsyncDBAdapter, AsyncParanuaraDB
+from paranuara.async_query import AsyncParanuaraQuery
+from paranuara.company import Company
+from paranuara.db import CompanyNotFound, PersonNotFound
+from paranuara.query import JoinPeopleResponse
+from paranuara.query_test import generate_person
+
+
+class InFlightCounter:
+    """
+        Wraps coroutine functions and records the most calls awaiting at once
+    """
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def wrap(self, fetch):
+        async def counted(*args):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            # Let the other fetches start before this one finishes
+            await asyncio.sleep(0)
+            self.in_flight -= 1
+            return await fetch(*args)
+
+        return counted
+
+
+class AsyncParanuaraQueryTest(TestCase):
+    def setUp(self):
+        self.person1 = generate_person(1, friends=[3, 4])
+        self.person2 = generate_person(2, friends=[3, 4])
+        self.brown = generate_person(3, eye_color="brown")
+        self.blue = generate_person(4, eye_color="blue")
+        self.db = AsyncDBAdapter(
+            InMemoryDB(
+                companies=[Company(id=1, name="one")],
+                people=[
+                    self.person1,
+                    self.person2._replace(company_id=1),
+                    self.brown,
+                    self.blue,
+                ],
+            )
+        )
+
+    def test_company_employees(self):
+        query = AsyncParanuaraQuery(self.db)
+
+        self.assertEqual(
+            [person.id for person in asyncio.run(query.query_company_employees(1))], [2]
+        )
+        with self.assertRaises(CompanyNotFound):
+            asyncio.run(query.query_company_employees(2))
+
+    def test_join_friends(self):
+        query = AsyncParanuaraQuery(self.db)
+
+        self.assertEqual(
+            asyncio.run(query.query_join_friends(1, 3)).friends_in_common, []
+        )
+        result = asyncio.run(query.query_join_friends(1, 2))
+        self.assertEqual(result.friends_in_common, [self.brown])
+        with self.assertRaises(PersonNotFound):
+            asyncio.run(query.query_join_friends(1, 9))
+
+    def test_join_friends_without_optional_lookups(self):
+        people = {1: self.person1, 2: self.person2, 3: self.brown, 4: self.blue}
+
+        async def fetch_person_by_id(person_id):
+            return people[person_id]
+
+        async def fetch_people_by_ids(person_ids):
+            return [people[person_id] for person_id in person_ids]
+
+        query = AsyncParanuaraQuery(
+            AsyncParanuaraDB(
+                fetch_company_by_id=None,
+                fetch_people_by_company_id=None,
+                fetch_person_by_id=fetch_person_by_id,
+                fetch_people_by_ids=fetch_people_by_ids,
+            )
+        )
+
+        self.assertEqual(
+            asyncio.run(query.query_join_friends(1, 2)),
+            JoinPeopleResponse(
+                person1=self.person1,
+                person2=self.person2,
+                friends_in_common=[self.brown],
+            ),
+        )
+
+    def test_join_friends_fetches_concurrently(self):
+        counter = InFlightCounter()
+        self.db.fetch_person_by_id = counter.wrap(self.db.fetch_person_by_id)
+        self.db.fetch_common_friend_ids = counter.wrap(self.db.fetch_common_friend_ids)
+        query = AsyncParanuaraQuery(self.db)
+
+        asyncio.run(query.query_join_friends(1, 2))
+
+        self.assertEqual(counter.max_in_flight, 3)
+
+    def test_query_people(self):
+        query = AsyncParanuaraQuery(self.db)
+
+        self.assertEqual(
+            asyncio.run(query.query_people([2, 9, 2])), {2: self.db.db.people[2]}
+        )
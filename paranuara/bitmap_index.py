@@ -0,0 +1,225 @@
+import sys
+from array import array
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    cast,
+)
+
+from paranuara.person import Person
+from paranuara.person_filter import PersonFilter
+
+# The values a person is indexed under, per filterable field
+FIELD_VALUES: Dict[str, Callable[[Person], Iterable[Hashable]]] = {
+    "eye_color": lambda person: [person.eye_color],
+    "has_died": lambda person: [person.has_died],
+    "gender": lambda person: [person.gender],
+    "age": lambda person: [person.age],
+    "tags": lambda person: set(person.tags),
+    "favourite_food": lambda person: set(person.favourite_food),
+}
+
+Predicate = NamedTuple(
+    "Predicate",
+    [
+        ("field", str),
+        # People with any of these values match
+        ("values", List[Hashable]),
+        # How many people match
+        ("count", int),
+    ],
+)
+
+
+def set_bit(bits: bytearray, person_id: int) -> None:
+    byte = person_id >> 3
+    if byte >= len(bits):
+        bits.extend(bytes(byte + 1 - len(bits)))
+    bits[byte] |= 1 << (person_id & 7)
+
+
+def bitmap_from_ids(person_ids: Iterable[int]) -> int:
+    """
+        An int with the bit of every id in `person_ids` set
+    """
+    bits = bytearray()
+    for person_id in person_ids:
+        set_bit(bits, person_id)
+    return int.from_bytes(bits, "little")
+
+
+def iter_bitmap_ids(bitmap: int, after_id: Optional[int] = None) -> Iterator[int]:
+    """
+        The ids set in `bitmap` in ascending order, after the `after_id` cursor
+    """
+    if after_id is not None and after_id >= 0:
+        bitmap = bitmap >> (after_id + 1) << (after_id + 1)
+    size = (bitmap.bit_length() + 63) // 64
+    # Scanned 64 bits at a time, only the words with a bit set are unpacked
+    words = array("Q", bitmap.to_bytes(size * 8, "little"))
+    if sys.byteorder == "big":
+        words.byteswap()
+    for i, word in enumerate(words):
+        while word:
+            low = word & -word
+            yield i * 64 + low.bit_length() - 1
+            word ^= low
+
+
+class BitmapIndexes:
+    """
+        One bitmap of person ids per value of every field in `FIELD_VALUES`,
+        with the number of people holding each value so a filter can be
+        planned without touching the bitmaps. Bitmaps are Python ints indexed
+        by person id, so ids must be small non negative integers, which the
+        person indexes of people.json are.
+
+        Never mutated once built, `patched` returns a copy.
+    """
+
+    def __init__(self, people: Iterable[Person] = ()) -> None:
+        people = list(people)
+        size = max((person.id for person in people), default=-1) // 8 + 1
+        all_bits = bytearray(size)
+        # Bits are set in bytearrays, then each is converted to an int once
+        bits: Dict[str, Dict[Hashable, bytearray]] = {name: {} for name in FIELD_VALUES}
+        self.counts: Dict[str, Dict[Hashable, int]] = {
+            name: {} for name in FIELD_VALUES
+        }
+        for person in people:
+            all_bits[person.id >> 3] |= 1 << (person.id & 7)
+        for name, values in FIELD_VALUES.items():
+            index, counts = bits[name], self.counts[name]
+            for person in people:
+                byte, bit = person.id >> 3, 1 << (person.id & 7)
+                for value in values(person):
+                    value_bits = index.get(value)
+                    if value_bits is None:
+                        value_bits = index[value] = bytearray(size)
+                        counts[value] = 0
+                    value_bits[byte] |= bit
+                    counts[value] += 1
+        self.all = int.from_bytes(all_bits, "little")
+        self.size = len(people)
+        self.bitmaps = {
+            name: {value: int.from_bytes(b, "little") for value, b in index.items()}
+            for name, index in bits.items()
+        }
+
+    def patched(
+        self, removed: Iterable[Person], added: Iterable[Person]
+    ) -> "BitmapIndexes":
+        """
+            A copy with the `removed` people's bits cleared and the `added`
+            people's bits set. Only the bitmaps of the values they hold are
+            rewritten, the others are shared with this one.
+        """
+        indexes = BitmapIndexes()
+        indexes.all = self.all
+        indexes.size = self.size
+        indexes.bitmaps = {name: dict(index) for name, index in self.bitmaps.items()}
+        indexes.counts = {name: dict(index) for name, index in self.counts.items()}
+        for person in removed:
+            indexes._set(person, False)
+        for person in added:
+            indexes._set(person, True)
+        return indexes
+
+    def _set(self, person: Person, present: bool) -> None:
+        bit = 1 << person.id
+        change = 1 if present else -1
+        self.all = self.all | bit if present else self.all & ~bit
+        self.size += change
+        for name, values in FIELD_VALUES.items():
+            bitmaps, counts = self.bitmaps[name], self.counts[name]
+            for value in values(person):
+                bitmap = bitmaps.get(value, 0)
+                bitmaps[value] = bitmap | bit if present else bitmap & ~bit
+                counts[value] = counts.get(value, 0) + change
+                if not counts[value]:
+                    del bitmaps[value], counts[value]
+
+    def predicate(self, field: str, values: Iterable[Hashable]) -> Predicate:
+        counts = self.counts[field]
+        matching = [value for value in values if value in counts]
+        return Predicate(field, matching, sum(counts[value] for value in matching))
+
+    def plan(self, person_filter: PersonFilter) -> List[Predicate]:
+        """
+            One predicate per condition of `person_filter`, most selective
+            first
+        """
+        predicates = []
+        for field in ("eye_color", "has_died", "gender"):
+            value = getattr(person_filter, field)
+            if value is not None:
+                predicates.append(self.predicate(field, [value]))
+        if person_filter.min_age is not None or person_filter.max_age is not None:
+            ages = cast(Iterable[int], self.counts["age"])
+            predicates.append(
+                self.predicate(
+                    "age",
+                    [
+                        age
+                        for age in ages
+                        if (
+                            person_filter.min_age is None
+                            or age >= person_filter.min_age
+                        )
+                        and (
+                            person_filter.max_age is None
+                            or age <= person_filter.max_age
+                        )
+                    ],
+                )
+            )
+        for field in ("tags", "favourite_food"):
+            for value in dict.fromkeys(getattr(person_filter, field)):
+                predicates.append(self.predicate(field, [value]))
+        return sorted(predicates, key=lambda predicate: predicate.count)
+
+    def bitmap(self, predicate: Predicate) -> int:
+        bitmaps = self.bitmaps[predicate.field]
+        bitmap = 0
+        for value in predicate.values:
+            bitmap |= bitmaps[value]
+        return bitmap
+
+    def select(
+        self,
+        person_filter: PersonFilter,
+        scope: Optional[Sequence[int]] = None,
+        matches: Optional[Callable[[int], bool]] = None,
+        after_id: Optional[int] = None,
+    ) -> Iterator[int]:
+        """
+            The ids matching `person_filter` in ascending order, after the
+            `after_id` cursor. With a `scope`, the ascending ids of the people
+            to choose from, when it holds fewer people than the most selective
+            predicate its ids are tested one at a time with `matches` rather
+            than intersecting bitmaps of the whole dataset.
+        """
+        predicates = self.plan(person_filter)
+        if predicates and not predicates[0].count:
+            return iter(())
+        if scope is not None and matches is not None:
+            if not predicates or len(scope) <= predicates[0].count:
+                return (
+                    person_id
+                    for person_id in scope
+                    if (after_id is None or person_id > after_id) and matches(person_id)
+                )
+
+        bitmap = self.all if scope is None else bitmap_from_ids(scope)
+        for predicate in predicates:
+            bitmap &= self.bitmap(predicate)
+            if not bitmap:
+                return iter(())
+        return iter_bitmap_ids(bitmap, after_id)
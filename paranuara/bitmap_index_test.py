@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+from paranuara.bitmap_index import BitmapIndexes, bitmap_from_ids, iter_bitmap_ids
+from paranuara.person_filter import PersonFilter
+from paranuara.query_test import generate_person
+
+
+def generate_people():
+    return [
+        generate_person(id=0, eye_color="brown")._replace(age=30, tags=["a", "b"]),
+        generate_person(id=3, eye_color="blue")._replace(age=40, tags=["a"]),
+        generate_person(id=64, eye_color="brown", has_died=True)._replace(
+            age=35, tags=["b"]
+        ),
+        generate_person(id=130, eye_color="brown")._replace(age=50, tags=["a", "b"]),
+    ]
+
+
+class BitmapTest(TestCase):
+    def test_round_trip(self):
+        ids = [0, 1, 63, 64, 65, 1000]
+
+        self.assertEqual(list(iter_bitmap_ids(bitmap_from_ids(ids))), ids)
+        self.assertEqual(list(iter_bitmap_ids(bitmap_from_ids(ids), 63)), ids[3:])
+        self.assertEqual(list(iter_bitmap_ids(0)), [])
+
+
+class BitmapIndexesTest(TestCase):
+    def setUp(self):
+        self.indexes = BitmapIndexes(generate_people())
+
+    def test_plan_most_selective_first(self):
+        plan = self.indexes.plan(
+            PersonFilter(eye_color="brown", has_died=True, min_age=31, max_age=45)
+        )
+
+        self.assertEqual(
+            [(predicate.field, predicate.count) for predicate in plan],
+            [("has_died", 1), ("age", 2), ("eye_color", 3)],
+        )
+        self.assertEqual(sorted(plan[1].values), [35, 40])
+
+    def test_select(self):
+        self.assertEqual(
+            list(self.indexes.select(PersonFilter(eye_color="brown", tags=("a", "b")))),
+            [0, 130],
+        )
+        self.assertEqual(
+            list(self.indexes.select(PersonFilter(min_age=35), after_id=3)), [64, 130]
+        )
+        self.assertEqual(list(self.indexes.select(PersonFilter(tags=("c",)))), [])
+        self.assertEqual(list(self.indexes.select(PersonFilter())), [0, 3, 64, 130])
+
+    def test_select_scans_small_scope(self):
+        tested = []
+
+        def matches(person_id):
+            tested.append(person_id)
+            return person_id != 3
+
+        selected = self.indexes.select(
+            PersonFilter(eye_color="brown"), scope=[3, 130], matches=matches
+        )
+
+        self.assertEqual(list(selected), [130])
+        self.assertEqual(tested, [3, 130])
+
+    def test_select_intersects_large_scope(self):
+        selected = self.indexes.select(
+            PersonFilter(has_died=True),
+            scope=[0, 3, 64],
+            matches=lambda person_id: self.fail("scope should not be scanned"),
+        )
+
+        self.assertEqual(list(selected), [64])
+
+    def test_patched(self):
+        people = generate_people()
+        patched = self.indexes.patched(
+            [people[0], people[1]], [people[1]._replace(eye_color="brown")]
+        )
+
+        self.assertEqual(
+            list(patched.select(PersonFilter(eye_color="brown"))), [3, 64, 130]
+        )
+        self.assertEqual(patched.counts["eye_color"], {"brown": 3})
+        self.assertEqual(list(patched.select(PersonFilter())), [3, 64, 130])
+        # The indexes patched from are untouched
+        self.assertEqual(list(self.indexes.select(PersonFilter(eye_color="blue"))), [3])
@@ -0,0 +1,165 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple, Type
+
+
+class FragmentCache:
+    """
+        LRU cache of encoded byte strings, bounded by the total number of bytes
+        held rather than the number of entries.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = Lock()
+
+    def get(self, key: Hashable, encode: Callable[[], bytes]) -> bytes:
+        fragment = self.lookup(key)
+        if fragment is None:
+            fragment = encode()
+            self.store(key, fragment)
+        return fragment
+
+    def lookup(self, key: Hashable) -> Optional[bytes]:
+        with self.lock:
+            fragment = self.entries.get(key)
+            if fragment is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+            return None
+
+    def store(self, key: Hashable, fragment: bytes) -> None:
+        if len(fragment) > self.max_bytes:
+            return
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = fragment
+                self.size += len(fragment)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+CacheEntry = NamedTuple(
+    "CacheEntry",
+    [("expires_at", Optional[float]), ("value", Any), ("error", Optional[Exception])],
+)
+
+
+class QueryCache:
+    """
+        LRU cache of query results bounded by the number of entries, entries
+        expire `ttl` seconds after they were stored. Lookups that raise one of
+        the `negative` exceptions are cached as well and raise it again on a
+        hit.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: Optional[float] = None,
+        negative: Tuple[Type[Exception], ...] = (),
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative = negative
+        self.clock = clock
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = Lock()
+
+    def lookup(self, key: Hashable) -> Optional[CacheEntry]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry.expires_at is None or entry.expires_at > self.clock():
+                    self.entries.move_to_end(key)
+                    if entry.error is None:
+                        self.hits += 1
+                    else:
+                        self.negative_hits += 1
+                    return entry
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def store(
+        self, key: Hashable, value: Any = None, error: Optional[Exception] = None
+    ) -> None:
+        if self.max_entries < 1:
+            return
+        expires_at = None if self.ttl is None else self.clock() + self.ttl
+        with self.lock:
+            self.entries[key] = CacheEntry(expires_at, value, error)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        entry = self.lookup(key)
+        if entry is None:
+            try:
+                value = load()
+            except self.negative as error:
+                self.store(key, error=error)
+                raise
+            self.store(key, value)
+            return value
+        if entry.error is not None:
+            raise type(entry.error)(*entry.error.args)
+        return entry.value
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits + self.negative_hits) / lookups
+                if lookups
+                else 0.0,
+            }
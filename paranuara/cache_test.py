@@ -0,0 +1,100 @@
+from unittest import TestCase
+
+from paranuara.cache import FragmentCache, QueryCache
+
+
+class FragmentCacheTest(TestCase):
+    def test_hit(self):
+        cache = FragmentCache(max_bytes=10)
+        encodes = []
+
+        def encode():
+            encodes.append(1)
+            return b"abc"
+
+        self.assertEqual(cache.get(1, encode), b"abc")
+        self.assertEqual(cache.get(1, encode), b"abc")
+        self.assertEqual(len(encodes), 1)
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_evicts_least_recently_used(self):
+        cache = FragmentCache(max_bytes=6)
+        cache.get(1, lambda: b"111")
+        cache.get(2, lambda: b"222")
+        cache.get(1, lambda: b"111")
+        cache.get(3, lambda: b"333")
+
+        self.assertEqual(list(cache.entries), [1, 3])
+        self.assertEqual(cache.stats()["bytes"], 6)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_fragment_larger_than_cache(self):
+        cache = FragmentCache(max_bytes=2)
+
+        self.assertEqual(cache.get(1, lambda: b"111"), b"111")
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_lookup_and_store(self):
+        cache = FragmentCache(max_bytes=10)
+
+        self.assertIsNone(cache.lookup(1))
+        cache.store(1, b"abc")
+        self.assertEqual(cache.lookup(1), b"abc")
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+
+class QueryCacheTest(TestCase):
+    def test_hit(self):
+        cache = QueryCache(max_entries=2)
+        loads = []
+
+        def load():
+            loads.append(1)
+            return [1, 2]
+
+        self.assertEqual(cache.get("a", load), [1, 2])
+        self.assertEqual(cache.get("a", load), [1, 2])
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = QueryCache(max_entries=2)
+        cache.get(1, lambda: "1")
+        cache.get(2, lambda: "2")
+        cache.get(1, lambda: "1")
+        cache.get(3, lambda: "3")
+
+        self.assertEqual(list(cache.entries), [1, 3])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_expires_after_ttl(self):
+        now = [0.0]
+        cache = QueryCache(max_entries=2, ttl=10, clock=lambda: now[0])
+        cache.get(1, lambda: "old")
+        now[0] = 9
+        self.assertEqual(cache.get(1, lambda: "new"), "old")
+        now[0] = 10
+        self.assertEqual(cache.get(1, lambda: "new"), "new")
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_negative_caching(self):
+        cache = QueryCache(max_entries=2, negative=(KeyError,))
+        loads = []
+
+        def load():
+            loads.append(1)
+            raise KeyError(1)
+
+        for _ in range(2):
+            with self.assertRaises(KeyError):
+                cache.get(1, load)
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(cache.stats()["negative_hits"], 1)
+
+    def test_other_errors_not_cached(self):
+        cache = QueryCache(max_entries=2, negative=(KeyError,))
+
+        with self.assertRaises(ValueError):
+            cache.get(1, lambda: int("x"))
+        self.assertEqual(cache.get(1, lambda: 1), 1)
@@ -0,0 +1,169 @@
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from paranuara.cache import QueryCache
+from paranuara.company import Company
+from paranuara.company_stats import CompanyStats
+from paranuara.db import CompanyNotFound, ParanuaraDB, PersonNotFound
+from paranuara.person import Person
+from paranuara.person_filter import PersonFilter
+
+# The query types that get their own cache, see `CachingDB.__init__`
+QUERY_TYPES = ("companies", "people", "people_where", "employees", "common_friend_ids")
+
+
+class CachingDB(ParanuaraDB):
+    """
+        Wraps another `ParanuaraDB` and keeps the results of its lookups in a
+        `QueryCache` per query type, including the ids that were not found.
+
+        Every dataset gets its own `CachingDB`, so a reload starts with empty
+        caches and the old ones are dropped with the old dataset. Cache keys
+        also start with the dataset version the results were read from.
+    """
+
+    supports_fetch_person_pair = True
+
+    def __init__(
+        self,
+        db: ParanuaraDB,
+        version: str,
+        max_entries: Dict[str, int],
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.db = db
+        self.version = version
+        self.caches = {
+            query_type: QueryCache(
+                max_entries.get(query_type, 0),
+                ttl,
+                negative=(CompanyNotFound, PersonNotFound),
+            )
+            for query_type in QUERY_TYPES
+        }
+        self.supports_fetch_common_friend_ids = db.supports_fetch_common_friend_ids
+        self.supports_fetch_people_by_ids_where = db.supports_fetch_people_by_ids_where
+        self.supports_iter_people_by_company_id = db.supports_iter_people_by_company_id
+        self.supports_iter_people_where = db.supports_iter_people_where
+        self.supports_fetch_company_stats = db.supports_fetch_company_stats
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {query_type: cache.stats() for query_type, cache in self.caches.items()}
+
+    def _get(self, query_type: str, key: Hashable, load) -> Any:
+        return self.caches[query_type].get((self.version, key), load)
+
+    def fetch_company_by_id(self, company_id: int) -> Company:
+        return self._get(
+            "companies", company_id, lambda: self.db.fetch_company_by_id(company_id)
+        )
+
+    def fetch_people_by_company_id(self, company_id: int) -> List[Person]:
+        return self._get(
+            "employees",
+            company_id,
+            lambda: self.db.fetch_people_by_company_id(company_id),
+        )
+
+    def fetch_person_by_id(self, person_id: int) -> Person:
+        return self._get(
+            "people", person_id, lambda: self.db.fetch_person_by_id(person_id)
+        )
+
+    def fetch_people_by_ids(self, person_ids: List[int]) -> List[Person]:
+        # People missing from the cache are fetched with one call, the ids it
+        # does not return are cached as not found
+        cache = self.caches["people"]
+        version = self.version
+        people: Dict[int, Optional[Person]] = {}
+        for person_id in person_ids:
+            entry = cache.lookup((version, person_id))
+            if entry is not None:
+                people[person_id] = entry.value
+
+        missing_ids = [
+            person_id
+            for person_id in dict.fromkeys(person_ids)
+            if person_id not in people
+        ]
+        if missing_ids:
+            fetched = {
+                person.id: person for person in self.db.fetch_people_by_ids(missing_ids)
+            }
+            for person_id in missing_ids:
+                person = fetched.get(person_id)
+                if person is None:
+                    cache.store((version, person_id), error=PersonNotFound())
+                else:
+                    cache.store((version, person_id), person)
+                people[person_id] = person
+
+        found = [people[person_id] for person_id in person_ids]
+        return [person for person in found if person is not None]
+
+    def fetch_person_pair(
+        self, person1_id: int, person2_id: int
+    ) -> Tuple[Person, Person]:
+        if not self.db.supports_fetch_person_pair:
+            people = {
+                person.id: person
+                for person in self.fetch_people_by_ids([person1_id, person2_id])
+            }
+            if person1_id not in people or person2_id not in people:
+                raise PersonNotFound
+            return people[person1_id], people[person2_id]
+
+        # Read from the people cache when both are in it, otherwise with the
+        # backend's own pair lookup
+        cache = self.caches["people"]
+        version = self.version
+        entries = [
+            cache.lookup((version, person_id)) for person_id in (person1_id, person2_id)
+        ]
+        if entries[0] is not None and entries[1] is not None:
+            if entries[0].error is not None or entries[1].error is not None:
+                raise PersonNotFound
+            return entries[0].value, entries[1].value
+        person1, person2 = self.db.fetch_person_pair(person1_id, person2_id)
+        cache.store((version, person1_id), person1)
+        cache.store((version, person2_id), person2)
+        return person1, person2
+
+    def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        # Filtered by the backend, which may only send the people that match
+        return self._get(
+            "people_where",
+            (tuple(person_ids), person_filter),
+            lambda: self.db.fetch_people_by_ids_where(person_ids, person_filter),
+        )
+
+    def fetch_common_friend_ids(self, person1_id: int, person2_id: int) -> List[int]:
+        return self._get(
+            "common_friend_ids",
+            (person1_id, person2_id),
+            lambda: self.db.fetch_common_friend_ids(person1_id, person2_id),
+        )
+
+    # Pages, filtered people and the precomputed stats are read straight from
+    # the wrapped backend
+
+    def iter_people_by_company_id(
+        self,
+        company_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        return self.db.iter_people_by_company_id(company_id, after_id, limit)
+
+    def iter_people_where(
+        self,
+        person_filter: PersonFilter,
+        company_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        return self.db.iter_people_where(person_filter, company_id, after_id, limit)
+
+    def fetch_company_stats(self) -> Dict[int, CompanyStats]:
+        return self.db.fetch_company_stats()
@@ -0,0 +1,100 @@
+from typing import Any, List, Tuple
+from unittest import TestCase
+
+from in_memory_db import InMemoryDB
+from paranuara.caching_db import CachingDB
+from paranuara.company import Company
+from paranuara.db import CompanyNotFound, PersonNotFound
+from paranuara.person_filter import JOIN_FRIEND_FILTER
+from paranuara.query_test import generate_person
+
+MAX_ENTRIES = {
+    "companies": 10,
+    "people": 10,
+    "people_where": 10,
+    "employees": 10,
+    "common_friend_ids": 10,
+}
+
+
+class CountingDB(InMemoryDB):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.calls: List[Tuple[str, Any]] = []
+
+    def fetch_company_by_id(self, company_id):
+        self.calls.append(("fetch_company_by_id", company_id))
+        return super().fetch_company_by_id(company_id)
+
+    def fetch_people_by_ids(self, person_ids):
+        self.calls.append(("fetch_people_by_ids", list(person_ids)))
+        return super().fetch_people_by_ids(person_ids)
+
+    def fetch_person_by_id(self, person_id):
+        self.calls.append(("fetch_person_by_id", person_id))
+        return super().fetch_person_by_id(person_id)
+
+    def fetch_people_by_ids_where(self, person_ids, person_filter):
+        self.calls.append(("fetch_people_by_ids_where", list(person_ids)))
+        return super().fetch_people_by_ids_where(person_ids, person_filter)
+
+
+class CachingDBTest(TestCase):
+    def setUp(self):
+        self.person1 = generate_person(1, friends=[3])
+        self.person2 = generate_person(2, friends=[3])
+        self.friend = generate_person(3, eye_color="brown")
+        self.db = CountingDB(
+            companies=[Company(id=1, name="one")],
+            people=[self.person1, self.person2, self.friend],
+        )
+        self.cache = CachingDB(self.db, "v1", MAX_ENTRIES)
+
+    def test_company_cached(self):
+        self.assertEqual(self.cache.fetch_company_by_id(1).name, "one")
+        self.assertEqual(self.cache.fetch_company_by_id(1).name, "one")
+        self.assertEqual(self.db.calls, [("fetch_company_by_id", 1)])
+
+    def test_not_found_cached(self):
+        for _ in range(2):
+            with self.assertRaises(CompanyNotFound):
+                self.cache.fetch_company_by_id(9)
+            with self.assertRaises(PersonNotFound):
+                self.cache.fetch_person_by_id(9)
+        self.assertEqual(
+            self.db.calls, [("fetch_company_by_id", 9), ("fetch_person_by_id", 9)]
+        )
+
+    def test_people_by_ids_only_fetches_misses(self):
+        self.cache.fetch_person_by_id(1)
+
+        self.assertEqual(
+            self.cache.fetch_people_by_ids([2, 1, 9, 2]),
+            [self.person2, self.person1, self.person2],
+        )
+        self.assertEqual(self.cache.fetch_people_by_ids([9, 2]), [self.person2])
+        with self.assertRaises(PersonNotFound):
+            self.cache.fetch_person_pair(1, 9)
+        self.assertEqual(
+            self.db.calls, [("fetch_person_by_id", 1), ("fetch_people_by_ids", [2, 9])]
+        )
+
+    def test_filtered_people_fetched_by_backend(self):
+        for _ in range(2):
+            self.assertEqual(
+                self.cache.fetch_people_by_ids_where([3, 1], JOIN_FRIEND_FILTER),
+                [self.friend],
+            )
+        self.assertEqual(self.db.calls.count(("fetch_people_by_ids_where", [3, 1])), 1)
+
+    def test_common_friend_ids_cached(self):
+        self.assertEqual(self.cache.fetch_common_friend_ids(1, 2), [3])
+        self.assertEqual(self.cache.fetch_common_friend_ids(1, 2), [3])
+        self.assertEqual(self.cache.stats()["common_friend_ids"]["hits"], 1)
+
+    def test_uncached_query_type(self):
+        cache = CachingDB(self.db, "v1", {"people": 10})
+        cache.fetch_company_by_id(1)
+        cache.fetch_company_by_id(1)
+
+        self.assertEqual(len(self.db.calls), 2)
@@ -0,0 +1,353 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from paranuara.friend_graph import FriendGraph, FriendGraphBuilder
+from paranuara.person import Person
+
+# company_id value stored for people that do not belong to a company
+NO_COMPANY = -1
+
+# utc offset stored for `registered` datetimes without a timezone
+NAIVE_OFFSET = -32768
+
+# The string fields of a person, in the order they are laid out in the heap
+STRING_FIELDS = (
+    "mongo_id",
+    "guid",
+    "picture",
+    "name",
+    "email",
+    "phone",
+    "address",
+    "about",
+    "greeting",
+)
+
+
+class Categorical:
+    """
+        Dictionary encoding for a low cardinality string column, each distinct
+        value is stored once and rows hold its integer code.
+    """
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code: int) -> str:
+        return self.values[code]
+
+
+class StringHeap:
+    """
+        All strings concatenated in a single utf-8 buffer, string `i` is the
+        slice `data[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, data: Optional[bytearray] = None, offsets=None) -> None:
+        self.data = bytearray() if data is None else data
+        self.offsets = array("Q", [0]) if offsets is None else offsets
+
+    def append(self, value: str) -> None:
+        self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+    def get(self, i: int) -> str:
+        return str(self.data[self.offsets[i] : self.offsets[i + 1]], "utf-8")
+
+
+def cents_from_decimal(balance: Decimal) -> int:
+    cents = balance.scaleb(2)
+    if cents != cents.to_integral_value():
+        raise ValueError("balance {} has more than 2 decimal places".format(balance))
+    return int(cents)
+
+
+def decimal_from_cents(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+def epoch_from_datetime(registered: datetime) -> Tuple[int, int]:
+    """
+        Returns the (seconds since epoch, utc offset in minutes) pair needed to
+        rebuild `registered`. Sub-second precision is dropped, people.json only
+        has whole seconds.
+    """
+    offset = registered.utcoffset()
+    if offset is None:
+        return int(registered.replace(tzinfo=timezone.utc).timestamp()), NAIVE_OFFSET
+    return int(registered.timestamp()), int(offset.total_seconds()) // 60
+
+
+def datetime_from_epoch(seconds: int, offset_minutes: int) -> datetime:
+    if offset_minutes == NAIVE_OFFSET:
+        return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+    return datetime.fromtimestamp(seconds, timezone(timedelta(minutes=offset_minutes)))
+
+
+class PeopleColumns:
+    """
+        Column oriented storage of people. Every per-person attribute lives in a
+        typed array indexed by row number, list attributes are stored as
+        offsets into a flat values array (compressed sparse rows).
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        has_died: Sequence[int],
+        balance_cents: Sequence[int],
+        age: Sequence[int],
+        eye_color: Sequence[int],
+        gender: Sequence[int],
+        company_id: Sequence[int],
+        registered_epoch: Sequence[int],
+        registered_offset: Sequence[int],
+        tag_offsets: Sequence[int],
+        tags: Sequence[int],
+        friend_offsets: Sequence[int],
+        friends: Sequence[int],
+        food_offsets: Sequence[int],
+        foods: Sequence[int],
+        sorted_ids: Sequence[int],
+        sorted_rows: Sequence[int],
+        company_ids: Sequence[int],
+        company_offsets: Sequence[int],
+        company_rows: Sequence[int],
+        strings: StringHeap,
+        eye_colors: Categorical,
+        genders: Categorical,
+        tag_values: Categorical,
+        food_values: Categorical,
+    ) -> None:
+        self.ids = ids
+        self.has_died = has_died
+        self.balance_cents = balance_cents
+        self.age = age
+        self.eye_color = eye_color
+        self.gender = gender
+        self.company_id = company_id
+        self.registered_epoch = registered_epoch
+        self.registered_offset = registered_offset
+        self.tag_offsets = tag_offsets
+        self.tags = tags
+        self.friend_offsets = friend_offsets
+        self.friends = friends
+        self.food_offsets = food_offsets
+        self.foods = foods
+        # ids in ascending order with the row that holds each of them
+        self.sorted_ids = sorted_ids
+        self.sorted_rows = sorted_rows
+        # rows grouped by company, company `company_ids[i]` owns the rows
+        # company_rows[company_offsets[i]:company_offsets[i + 1]] in id order
+        self.company_ids = company_ids
+        self.company_offsets = company_offsets
+        self.company_rows = company_rows
+        self.strings = strings
+        self.eye_colors = eye_colors
+        self.genders = genders
+        self.tag_values = tag_values
+        self.food_values = food_values
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def row_of_id(self, person_id: int) -> Optional[int]:
+        i = bisect_left(self.sorted_ids, person_id)
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == person_id:
+            return self.sorted_rows[i]
+        return None
+
+    def rows_of_company(self, company_id: int) -> Sequence[int]:
+        i = bisect_left(self.company_ids, company_id)
+        if i < len(self.company_ids) and self.company_ids[i] == company_id:
+            return self.company_rows[
+                self.company_offsets[i] : self.company_offsets[i + 1]
+            ]
+        return []
+
+    def rows_of_company_after(self, company_id: int, after_id: int) -> Sequence[int]:
+        """
+            The rows of `company_id` holding ids greater than `after_id`
+        """
+        rows = self.rows_of_company(company_id)
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.ids[rows[middle]] <= after_id:
+                low = middle + 1
+            else:
+                high = middle
+        return rows[low:]
+
+    def friend_ids(self, row: int) -> Sequence[int]:
+        return self.friends[self.friend_offsets[row] : self.friend_offsets[row + 1]]
+
+    def person(self, row: int) -> Person:
+        """
+            Materialise the `Person` stored at `row`
+        """
+        first_string = row * len(STRING_FIELDS)
+        strings = {
+            field: self.strings.get(first_string + i)
+            for i, field in enumerate(STRING_FIELDS)
+        }
+        company_id: Optional[int] = self.company_id[row]
+        if company_id == NO_COMPANY:
+            company_id = None
+        return Person(
+            id=self.ids[row],
+            has_died=bool(self.has_died[row]),
+            balance=decimal_from_cents(self.balance_cents[row]),
+            age=self.age[row],
+            eye_color=self.eye_colors.decode(self.eye_color[row]),
+            gender=self.genders.decode(self.gender[row]),
+            company_id=company_id,
+            registered=datetime_from_epoch(
+                self.registered_epoch[row], self.registered_offset[row]
+            ),
+            tags=[
+                self.tag_values.decode(code)
+                for code in self.tags[self.tag_offsets[row] : self.tag_offsets[row + 1]]
+            ],
+            friends=list(self.friend_ids(row)),
+            favourite_food=[
+                self.food_values.decode(code)
+                for code in self.foods[
+                    self.food_offsets[row] : self.food_offsets[row + 1]
+                ]
+            ],
+            **strings
+        )
+
+    def iter_people(self) -> Iterator[Person]:
+        for row in range(len(self)):
+            yield self.person(row)
+
+
+class PeopleColumnsBuilder:
+    """
+        Accumulates people one at a time so the full list of `Person` objects
+        never has to be held in memory.
+    """
+
+    def __init__(self) -> None:
+        self.ids = array("i")
+        self.has_died = array("b")
+        self.balance_cents = array("q")
+        self.age = array("i")
+        self.eye_color = array("I")
+        self.gender = array("I")
+        self.company_id = array("i")
+        self.registered_epoch = array("q")
+        self.registered_offset = array("h")
+        self.tag_offsets = array("Q", [0])
+        self.tags = array("I")
+        self.friend_offsets = array("Q", [0])
+        self.friends = array("i")
+        self.food_offsets = array("Q", [0])
+        self.foods = array("I")
+        self.strings = StringHeap()
+        self.eye_colors = Categorical()
+        self.genders = Categorical()
+        self.tag_values = Categorical()
+        self.food_values = Categorical()
+
+    def add(self, person: Person) -> None:
+        self.ids.append(person.id)
+        self.has_died.append(person.has_died)
+        self.balance_cents.append(cents_from_decimal(person.balance))
+        self.age.append(person.age)
+        self.eye_color.append(self.eye_colors.encode(person.eye_color))
+        self.gender.append(self.genders.encode(person.gender))
+        self.company_id.append(
+            NO_COMPANY if person.company_id is None else person.company_id
+        )
+        epoch, offset = epoch_from_datetime(person.registered)
+        self.registered_epoch.append(epoch)
+        self.registered_offset.append(offset)
+        self.tags.extend(self.tag_values.encode(tag) for tag in person.tags)
+        self.tag_offsets.append(len(self.tags))
+        self.friends.extend(person.friends)
+        self.friend_offsets.append(len(self.friends))
+        self.foods.extend(
+            self.food_values.encode(food) for food in person.favourite_food
+        )
+        self.food_offsets.append(len(self.foods))
+        for field in STRING_FIELDS:
+            self.strings.append(getattr(person, field))
+
+    def add_all(self, people: Iterable[Person]) -> "PeopleColumnsBuilder":
+        for person in people:
+            self.add(person)
+        return self
+
+    def build(self) -> PeopleColumns:
+        rows = range(len(self.ids))
+        by_id = sorted(rows, key=lambda row: self.ids[row])
+
+        by_company = sorted(
+            (row for row in rows if self.company_id[row] != NO_COMPANY),
+            key=lambda row: (self.company_id[row], self.ids[row]),
+        )
+        company_ids = array("i")
+        company_offsets = array("Q")
+        for i, row in enumerate(by_company):
+            if not company_ids or company_ids[-1] != self.company_id[row]:
+                company_ids.append(self.company_id[row])
+                company_offsets.append(i)
+        company_offsets.append(len(by_company))
+
+        return PeopleColumns(
+            ids=self.ids,
+            has_died=self.has_died,
+            balance_cents=self.balance_cents,
+            age=self.age,
+            eye_color=self.eye_color,
+            gender=self.gender,
+            company_id=self.company_id,
+            registered_epoch=self.registered_epoch,
+            registered_offset=self.registered_offset,
+            tag_offsets=self.tag_offsets,
+            tags=self.tags,
+            friend_offsets=self.friend_offsets,
+            friends=self.friends,
+            food_offsets=self.food_offsets,
+            foods=self.foods,
+            sorted_ids=array("i", (self.ids[row] for row in by_id)),
+            sorted_rows=array("i", by_id),
+            company_ids=company_ids,
+            company_offsets=company_offsets,
+            company_rows=array("i", by_company),
+            strings=self.strings,
+            eye_colors=self.eye_colors,
+            genders=self.genders,
+            tag_values=self.tag_values,
+            food_values=self.food_values,
+        )
+
+
+def friend_graph_from_columns(people: PeopleColumns) -> FriendGraph:
+    builder = FriendGraphBuilder()
+    # `is_join_friend` evaluated on the encoded columns
+    brown = people.eye_colors.codes.get("brown")
+    for row in range(len(people)):
+        builder.add(
+            people.ids[row],
+            people.friend_ids(row),
+            people.eye_color[row] == brown and not people.has_died[row],
+        )
+    return builder.build()
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import TestCase
+
+from paranuara.columnar import PeopleColumnsBuilder
+from paranuara.query_test import generate_person
+
+
+def generate_stored_person(id, company_id=None, friends=[]):
+    return generate_person(id=id, friends=friends)._replace(
+        company_id=company_id,
+        balance=Decimal("2418.59"),
+        registered=datetime(
+            2016, 7, 13, 12, 29, 7, tzinfo=timezone(timedelta(hours=-10))
+        ),
+        tags=["id", "quis"],
+        favourite_food=["orange", "celery"],
+        about="Ünïcode about",
+    )
+
+
+class PeopleColumnsTest(TestCase):
+    def test_round_trip(self):
+        person = generate_stored_person(id=4, company_id=2, friends=[1, 0])
+        no_company = generate_stored_person(id=1)._replace(
+            registered=datetime(2016, 7, 13, 12, 29, 7), has_died=True
+        )
+        columns = PeopleColumnsBuilder().add_all([person, no_company]).build()
+
+        self.assertEqual(list(columns.iter_people()), [person, no_company])
+
+    def test_row_of_id(self):
+        people = [generate_stored_person(id=id) for id in [7, 3, 5]]
+        columns = PeopleColumnsBuilder().add_all(people).build()
+
+        self.assertEqual(columns.row_of_id(3), 1)
+        self.assertEqual(columns.row_of_id(7), 0)
+        self.assertIsNone(columns.row_of_id(4))
+
+    def test_rows_of_company(self):
+        people = [
+            generate_stored_person(id=0, company_id=2),
+            generate_stored_person(id=1, company_id=1),
+            generate_stored_person(id=2, company_id=2),
+            generate_stored_person(id=3),
+        ]
+        columns = PeopleColumnsBuilder().add_all(people).build()
+
+        self.assertEqual(list(columns.rows_of_company(2)), [0, 2])
+        self.assertEqual(list(columns.rows_of_company(1)), [1])
+        self.assertEqual(list(columns.rows_of_company(3)), [])
@@ -0,0 +1,201 @@
+from collections import Counter
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Set
+
+from paranuara.columnar import (
+    NO_COMPANY,
+    PeopleColumns,
+    cents_from_decimal,
+    decimal_from_cents,
+)
+from paranuara.person import (
+    Person,
+    fruits_from_foods,
+    json_from_decimal,
+    vegetables_from_foods,
+)
+
+CENTS = Decimal("0.01")
+
+
+def decade_of(age: int) -> int:
+    return age - age % 10
+
+
+def count(counter: Counter, key: Any, change: int) -> None:
+    counter[key] += change
+    if not counter[key]:
+        del counter[key]
+
+
+class CompanyStats:
+    """
+        Aggregates over the employees of one company. Employees are counted in
+        and out one at a time, so a reload only recounts the people that
+        changed.
+    """
+
+    def __init__(self) -> None:
+        self.headcount = 0
+        self.dead = 0
+        self.age_sum = 0
+        self.ages_by_decade: Counter = Counter()
+        self.eye_colors: Counter = Counter()
+        # How many employees like each fruit or vegetable
+        self.fruits: Counter = Counter()
+        self.vegetables: Counter = Counter()
+        self.balance_cents = 0
+
+    def count_employee(
+        self,
+        has_died: bool,
+        age: int,
+        eye_color: str,
+        favourite_food: List[str],
+        balance_cents: int,
+        change: int = 1,
+    ) -> None:
+        """
+            Count an employee in, or out when `change` is -1
+        """
+        self.headcount += change
+        self.dead += change if has_died else 0
+        self.age_sum += age * change
+        count(self.ages_by_decade, decade_of(age), change)
+        count(self.eye_colors, eye_color, change)
+        for fruit in fruits_from_foods(favourite_food):
+            count(self.fruits, fruit, change)
+        for vegetable in vegetables_from_foods(favourite_food):
+            count(self.vegetables, vegetable, change)
+        self.balance_cents += balance_cents * change
+
+    def add(self, person: Person) -> None:
+        self.count_employee(
+            person.has_died,
+            person.age,
+            person.eye_color,
+            person.favourite_food,
+            cents_from_decimal(person.balance),
+        )
+
+    def remove(self, person: Person) -> None:
+        self.count_employee(
+            person.has_died,
+            person.age,
+            person.eye_color,
+            person.favourite_food,
+            cents_from_decimal(person.balance),
+            change=-1,
+        )
+
+    def merge(self, other: "CompanyStats") -> None:
+        """
+            Count in the employees counted by `other`
+        """
+        self.headcount += other.headcount
+        self.dead += other.dead
+        self.age_sum += other.age_sum
+        self.ages_by_decade.update(other.ages_by_decade)
+        self.eye_colors.update(other.eye_colors)
+        self.fruits.update(other.fruits)
+        self.vegetables.update(other.vegetables)
+        self.balance_cents += other.balance_cents
+
+    def copy(self) -> "CompanyStats":
+        stats = CompanyStats()
+        stats.__dict__.update(self.__dict__)
+        for name in ("ages_by_decade", "eye_colors", "fruits", "vegetables"):
+            setattr(stats, name, Counter(getattr(self, name)))
+        return stats
+
+
+def company_stats_from_people(people: Iterable[Person]) -> Dict[int, CompanyStats]:
+    """
+        Stats per company id, people without a company are left out
+    """
+    stats: Dict[int, CompanyStats] = {}
+    for person in people:
+        if person.company_id is not None:
+            stats.setdefault(person.company_id, CompanyStats()).add(person)
+    return stats
+
+
+def company_stats_from_columns(people: PeopleColumns) -> Dict[int, CompanyStats]:
+    """
+        `company_stats_from_people` read straight from the encoded columns
+    """
+    stats: Dict[int, CompanyStats] = {}
+    for row in range(len(people)):
+        company_id = people.company_id[row]
+        if company_id == NO_COMPANY:
+            continue
+        stats.setdefault(company_id, CompanyStats()).count_employee(
+            bool(people.has_died[row]),
+            people.age[row],
+            people.eye_colors.decode(people.eye_color[row]),
+            [
+                people.food_values.decode(code)
+                for code in people.foods[
+                    people.food_offsets[row] : people.food_offsets[row + 1]
+                ]
+            ],
+            people.balance_cents[row],
+        )
+    return stats
+
+
+def patch_company_stats(
+    stats: Dict[int, CompanyStats], removed: Iterable[Person], added: Iterable[Person]
+) -> Dict[int, CompanyStats]:
+    """
+        A copy of `stats` with the `removed` people counted out and the `added`
+        ones counted in. Only the stats of their companies are copied, `stats`
+        is left untouched for the requests still reading it.
+    """
+    patched = dict(stats)
+    copied: Set[int] = set()
+
+    def writable(company_id: int) -> CompanyStats:
+        if company_id not in copied:
+            copied.add(company_id)
+            patched[company_id] = patched.get(company_id, CompanyStats()).copy()
+        return patched[company_id]
+
+    for person in removed:
+        if person.company_id is not None:
+            writable(person.company_id).remove(person)
+    for person in added:
+        if person.company_id is not None:
+            writable(person.company_id).add(person)
+    for company_id in copied:
+        if not patched[company_id].headcount:
+            del patched[company_id]
+    return patched
+
+
+def json_from_company_stats(stats: CompanyStats) -> Dict[str, Any]:
+    balance = decimal_from_cents(stats.balance_cents)
+    return {
+        "headcount": stats.headcount,
+        "alive": stats.headcount - stats.dead,
+        "dead": stats.dead,
+        "age": {
+            "mean": stats.age_sum / stats.headcount if stats.headcount else None,
+            # Employees per decade of age, "20" counts the 20 to 29 year olds
+            "by_decade": {
+                str(decade): employees
+                for decade, employees in sorted(stats.ages_by_decade.items())
+            },
+        },
+        "eye_colors": dict(stats.eye_colors),
+        "fruits": dict(stats.fruits),
+        "vegetables": dict(stats.vegetables),
+        "balance": {
+            "sum": json_from_decimal(balance),
+            "mean": json_from_decimal(
+                (balance / stats.headcount).quantize(CENTS, ROUND_HALF_UP)
+            )
+            if stats.headcount
+            else None,
+        },
+    }
@@ -0,0 +1,77 @@
+from decimal import Decimal
+from unittest import TestCase
+
+from paranuara.columnar import PeopleColumnsBuilder
+from paranuara.columnar_test import generate_stored_person
+from paranuara.company_stats import (
+    company_stats_from_columns,
+    company_stats_from_people,
+    json_from_company_stats,
+    patch_company_stats,
+)
+
+
+def stats_json(stats):
+    return {
+        company_id: json_from_company_stats(company_stats)
+        for company_id, company_stats in stats.items()
+    }
+
+
+class CompanyStatsTest(TestCase):
+    def setUp(self):
+        self.people = [
+            generate_stored_person(id=0, company_id=1),
+            generate_stored_person(id=1, company_id=1)._replace(
+                has_died=True,
+                age=37,
+                eye_color="brown",
+                balance=Decimal("1.50"),
+                favourite_food=["apple", "banana", "celery"],
+            ),
+            generate_stored_person(id=2, company_id=2),
+            generate_stored_person(id=3),
+        ]
+
+    def test_company_stats(self):
+        stats = company_stats_from_people(self.people)
+
+        self.assertEqual(sorted(stats), [1, 2])
+        self.assertEqual(
+            json_from_company_stats(stats[1]),
+            {
+                "headcount": 2,
+                "alive": 1,
+                "dead": 1,
+                "age": {"mean": 23.5, "by_decade": {"10": 1, "30": 1}},
+                "eye_colors": {"red": 1, "brown": 1},
+                "fruits": {"orange": 1, "apple": 1, "banana": 1},
+                "vegetables": {"celery": 2},
+                "balance": {"sum": "2420.09", "mean": "1210.05"},
+            },
+        )
+
+    def test_from_columns(self):
+        columns = PeopleColumnsBuilder().add_all(self.people).build()
+
+        self.assertEqual(
+            stats_json(company_stats_from_columns(columns)),
+            stats_json(company_stats_from_people(self.people)),
+        )
+
+    def test_patch(self):
+        stats = company_stats_from_people(self.people)
+        moved = self.people[2]._replace(company_id=1, age=64)
+
+        patched = patch_company_stats(
+            stats, removed=[self.people[0], self.people[2]], added=[moved]
+        )
+
+        self.assertEqual(
+            stats_json(patched),
+            stats_json(company_stats_from_people([self.people[1], moved])),
+        )
+        # The stats that were patched are left as they were
+        self.assertEqual(
+            stats_json(stats), stats_json(company_stats_from_people(self.people))
+        )
@@ -0,0 +1,47 @@
+from itertools import islice
+from typing import Callable, Iterable, List, NamedTuple
+
+from paranuara.person import Person
+
+DEFAULT_BATCH_SIZE = 1000
+
+PeopleDiff = NamedTuple(
+    "PeopleDiff",
+    [
+        # People that were added or whose record changed, in input order
+        ("upserted", List[Person]),
+        ("removed_ids", List[int]),
+    ],
+)
+
+
+def diff_people(
+    old_ids: Iterable[int],
+    fetch_people_by_ids: Callable[[List[int]], List[Person]],
+    new_people: Iterable[Person],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> PeopleDiff:
+    """
+        Compares `new_people` with the people a backend holds, looking them up
+        `batch_size` at a time with the backend's `fetch_people_by_ids`.
+    """
+    seen_ids = set()
+    upserted = []
+    new_people = iter(new_people)
+    while True:
+        batch = list(islice(new_people, batch_size))
+        if not batch:
+            break
+        old_people = {
+            person.id: person
+            for person in fetch_people_by_ids([person.id for person in batch])
+        }
+        for person in batch:
+            seen_ids.add(person.id)
+            if old_people.get(person.id) != person:
+                upserted.append(person)
+
+    return PeopleDiff(
+        upserted=upserted,
+        removed_ids=[person_id for person_id in old_ids if person_id not in seen_ids],
+    )
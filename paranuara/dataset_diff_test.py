@@ -0,0 +1,21 @@
+from unittest import TestCase
+
+from paranuara.dataset_diff import diff_people
+from paranuara.query_test import generate_person
+
+
+class DiffPeopleTest(TestCase):
+    def test_diff(self):
+        old = {id: generate_person(id) for id in range(4)}
+        fetches = []
+
+        def fetch_people_by_ids(person_ids):
+            fetches.append(person_ids)
+            return [old[person_id] for person_id in person_ids if person_id in old]
+
+        new_people = [old[0], old[1]._replace(age=99), old[3], generate_person(7)]
+        diff = diff_people(list(old), fetch_people_by_ids, new_people, batch_size=3)
+
+        self.assertEqual(diff.upserted, [new_people[1], new_people[3]])
+        self.assertEqual(diff.removed_ids, [2])
+        self.assertEqual(fetches, [[0, 1, 3], [7]])
@@ -1,7 +1,22 @@
-from typing import Callable, List
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
 from paranuara.company import Company
+from paranuara.company_stats import CompanyStats
+from paranuara.dataset_diff import PeopleDiff
 from paranuara.person import Person
+from paranuara.person_filter import PersonFilter
+
+if TYPE_CHECKING:
+    from paranuara.graph import GraphAnalytics
 
 
 class CompanyNotFound(Exception):
@@ -13,14 +28,173 @@ class PersonNotFound(Exception):
 
 
 class ParanuaraDB:
+    """
+        The lookups every backend answers, plus optional ones a backend may
+        answer faster than `ParanuaraQuery` can on its own. An optional method
+        raises NotImplementedError unless its `supports_*` flag is set, check
+        the flag before calling it.
+    """
+
+    # Ids of the friends two people have in common that pass the friends_join
+    # filter
+    supports_fetch_common_friend_ids = False
+    # Both people in one lookup
+    supports_fetch_person_pair = False
+    # fetch_people_by_ids that only returns people matching the filter
+    supports_fetch_people_by_ids_where = False
+    # A company's employees page by page
+    supports_iter_people_by_company_id = False
+    # The people matching a filter page by page
+    supports_iter_people_where = False
+    # Reload a dataset by only writing the people that changed
+    supports_apply_changes = False
+    # Stats of every company, precomputed at load
+    supports_fetch_company_stats = False
+    # Friend network analytics over the backend's friend graph
+    supports_build_graph_analytics = False
+    # Every company
+    supports_fetch_companies = False
+
     def __init__(
         self,
         fetch_company_by_id: Callable[[int], Company],
         fetch_people_by_company_id: Callable[[int], List[Person]],
         fetch_person_by_id: Callable[[int], Person],
         fetch_people_by_ids: Callable[[List[int]], List[Person]],
+        fetch_common_friend_ids: Optional[Callable[[int, int], List[int]]] = None,
+        fetch_person_pair: Optional[Callable[[int, int], Tuple[Person, Person]]] = None,
+        fetch_people_by_ids_where: Optional[
+            Callable[[List[int], PersonFilter], List[Person]]
+        ] = None,
+        iter_people_by_company_id: Optional[
+            Callable[[int, Optional[int], Optional[int]], Iterator[Person]]
+        ] = None,
+        iter_people_where: Optional[
+            Callable[
+                [PersonFilter, Optional[int], Optional[int], Optional[int]],
+                Iterator[Person],
+            ]
+        ] = None,
+        apply_changes: Optional[
+            Callable[
+                [List[Company], Iterable[Person]], Tuple["ParanuaraDB", PeopleDiff]
+            ]
+        ] = None,
+        fetch_company_stats: Optional[Callable[[], Dict[int, CompanyStats]]] = None,
+        build_graph_analytics: "Optional[Callable[[], GraphAnalytics]]" = None,
+        fetch_companies: Optional[Callable[[], List[Company]]] = None,
     ) -> None:
         self.fetch_company_by_id = fetch_company_by_id
         self.fetch_people_by_company_id = fetch_people_by_company_id
         self.fetch_person_by_id = fetch_person_by_id
         self.fetch_people_by_ids = fetch_people_by_ids
+        self._fetch_common_friend_ids = fetch_common_friend_ids
+        self._fetch_person_pair = fetch_person_pair
+        self._fetch_people_by_ids_where = fetch_people_by_ids_where
+        self._iter_people_by_company_id = iter_people_by_company_id
+        self._iter_people_where = iter_people_where
+        self._apply_changes = apply_changes
+        self._fetch_company_stats = fetch_company_stats
+        self._build_graph_analytics = build_graph_analytics
+        self._fetch_companies = fetch_companies
+        self.supports_fetch_common_friend_ids = fetch_common_friend_ids is not None
+        self.supports_fetch_person_pair = fetch_person_pair is not None
+        self.supports_fetch_people_by_ids_where = fetch_people_by_ids_where is not None
+        self.supports_iter_people_by_company_id = iter_people_by_company_id is not None
+        self.supports_iter_people_where = iter_people_where is not None
+        self.supports_apply_changes = apply_changes is not None
+        self.supports_fetch_company_stats = fetch_company_stats is not None
+        self.supports_build_graph_analytics = build_graph_analytics is not None
+        self.supports_fetch_companies = fetch_companies is not None
+
+    def fetch_common_friend_ids(self, person1_id: int, person2_id: int) -> List[int]:
+        if self._fetch_common_friend_ids is None:
+            raise NotImplementedError
+        return self._fetch_common_friend_ids(person1_id, person2_id)
+
+    def fetch_person_pair(
+        self, person1_id: int, person2_id: int
+    ) -> Tuple[Person, Person]:
+        """
+            Raises PersonNotFound if either person is missing
+        """
+        if self._fetch_person_pair is None:
+            raise NotImplementedError
+        return self._fetch_person_pair(person1_id, person2_id)
+
+    def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        """
+            Rejected people never leave the database
+        """
+        if self._fetch_people_by_ids_where is None:
+            raise NotImplementedError
+        return self._fetch_people_by_ids_where(person_ids, person_filter)
+
+    def iter_people_by_company_id(
+        self,
+        company_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        """
+            A company's employees in ascending id order, lazily, starting after
+            the `after_id` cursor and stopping after `limit` people
+        """
+        if self._iter_people_by_company_id is None:
+            raise NotImplementedError
+        return self._iter_people_by_company_id(company_id, after_id, limit)
+
+    def iter_people_where(
+        self,
+        person_filter: PersonFilter,
+        company_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        """
+            The people matching the filter, of one company when a company id is
+            given, lazily in ascending id order after the `after_id` cursor and
+            stopping after `limit` people
+        """
+        if self._iter_people_where is None:
+            raise NotImplementedError
+        return self._iter_people_where(person_filter, company_id, after_id, limit)
+
+    def apply_changes(
+        self, companies: List[Company], people: Iterable[Person]
+    ) -> Tuple["ParanuaraDB", PeopleDiff]:
+        """
+            A db holding the given companies and people that only writes the
+            people that differ from this one, returned with the differences.
+            Used to reload a dataset without rebuilding it from scratch.
+        """
+        if self._apply_changes is None:
+            raise NotImplementedError
+        return self._apply_changes(companies, people)
+
+    def fetch_company_stats(self) -> Dict[int, CompanyStats]:
+        """
+            The stats of every company with employees by company id, reading
+            them does not touch the people
+        """
+        if self._fetch_company_stats is None:
+            raise NotImplementedError
+        return self._fetch_company_stats()
+
+    def build_graph_analytics(self) -> "GraphAnalytics":
+        """
+            Built once per loaded dataset
+        """
+        if self._build_graph_analytics is None:
+            raise NotImplementedError
+        return self._build_graph_analytics()
+
+    def fetch_companies(self) -> List[Company]:
+        """
+            Every company, in ascending id order
+        """
+        if self._fetch_companies is None:
+            raise NotImplementedError
+        return self._fetch_companies()
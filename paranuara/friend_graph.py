@@ -0,0 +1,120 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Sequence
+
+from paranuara.person import Person
+from paranuara.person_filter import JOIN_FRIEND_FILTER, person_matches
+
+
+def is_join_friend(person: Person) -> bool:
+    """
+        The people that are returned as friends in common by friends_join
+    """
+    return person_matches(person, JOIN_FRIEND_FILTER)
+
+
+class FriendGraph:
+    """
+        Friend lists stored once as a compressed sparse row adjacency. The
+        friends of `ids[i]` are `neighbours[offsets[i]:offsets[i + 1]]`, sorted
+        and without duplicates. `join_friends` is a bitmap with bit `i` set
+        when `is_join_friend` holds for `ids[i]`, so it takes a bit per person
+        whatever the ids are.
+    """
+
+    def __init__(
+        self,
+        ids: Sequence[int],
+        offsets: Sequence[int],
+        neighbours: Sequence[int],
+        join_friends: bytes,
+    ) -> None:
+        self.ids = ids
+        self.offsets = offsets
+        self.neighbours = neighbours
+        self.join_friends = join_friends
+
+    def index_of(self, person_id: int) -> Optional[int]:
+        i = bisect_left(self.ids, person_id)
+        if i < len(self.ids) and self.ids[i] == person_id:
+            return i
+        return None
+
+    def friend_ids(self, person_id: int) -> Sequence[int]:
+        i = self.index_of(person_id)
+        if i is None:
+            return []
+        return self.neighbours[self.offsets[i] : self.offsets[i + 1]]
+
+    def is_join_friend(self, person_id: int) -> bool:
+        i = self.index_of(person_id)
+        return i is not None and bool(self.join_friends[i >> 3] & (1 << (i & 7)))
+
+    def common_join_friend_ids(self, person1_id: int, person2_id: int) -> List[int]:
+        """
+            Merge the two sorted friend lists, only keeping the friends in
+            common that are set in the `join_friends` bitmap.
+        """
+        friends1 = self.friend_ids(person1_id)
+        friends2 = self.friend_ids(person2_id)
+        common = []
+        i, j = 0, 0
+        while i < len(friends1) and j < len(friends2):
+            friend1, friend2 = friends1[i], friends2[j]
+            if friend1 < friend2:
+                i += 1
+            elif friend2 < friend1:
+                j += 1
+            else:
+                if self.is_join_friend(friend1):
+                    common.append(friend1)
+                i += 1
+                j += 1
+        return common
+
+
+class FriendGraphBuilder:
+    """
+        Collects friend lists in load order, `build` lays them out by id.
+    """
+
+    def __init__(self) -> None:
+        self.ids = array("i")
+        self.offsets = array("Q", [0])
+        self.neighbours = array("i")
+        # 1 when `is_join_friend` holds, in load order
+        self.join_friend_flags = bytearray()
+
+    def add(self, person_id: int, friend_ids: Iterable[int], join_friend: bool) -> None:
+        self.ids.append(person_id)
+        self.neighbours.extend(sorted(set(friend_ids)))
+        self.offsets.append(len(self.neighbours))
+        self.join_friend_flags.append(join_friend)
+
+    def add_person(self, person: Person) -> None:
+        self.add(person.id, person.friends, is_join_friend(person))
+
+    def add_people(self, people: Iterable[Person]) -> "FriendGraphBuilder":
+        for person in people:
+            self.add_person(person)
+        return self
+
+    def build(self) -> FriendGraph:
+        by_id = sorted(range(len(self.ids)), key=lambda i: self.ids[i])
+        offsets = array("Q", [0])
+        neighbours = array("i")
+        for i in by_id:
+            neighbours.extend(self.neighbours[self.offsets[i] : self.offsets[i + 1]])
+            offsets.append(len(neighbours))
+
+        join_friends = bytearray((len(by_id) + 7) >> 3)
+        for index, i in enumerate(by_id):
+            if self.join_friend_flags[i]:
+                join_friends[index >> 3] |= 1 << (index & 7)
+
+        return FriendGraph(
+            ids=array("i", (self.ids[i] for i in by_id)),
+            offsets=offsets,
+            neighbours=neighbours,
+            join_friends=join_friends,
+        )
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from paranuara.friend_graph import FriendGraphBuilder
+
+
+class FriendGraphTest_common_join_friend_ids(TestCase):
+    def setUp(self):
+        builder = FriendGraphBuilder()
+        builder.add(person_id=2, friend_ids=[9, 3, 4, 3], join_friend=False)
+        builder.add(person_id=1, friend_ids=[4, 5, 3, 9], join_friend=False)
+        builder.add(person_id=3, friend_ids=[], join_friend=True)
+        builder.add(person_id=4, friend_ids=[], join_friend=False)
+        builder.add(person_id=5, friend_ids=[], join_friend=True)
+        self.graph = builder.build()
+
+    def test_friend_ids_sorted_without_duplicates(self):
+        self.assertEqual(list(self.graph.friend_ids(2)), [3, 4, 9])
+
+    def test_only_join_friends_in_common(self):
+        self.assertEqual(self.graph.common_join_friend_ids(1, 2), [3])
+
+    def test_unknown_person(self):
+        self.assertEqual(self.graph.common_join_friend_ids(1, 7), [])
+
+    def test_sparse_and_negative_ids(self):
+        builder = FriendGraphBuilder()
+        builder.add(person_id=2 ** 30, friend_ids=[-3, 8], join_friend=False)
+        builder.add(person_id=-3, friend_ids=[2 ** 30], join_friend=True)
+        builder.add(person_id=8, friend_ids=[2 ** 30], join_friend=True)
+        builder.add(person_id=-1, friend_ids=[-3, 8], join_friend=False)
+        graph = builder.build()
+
+        # One bit per person rather than per id up to the largest
+        self.assertEqual(len(graph.join_friends), 1)
+        self.assertEqual(graph.common_join_friend_ids(2 ** 30, -1), [-3, 8])
+        self.assertFalse(graph.is_join_friend(-1))
+        self.assertFalse(graph.is_join_friend(5))
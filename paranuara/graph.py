@@ -0,0 +1,236 @@
+import heapq
+from array import array
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from paranuara.db import PersonNotFound
+from paranuara.friend_graph import FriendGraph
+
+# Stored for ids without a row in the graph
+NO_ROW = -1
+
+# Stored for people that do not belong to a company
+NO_COMPANY = -1
+
+DegreeStats = NamedTuple(
+    "DegreeStats", [("min", int), ("max", int), ("mean", float), ("median", int)]
+)
+
+CompanyGraphStats = NamedTuple(
+    "CompanyGraphStats",
+    [
+        ("employees", int),
+        # Friend list lengths of the employees
+        ("degree", DegreeStats),
+        # Friend list entries naming a colleague
+        ("internal_links", int),
+        # Connected components of the employees linked by colleague friendships
+        ("components", int),
+        ("largest_component", int),
+        # Employees without a friendship to a colleague in either direction
+        ("isolated", int),
+    ],
+)
+
+
+def degree_stats(degrees: List[int]) -> DegreeStats:
+    if not degrees:
+        return DegreeStats(min=0, max=0, mean=0.0, median=0)
+    degrees = sorted(degrees)
+    return DegreeStats(
+        min=degrees[0],
+        max=degrees[-1],
+        mean=sum(degrees) / len(degrees),
+        median=degrees[(len(degrees) - 1) // 2],
+    )
+
+
+class GraphAnalytics:
+    """
+        Friend network queries answered on the integer adjacency of a
+        `FriendGraph`, without building `Person` objects. People are addressed
+        by their row in the graph, `row_of` maps ids to rows and assumes ids
+        are the dense person indexes of people.json.
+
+        Friendships are followed in the direction they are listed, except for
+        connected components which ignore the direction. The degree tables and
+        per company stats are computed up front.
+    """
+
+    def __init__(
+        self, friend_graph: FriendGraph, company_of: Callable[[int], Optional[int]]
+    ) -> None:
+        self.graph = friend_graph
+        ids = friend_graph.ids
+        # Ids are sorted and unique, so when the last one is len - 1 every
+        # id is its own row and no table is needed
+        self.size = len(ids)
+        self.dense = not self.size or (ids[0] == 0 and ids[-1] == len(ids) - 1)
+        self.rows = array("i")
+        if not self.dense:
+            self.rows = array("i", [NO_ROW]) * (max(ids) + 1)
+            for row, person_id in enumerate(ids):
+                self.rows[person_id] = row
+
+        offsets = friend_graph.offsets
+        self.degrees = array(
+            "i", (offsets[i + 1] - offsets[i] for i in range(len(ids)))
+        )
+        self.in_degrees = array("i", [0]) * len(ids)
+        for friend_id, count in Counter(friend_graph.neighbours).items():
+            row = self.row_of(friend_id)
+            if row != NO_ROW:
+                self.in_degrees[row] = count
+        self.by_degree = sorted(
+            range(len(ids)), key=lambda row: (-self.degrees[row], ids[row])
+        )
+        self.degree = degree_stats(list(self.degrees))
+        # How many friend lists each person appears in
+        self.in_degree = degree_stats(list(self.in_degrees))
+
+        self.company_ids = array(
+            "i",
+            (
+                NO_COMPANY if company_id is None else company_id
+                for company_id in map(company_of, ids)
+            ),
+        )
+        self.company_stats = self._company_stats()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def row_of(self, person_id: int) -> int:
+        if self.dense:
+            return person_id if 0 <= person_id < self.size else NO_ROW
+        if 0 <= person_id < len(self.rows):
+            return self.rows[person_id]
+        return NO_ROW
+
+    def _row(self, person_id: int) -> int:
+        row = self.row_of(person_id)
+        if row == NO_ROW:
+            raise PersonNotFound
+        return row
+
+    def _friend_rows(self, row: int) -> Sequence[int]:
+        offsets = self.graph.offsets
+        friend_ids = self.graph.neighbours[offsets[row] : offsets[row + 1]]
+        if self.dense:
+            # Friend lists are sorted, only friends that are not people
+            # need filtering out
+            if not friend_ids or (friend_ids[0] >= 0 and friend_ids[-1] < self.size):
+                return friend_ids
+            return [friend_id for friend_id in friend_ids if 0 <= friend_id < self.size]
+        rows = self.rows
+        return [
+            rows[friend_id]
+            for friend_id in friend_ids
+            if 0 <= friend_id < len(rows) and rows[friend_id] != NO_ROW
+        ]
+
+    def people_within(
+        self, person_id: int, depth: int, limit: int
+    ) -> Tuple[List[Tuple[int, int]], bool]:
+        """
+            Breadth first search from `person_id`, returns up to `limit`
+            (id, distance) pairs for the people 1 to `depth` hops away, nearest
+            first, and whether more people are in range than `limit`.
+        """
+        start = self._row(person_id)
+        seen = {start}
+        frontier = [start]
+        found: List[Tuple[int, int]] = []
+        for distance in range(1, depth + 1):
+            next_frontier = []
+            for row in frontier:
+                for friend_row in self._friend_rows(row):
+                    if friend_row in seen:
+                        continue
+                    if len(found) == limit:
+                        # Someone in range is left out
+                        return found, True
+                    seen.add(friend_row)
+                    next_frontier.append(friend_row)
+                    found.append((self.graph.ids[friend_row], distance))
+            frontier = next_frontier
+        return found, False
+
+    def suggested_friends(self, person_id: int, limit: int) -> List[Tuple[int, int]]:
+        """
+            The friends of friends who are not already friends, as up to `limit`
+            (id, mutual friend count) pairs, most mutual friends first.
+        """
+        row = self._row(person_id)
+        friend_rows = set(self._friend_rows(row))
+        mutual_counts: Dict[int, int] = {}
+        for friend_row in friend_rows:
+            for candidate in self._friend_rows(friend_row):
+                if candidate != row and candidate not in friend_rows:
+                    mutual_counts[candidate] = mutual_counts.get(candidate, 0) + 1
+        ids = self.graph.ids
+        return [
+            (ids[candidate], count)
+            for candidate, count in heapq.nsmallest(
+                limit, mutual_counts.items(), key=lambda item: (-item[1], ids[item[0]])
+            )
+        ]
+
+    def most_connected(self, limit: int) -> List[Tuple[int, int]]:
+        """
+            (id, friend count) of the `limit` people with the most friends
+        """
+        return [
+            (self.graph.ids[row], self.degrees[row]) for row in self.by_degree[:limit]
+        ]
+
+    def _company_stats(self) -> Dict[int, CompanyGraphStats]:
+        # Union find over the friendships between colleagues, path halving
+        parents = array("i", range(len(self)))
+
+        def find(row: int) -> int:
+            while parents[row] != row:
+                parents[row] = parents[parents[row]]
+                row = parents[row]
+            return row
+
+        employees: Dict[int, List[int]] = {}
+        internal_links: Counter = Counter()
+        linked = bytearray(len(self))
+        company_ids = self.company_ids
+        for row, company_id in enumerate(company_ids):
+            if company_id == NO_COMPANY:
+                continue
+            employees.setdefault(company_id, []).append(row)
+            colleague_rows = [
+                friend_row
+                for friend_row in self._friend_rows(row)
+                if company_ids[friend_row] == company_id and friend_row != row
+            ]
+            internal_links[company_id] += len(colleague_rows)
+            for friend_row in colleague_rows:
+                linked[row] = linked[friend_row] = 1
+                root, friend_root = find(row), find(friend_row)
+                if root != friend_root:
+                    parents[root] = friend_root
+
+        stats = {}
+        for company_id, rows in employees.items():
+            component_sizes = Counter(find(row) for row in rows)
+            stats[company_id] = CompanyGraphStats(
+                employees=len(rows),
+                degree=degree_stats([self.degrees[row] for row in rows]),
+                internal_links=internal_links[company_id],
+                components=len(component_sizes),
+                largest_component=max(component_sizes.values()),
+                isolated=sum(1 for row in rows if not linked[row]),
+            )
+        return stats
+
+    def company(self, company_id: int) -> CompanyGraphStats:
+        """
+            Stats of a company without employees are all zero
+        """
+        return self.company_stats.get(
+            company_id, CompanyGraphStats(0, degree_stats([]), 0, 0, 0, 0)
+        )
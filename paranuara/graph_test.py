@@ -0,0 +1,81 @@
+from unittest import TestCase
+
+from paranuara.db import PersonNotFound
+from paranuara.friend_graph import FriendGraphBuilder
+from paranuara.graph import GraphAnalytics
+
+
+def build_analytics(friends, companies):
+    builder = FriendGraphBuilder()
+    for person_id, friend_ids in friends.items():
+        builder.add(person_id, friend_ids, join_friend=False)
+    return GraphAnalytics(builder.build(), companies.get)
+
+
+class GraphAnalyticsTest(TestCase):
+    def setUp(self):
+        # 0 - 1 - 2 - 3, 1 - 4 - 2, 5 alone
+        self.analytics = build_analytics(
+            {0: [1], 1: [0, 2, 4], 2: [1, 3, 4], 3: [2], 4: [1, 2, 9], 5: [5]},
+            {0: 1, 1: 1, 2: 2, 3: 1, 4: 2, 5: 2},
+        )
+
+    def test_people_within(self):
+        self.assertEqual(
+            self.analytics.people_within(0, depth=2, limit=10),
+            ([(1, 1), (2, 2), (4, 2)], False),
+        )
+        self.assertEqual(
+            self.analytics.people_within(0, depth=3, limit=3),
+            ([(1, 1), (2, 2), (4, 2)], True),
+        )
+        # Exactly `limit` people in range
+        self.assertEqual(
+            self.analytics.people_within(0, depth=2, limit=3),
+            ([(1, 1), (2, 2), (4, 2)], False),
+        )
+        self.assertEqual(
+            self.analytics.people_within(5, depth=3, limit=10), ([], False)
+        )
+        with self.assertRaises(PersonNotFound):
+            self.analytics.people_within(7, depth=1, limit=10)
+
+    def test_suggested_friends(self):
+        self.assertEqual(self.analytics.suggested_friends(0, limit=5), [(2, 1), (4, 1)])
+        self.assertEqual(self.analytics.suggested_friends(3, limit=5), [(1, 1), (4, 1)])
+        self.assertEqual(self.analytics.suggested_friends(4, limit=1), [(0, 1)])
+
+    def test_degree_tables(self):
+        self.assertEqual(self.analytics.most_connected(2), [(1, 3), (2, 3)])
+        self.assertEqual(self.analytics.degree.max, 3)
+        self.assertEqual(self.analytics.degree.median, 1)
+        self.assertEqual(list(self.analytics.in_degrees), [1, 3, 3, 1, 2, 1])
+
+    def test_company_stats(self):
+        company1 = self.analytics.company(1)
+        self.assertEqual(company1.employees, 3)
+        self.assertEqual(company1.internal_links, 2)
+        self.assertEqual(company1.components, 2)
+        self.assertEqual(company1.largest_component, 2)
+        self.assertEqual(company1.isolated, 1)
+
+        company2 = self.analytics.company(2)
+        self.assertEqual(company2.employees, 3)
+        self.assertEqual(company2.components, 2)
+        self.assertEqual(company2.isolated, 1)
+
+        self.assertEqual(self.analytics.company(3).employees, 0)
+
+    def test_sparse_ids(self):
+        analytics = build_analytics(
+            {3: [10, 7], 7: [3, 20], 10: [20, 99], 20: [10]}, {3: 1, 10: 1, 20: 1}
+        )
+
+        self.assertEqual(
+            analytics.people_within(3, depth=2, limit=10),
+            ([(7, 1), (10, 1), (20, 2)], False),
+        )
+        self.assertEqual(analytics.suggested_friends(3, limit=5), [(20, 2)])
+        self.assertEqual(analytics.company(1).components, 1)
+        with self.assertRaises(PersonNotFound):
+            analytics.people_within(99, depth=1, limit=10)
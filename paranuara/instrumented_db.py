@@ -0,0 +1,108 @@
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from paranuara.company import Company
+from paranuara.company_stats import CompanyStats
+from paranuara.db import ParanuaraDB
+from paranuara.metrics import Histogram
+from paranuara.person import Person
+from paranuara.person_filter import PersonFilter
+
+
+class InstrumentedDB(ParanuaraDB):
+    """
+        Wraps another `ParanuaraDB` and observes how long each of its methods
+        takes in `histogram`, labelled with the backend and method names.
+    """
+
+    def __init__(self, db: ParanuaraDB, backend: str, histogram: Histogram) -> None:
+        self.db = db
+        self.backend = backend
+        self.histogram = histogram
+        self.supports_fetch_common_friend_ids = db.supports_fetch_common_friend_ids
+        self.supports_fetch_person_pair = db.supports_fetch_person_pair
+        self.supports_fetch_people_by_ids_where = db.supports_fetch_people_by_ids_where
+        self.supports_iter_people_by_company_id = db.supports_iter_people_by_company_id
+        self.supports_iter_people_where = db.supports_iter_people_where
+        self.supports_fetch_company_stats = db.supports_fetch_company_stats
+
+    def fetch_company_by_id(self, company_id: int) -> Company:
+        with self.histogram.time(self.backend, "fetch_company_by_id"):
+            return self.db.fetch_company_by_id(company_id)
+
+    def fetch_people_by_company_id(self, company_id: int) -> List[Person]:
+        with self.histogram.time(self.backend, "fetch_people_by_company_id"):
+            return self.db.fetch_people_by_company_id(company_id)
+
+    def fetch_person_by_id(self, person_id: int) -> Person:
+        with self.histogram.time(self.backend, "fetch_person_by_id"):
+            return self.db.fetch_person_by_id(person_id)
+
+    def fetch_people_by_ids(self, person_ids: List[int]) -> List[Person]:
+        with self.histogram.time(self.backend, "fetch_people_by_ids"):
+            return self.db.fetch_people_by_ids(person_ids)
+
+    def fetch_common_friend_ids(self, person1_id: int, person2_id: int) -> List[int]:
+        with self.histogram.time(self.backend, "fetch_common_friend_ids"):
+            return self.db.fetch_common_friend_ids(person1_id, person2_id)
+
+    def fetch_person_pair(
+        self, person1_id: int, person2_id: int
+    ) -> Tuple[Person, Person]:
+        with self.histogram.time(self.backend, "fetch_person_pair"):
+            return self.db.fetch_person_pair(person1_id, person2_id)
+
+    def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        with self.histogram.time(self.backend, "fetch_people_by_ids_where"):
+            return self.db.fetch_people_by_ids_where(person_ids, person_filter)
+
+    def fetch_company_stats(self) -> Dict[int, CompanyStats]:
+        with self.histogram.time(self.backend, "fetch_company_stats"):
+            return self.db.fetch_company_stats()
+
+    def iter_people_by_company_id(
+        self,
+        company_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        return self._observe_iter(
+            "iter_people_by_company_id",
+            lambda: self.db.iter_people_by_company_id(company_id, after_id, limit),
+        )
+
+    def iter_people_where(
+        self,
+        person_filter: PersonFilter,
+        company_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        return self._observe_iter(
+            "iter_people_where",
+            lambda: self.db.iter_people_where(
+                person_filter, company_id, after_id, limit
+            ),
+        )
+
+    def _observe_iter(
+        self, method: str, start: Callable[[], Iterator[Person]]
+    ) -> Iterator[Person]:
+        # Observed once the people are consumed, backends may fetch lazily
+        started = time.perf_counter()
+        people = start()
+        spent = time.perf_counter() - started
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    person = next(people)
+                except StopIteration:
+                    return
+                finally:
+                    spent += time.perf_counter() - started
+                yield person
+        finally:
+            self.histogram.observe(spent, self.backend, method)
@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from in_memory_db import InMemoryDB
+from paranuara.company import Company
+from paranuara.db import CompanyNotFound, ParanuaraDB
+from paranuara.instrumented_db import InstrumentedDB
+from paranuara.metrics import Histogram
+from paranuara.query_test import generate_person
+
+
+class InstrumentedDBTest(TestCase):
+    def setUp(self):
+        self.histogram = Histogram("h", "H", ["backend", "method"])
+        self.db = InstrumentedDB(
+            InMemoryDB(
+                companies=[Company(id=1, name="one")],
+                people=[generate_person(id)._replace(company_id=1) for id in range(3)],
+            ),
+            "inmemory",
+            self.histogram,
+        )
+
+    def count(self, method):
+        return self.histogram.count("inmemory", method)
+
+    def test_observes_calls_and_errors(self):
+        self.db.fetch_people_by_ids([0, 1])
+        with self.assertRaises(CompanyNotFound):
+            self.db.fetch_company_by_id(2)
+
+        self.assertEqual(self.count("fetch_people_by_ids"), 1)
+        self.assertEqual(self.count("fetch_company_by_id"), 1)
+
+    def test_observes_iteration_once_consumed(self):
+        people = self.db.iter_people_by_company_id(1, after_id=0)
+
+        self.assertEqual(self.count("iter_people_by_company_id"), 0)
+        self.assertEqual([person.id for person in people], [1, 2])
+        self.assertEqual(self.count("iter_people_by_company_id"), 1)
+
+    def test_keeps_missing_optional_methods(self):
+        db = InstrumentedDB(
+            ParanuaraDB(
+                fetch_company_by_id=None,
+                fetch_people_by_company_id=None,
+                fetch_person_by_id=None,
+                fetch_people_by_ids=None,
+            ),
+            "custom",
+            self.histogram,
+        )
+
+        self.assertFalse(db.supports_fetch_common_friend_ids)
+        self.assertFalse(db.supports_iter_people_by_company_id)
@@ -0,0 +1,186 @@
+import json
+import re
+from typing import Any, Iterator, Optional, TextIO
+
+WHITESPACE = " \t\n\r"
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Every byte but quotes and brackets, deleted to leave the json structure
+NOT_STRUCTURE = bytes(set(range(256)) - set(b'"{}[]'))
+OPENING = (b"{", b"[")
+CLOSING = (b"}", b"]")
+
+STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+
+
+def iter_json_array(fp: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+        Parse a file holding a top level json array one element at a time, only
+        the element being decoded (plus one chunk) is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill(size: int = chunk_size) -> bool:
+        nonlocal buffer, pos, eof
+        chunk = fp.read(size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def next_char() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                raise json.JSONDecodeError("Unexpected end of array", buffer, pos)
+
+    if next_char() != "[":
+        raise json.JSONDecodeError("Expecting '['", buffer, pos)
+    pos += 1
+    if next_char() == "]":
+        return
+
+    while True:
+        next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # A value touching the end of the buffer may be a truncated
+                # number, only trust it once the delimiter after it is seen
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            # Grow the read size with the partial value so a large element is
+            # not re-decoded once per chunk
+            fill(max(chunk_size, len(buffer) - pos))
+        pos = end
+        yield value
+
+        delimiter = next_char()
+        pos += 1
+        if delimiter == "]":
+            return
+        if delimiter != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos - 1)
+
+
+def unescaped(encoded: bytes) -> bytes:
+    """
+        `encoded` without its escaped quotes and backslashes, the only escapes
+        that could be mistaken for a string's end
+    """
+    pieces = []
+    start = 0
+    pos = encoded.find(b"\\")
+    while pos >= 0:
+        if encoded[pos + 1 : pos + 2] in (b"\\", b'"'):
+            pieces.append(encoded[start:pos])
+            start = pos + 2
+        pos = encoded.find(b"\\", pos + 2)
+    if not pieces:
+        return encoded
+    pieces.append(encoded[start:])
+    return b"".join(pieces)
+
+
+def structure(text: str) -> Optional[bytes]:
+    """
+        The brackets of `text` outside its strings, in order, or None when a
+        string holds a bracket. `text` must not start inside a string, one
+        left open at its end is dropped.
+    """
+    skeleton = unescaped(text.encode("utf-8")).translate(None, NOT_STRUCTURE)
+    quotes = skeleton.count(b'"')
+    if quotes % 2:
+        skeleton = skeleton[: skeleton.rindex(b'"')]
+        quotes -= 1
+    # Strings without brackets are left as "", the quotes only all pair up
+    # when every string is
+    if skeleton.count(b'""') * 2 != quotes:
+        return None
+    return skeleton.translate(None, b'"')
+
+
+def last_element_end(text: str) -> Optional[int]:
+    """
+        The end of the last object or array closed at the top level of `text`,
+        which starts between two elements of an array, or None
+    """
+    skeleton = structure(text)
+    if skeleton is None:
+        # Rare, the strings are blanked one by one so their brackets are gone
+        text = STRING.sub(lambda match: " " * len(match.group()), text)
+        skeleton = structure(text)
+        assert skeleton is not None
+    # Depth after the bracket looked at, walking back from the end
+    depth = sum(map(skeleton.count, OPENING)) - sum(map(skeleton.count, CLOSING))
+    for index in range(len(skeleton) - 1, -1, -1):
+        bracket = skeleton[index : index + 1]
+        if bracket in OPENING:
+            depth -= 1
+            continue
+        if depth == 0:
+            # Found from the end of `text`, past the brackets after it there
+            # and in a string left open at the end
+            char = bracket.decode()
+            end = len(text)
+            after = text.count(char) - skeleton.count(bracket, 0, index + 1)
+            for _ in range(after + 1):
+                end = text.rfind(char, 0, end)
+            return end + 1
+        depth += 1
+    return None
+
+
+def strip_separators(text: str) -> str:
+    text = text.strip(WHITESPACE)
+    # The comma separating the text from the one before it
+    if text.startswith(","):
+        text = text[1:].lstrip(WHITESPACE)
+    return text
+
+
+def iter_json_array_texts(
+    fp: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+        Split a file holding a top level json array of objects or arrays into
+        texts of about `chunk_size` characters, each holding whole elements
+        separated by commas, so `json.loads("[" + text + "]")` decodes them.
+        Nothing is decoded: the ends of elements are found by counting the
+        brackets outside strings, which `bytes` methods do without a Python
+        loop over the characters. Malformed json is only reported when the
+        texts are decoded.
+    """
+    buffer = fp.read(chunk_size).lstrip(WHITESPACE)
+    if not buffer.startswith("["):
+        raise json.JSONDecodeError("Expecting '['", buffer, 0)
+    buffer = buffer[1:]
+    while True:
+        chunk = fp.read(max(chunk_size, len(buffer)))
+        if not chunk:
+            text = buffer.rstrip(WHITESPACE)
+            if not text.endswith("]"):
+                raise json.JSONDecodeError("Unexpected end of array", text, len(text))
+            text = strip_separators(text[:-1])
+            if text:
+                yield text
+            return
+        buffer += chunk
+        end = last_element_end(buffer)
+        if end is not None:
+            text = strip_separators(buffer[:end])
+            buffer = buffer[end:]
+            yield text
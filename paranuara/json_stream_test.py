@@ -0,0 +1,74 @@
+import json
+from io import StringIO
+from unittest import TestCase
+
+from paranuara.json_stream import iter_json_array, iter_json_array_texts
+
+
+class IterJsonArrayTest(TestCase):
+    def test_matches_json_load(self):
+        with open("resources/people.json") as fp:
+            people = json.load(fp)
+        with open("resources/people.json") as fp:
+            self.assertEqual(list(iter_json_array(fp, chunk_size=7)), people)
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array(StringIO(" [ ] "))), [])
+
+    def test_number_split_across_chunks(self):
+        self.assertEqual(
+            list(iter_json_array(StringIO("[12345, 6789]"), chunk_size=2)),
+            [12345, 6789],
+        )
+
+    def test_is_lazy(self):
+        elements = iter_json_array(StringIO('[{"index": 0}, not json'), chunk_size=4)
+
+        self.assertEqual(next(elements), {"index": 0})
+        with self.assertRaises(json.JSONDecodeError):
+            next(elements)
+
+    def test_not_an_array(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array(StringIO('{"index": 0}')))
+
+    def test_truncated(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array(StringIO('[{"index": 0}, {"index"'), chunk_size=3))
+
+
+class IterJsonArrayTextsTest(TestCase):
+    def decode(self, text, chunk_size):
+        return [
+            element
+            for elements_text in iter_json_array_texts(StringIO(text), chunk_size)
+            for element in json.loads("[" + elements_text + "]")
+        ]
+
+    def test_matches_json_load(self):
+        with open("resources/people.json") as fp:
+            text = fp.read()
+        for chunk_size in (7, 5000, len(text)):
+            self.assertEqual(self.decode(text, chunk_size), json.loads(text))
+
+    def test_brackets_and_escapes_in_strings(self):
+        text = r'[{"a": "}]\\"}, ["\"{[", 1] , {"b": {"c": "\\\"]"}}, [] ]'
+
+        for chunk_size in range(1, len(text) + 1):
+            self.assertEqual(self.decode(text, chunk_size), json.loads(text))
+
+    def test_splits_between_elements(self):
+        texts = list(iter_json_array_texts(StringIO('[{"a": 1}, {"b": [2]}]'), 4))
+
+        self.assertEqual(texts, ['{"a": 1}', '{"b": [2]}'])
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array_texts(StringIO(" [ ] "))), [])
+
+    def test_not_an_array(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array_texts(StringIO('{"index": 0}')))
+
+    def test_truncated(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_array_texts(StringIO('[{"index": 0}, {"index"'), 3))
@@ -0,0 +1,29 @@
+import math
+from typing import Dict, List
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_samples: List[float], p: float) -> float:
+    """
+        Nearest-rank percentile of already sorted samples
+    """
+    rank = max(math.ceil(p / 100 * len(sorted_samples)), 1)
+    return sorted_samples[rank - 1]
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    """
+        Milliseconds statistics of request durations given in seconds
+    """
+    if not seconds:
+        return {"requests": 0}
+    samples = sorted(seconds)
+    summary = {
+        "requests": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "max_ms": samples[-1] * 1000,
+    }
+    for p in PERCENTILES:
+        summary["p{}_ms".format(p)] = percentile(samples, p) * 1000
+    return summary
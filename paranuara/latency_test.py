@@ -0,0 +1,23 @@
+from unittest import TestCase
+
+from paranuara.latency import latency_summary, percentile
+
+
+class LatencyTest(TestCase):
+    def test_percentile(self):
+        samples = list(range(1, 101))
+
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile([7], 90), 7)
+
+    def test_latency_summary(self):
+        summary = latency_summary([0.003, 0.001, 0.002])
+
+        self.assertEqual(summary["requests"], 3)
+        self.assertAlmostEqual(summary["p50_ms"], 2)
+        self.assertAlmostEqual(summary["max_ms"], 3)
+        self.assertAlmostEqual(summary["mean_ms"], 2)
+
+    def test_no_samples(self):
+        self.assertEqual(latency_summary([]), {"requests": 0})
@@ -0,0 +1,121 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Sequence
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Histogram as PrometheusHistogram,
+    generate_latest,
+)
+from prometheus_client.multiprocess import MultiProcessCollector
+
+# Bucket upper bounds, in seconds, of the duration histograms
+DURATION_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Bucket upper bounds of the result size histograms
+SIZE_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000, 100000)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Directory prometheus_client writes the samples of every process to when it is
+# set before prometheus_client is imported, see gunicorn.conf.py
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+
+def multiprocess_mode() -> bool:
+    return bool(os.environ.get(MULTIPROC_DIR_ENV))
+
+
+class Histogram:
+    """
+        A Prometheus histogram with one series per combination of label
+        values. In multiprocess mode observations are written to a memory
+        mapped file of this process in `PROMETHEUS_MULTIPROC_DIR`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = DURATION_BUCKETS,
+        registry: Optional[CollectorRegistry] = None,
+    ) -> None:
+        self.name = name
+        self.label_names = tuple(label_names)
+        self.histogram = PrometheusHistogram(
+            name, help, self.label_names, buckets=buckets, registry=registry
+        )
+
+    def observe(self, value: float, *label_values: str) -> None:
+        if self.label_names:
+            self.histogram.labels(*label_values).observe(value)
+        else:
+            self.histogram.observe(value)
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def count(self, *label_values: str) -> int:
+        """
+            Observations made by this process with `label_values`
+        """
+        for metric in self.histogram.collect():
+            for sample in metric.samples:
+                if (
+                    sample.name == self.name + "_count"
+                    and tuple(sample.labels.get(name) for name in self.label_names)
+                    == label_values
+                ):
+                    return int(sample.value)
+        return 0
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.registry = CollectorRegistry()
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> Histogram:
+        return Histogram(name, help, label_names, buckets, self.registry)
+
+    def exposition(self) -> bytes:
+        """
+            Every metric in the Prometheus text exposition format. In
+            multiprocess mode these are summed over the files of every
+            process, so any worker answers for all of them.
+        """
+        if multiprocess_mode():
+            registry = CollectorRegistry()
+            MultiProcessCollector(registry)
+            return generate_latest(registry)
+        return generate_latest(self.registry)
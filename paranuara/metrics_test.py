@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from paranuara.metrics import MULTIPROC_DIR_ENV, Histogram, MetricsRegistry
+
+# Observes one request in a process of its own, as a gunicorn worker would
+OBSERVE_IN_WORKER = """
+from paranuara.metrics import MetricsRegistry
+MetricsRegistry().histogram("latency_seconds", "Latency", ["route"]).observe(
+    0.5, "/a"
+)
+"""
+
+
+class HistogramTest(TestCase):
+    def test_exposition(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram(
+            "latency_seconds", "Latency", ["route"], buckets=[1, 5]
+        )
+        histogram.observe(0.5, "/a")
+        histogram.observe(1, "/a")
+        histogram.observe(7, "/a")
+
+        lines = registry.exposition().decode("utf-8").splitlines()
+        for line in [
+            "# HELP latency_seconds Latency",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{le="1.0",route="/a"} 2.0',
+            'latency_seconds_bucket{le="5.0",route="/a"} 2.0',
+            'latency_seconds_bucket{le="+Inf",route="/a"} 3.0',
+            'latency_seconds_sum{route="/a"} 8.5',
+            'latency_seconds_count{route="/a"} 3.0',
+        ]:
+            self.assertIn(line, lines)
+
+    def test_escapes_label_values(self):
+        registry = MetricsRegistry()
+        registry.histogram("h", "H", ["name"], buckets=[1]).observe(0, 'a"b\\')
+
+        self.assertIn(
+            'h_count{name="a\\"b\\\\"} 1.0',
+            registry.exposition().decode("utf-8").splitlines(),
+        )
+
+    def test_time(self):
+        histogram = Histogram("h", "H", ["name"])
+        with histogram.time("x"):
+            pass
+
+        self.assertEqual(histogram.count("x"), 1)
+        self.assertEqual(histogram.count("y"), 0)
+
+
+class MetricsRegistryTest(TestCase):
+    def test_exposition(self):
+        registry = MetricsRegistry()
+        registry.histogram("a", "A", [], buckets=[1]).observe(2)
+        registry.histogram("b", "B", [], buckets=[1])
+
+        lines = registry.exposition().decode("utf-8").splitlines()
+        self.assertIn('a_bucket{le="1.0"} 0.0', lines)
+        self.assertIn('a_bucket{le="+Inf"} 1.0', lines)
+        self.assertIn("a_count 1.0", lines)
+        self.assertIn("# TYPE b histogram", lines)
+
+    def test_sums_every_process(self):
+        with tempfile.TemporaryDirectory() as directory:
+            environ = dict(os.environ, **{MULTIPROC_DIR_ENV: directory})
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, "-c", OBSERVE_IN_WORKER], env=environ, check=True
+                )
+
+            with patch.dict(os.environ, {MULTIPROC_DIR_ENV: directory}):
+                lines = MetricsRegistry().exposition().decode("utf-8").splitlines()
+
+        self.assertIn('latency_seconds_count{route="/a"} 2.0', lines)
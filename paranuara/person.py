@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 from decimal import Decimal
 from typing import Any, Dict, List, NamedTuple, Optional
@@ -174,3 +175,10 @@ def json_from_person(person: Person) -> Dict[str, Any]:
     dict["friends"] = json_from_friends_list(dict["friends"])
     dict["registered"] = json_from_datetime(dict["registered"])
     return dict
+
+
+def json_bytes_from_person(person: Person) -> bytes:
+    # Same encoding as flask's jsonify: sorted keys, compact separators
+    return json.dumps(
+        json_from_person(person), sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
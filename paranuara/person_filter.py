@@ -0,0 +1,37 @@
+from typing import NamedTuple, Optional, Tuple
+
+from paranuara.person import Person
+
+
+class PersonFilter(NamedTuple):
+    """
+        Fields left as None, or empty, are not filtered on
+    """
+
+    eye_color: Optional[str] = None
+    has_died: Optional[bool] = None
+    gender: Optional[str] = None
+    # Inclusive bounds on the age
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+    # People must have every one of these
+    tags: Tuple[str, ...] = ()
+    favourite_food: Tuple[str, ...] = ()
+
+
+def person_matches(person: Person, person_filter: PersonFilter) -> bool:
+    return (
+        (person_filter.eye_color is None or person.eye_color == person_filter.eye_color)
+        and (
+            person_filter.has_died is None or person.has_died == person_filter.has_died
+        )
+        and (person_filter.gender is None or person.gender == person_filter.gender)
+        and (person_filter.min_age is None or person.age >= person_filter.min_age)
+        and (person_filter.max_age is None or person.age <= person_filter.max_age)
+        and all(tag in person.tags for tag in person_filter.tags)
+        and all(food in person.favourite_food for food in person_filter.favourite_food)
+    )
+
+
+# The friends in common returned by friends_join
+JOIN_FRIEND_FILTER = PersonFilter(eye_color="brown", has_died=False)
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from paranuara.person import Person, fruits_from_foods, vegetables_from_foods
+
+PersonSummary = NamedTuple(
+    "PersonSummary",
+    [("username", Optional[str]), ("fruits", List[str]), ("vegetables", List[str])],
+)
+
+# Summaries kept by default, those of the people requested most recently
+DEFAULT_MAX_ENTRIES = 100000
+
+
+class PersonSummaries:
+    """
+        The fields derived for /person/<id>, memoised in an LRU cache of at
+        most `max_entries` people so a large dataset is not held twice.
+        Feeding people through `add_all` while loading records the emails
+        `username_from_email` rejects up front, each is only reported once.
+    """
+
+    def __init__(
+        self,
+        username_from_email: Callable[[str], Optional[str]],
+        on_rejected_email: Callable[[Person], None] = lambda person: None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.username_from_email = username_from_email
+        self.on_rejected_email = on_rejected_email
+        self.max_entries = max_entries
+        self.summaries: "OrderedDict[int, PersonSummary]" = OrderedDict()
+        self.rejected_email_ids: List[int] = []
+        self.rejected: Set[int] = set()
+        # people liking the same foods share one fruits/vegetables split
+        self.food_splits: Dict[Tuple[str, ...], Tuple[List[str], List[str]]] = {}
+        self.lock = Lock()
+
+    def _summarise(self, person: Person) -> PersonSummary:
+        username = self.username_from_email(person.email)
+        if username is None and person.id not in self.rejected:
+            self.rejected.add(person.id)
+            self.rejected_email_ids.append(person.id)
+            self.on_rejected_email(person)
+
+        foods = tuple(person.favourite_food)
+        split = self.food_splits.get(foods)
+        if split is None:
+            split = (fruits_from_foods(foods), vegetables_from_foods(foods))
+            self.food_splits[foods] = split
+
+        return PersonSummary(username=username, fruits=split[0], vegetables=split[1])
+
+    def get(self, person: Person) -> PersonSummary:
+        with self.lock:
+            summary = self.summaries.get(person.id)
+            if summary is not None:
+                self.summaries.move_to_end(person.id)
+                return summary
+            summary = self._summarise(person)
+            if self.max_entries > 0:
+                self.summaries[person.id] = summary
+                if len(self.summaries) > self.max_entries:
+                    self.summaries.popitem(last=False)
+        return summary
+
+    def add_all(self, people: Iterable[Person]) -> Iterator[Person]:
+        for person in people:
+            self.get(person)
+            yield person
@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+from paranuara.person_summary import PersonSummaries, PersonSummary
+from paranuara.query_test import generate_person
+
+
+def username_from_email(email):
+    if "@" not in email:
+        return None
+    return email.split("@")[0]
+
+
+class PersonSummariesTest(TestCase):
+    def test_summary(self):
+        person = generate_person(id=1)._replace(
+            email="ahi@earthmark.com", favourite_food=["banana", "beetroot"]
+        )
+        summaries = PersonSummaries(username_from_email)
+
+        self.assertEqual(
+            summaries.get(person),
+            PersonSummary(username="ahi", fruits=["banana"], vegetables=["beetroot"]),
+        )
+
+    def test_computed_once(self):
+        emails = []
+
+        def counting_username_from_email(email):
+            emails.append(email)
+            return username_from_email(email)
+
+        person = generate_person(id=1)._replace(email="ahi@earthmark.com")
+        summaries = PersonSummaries(counting_username_from_email)
+        list(summaries.add_all([person]))
+        summaries.get(person)
+
+        self.assertEqual(emails, ["ahi@earthmark.com"])
+
+    def test_rejected_email_flagged_while_loading(self):
+        rejected = []
+        people = [
+            generate_person(id=1)._replace(email="ahi@earthmark.com"),
+            generate_person(id=2)._replace(email="not an email"),
+        ]
+        summaries = PersonSummaries(username_from_email, rejected.append)
+
+        self.assertEqual(list(summaries.add_all(people)), people)
+        self.assertEqual(rejected, [people[1]])
+        self.assertEqual(summaries.rejected_email_ids, [2])
+        self.assertIsNone(summaries.get(people[1]).username)
+
+    def test_keeps_most_recent_summaries(self):
+        people = [
+            generate_person(id=id)._replace(email="ahi{}@earthmark.com".format(id))
+            for id in range(3)
+        ]
+        summaries = PersonSummaries(username_from_email, max_entries=2)
+        list(summaries.add_all(people))
+        summaries.get(people[1])
+        summaries.get(people[0])
+
+        self.assertEqual(list(summaries.summaries), [1, 0])
+        self.assertEqual(summaries.get(people[2]).username, "ahi2")
+
+    def test_rejected_email_reported_once_when_evicted(self):
+        rejected = []
+        person = generate_person(id=1)._replace(email="not an email")
+        summaries = PersonSummaries(username_from_email, rejected.append, max_entries=0)
+        summaries.get(person)
+        summaries.get(person)
+
+        self.assertEqual(rejected, [person])
+        self.assertEqual(summaries.rejected_email_ids, [1])
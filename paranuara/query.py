@@ -1,7 +1,11 @@
-from typing import List, NamedTuple
+from itertools import islice
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 
+from paranuara.company_stats import CompanyStats
 from paranuara.db import ParanuaraDB
+from paranuara.friend_graph import is_join_friend
 from paranuara.person import Person
+from paranuara.person_filter import JOIN_FRIEND_FILTER, PersonFilter, person_matches
 
 JoinPeopleResponse = NamedTuple(
     "JoinPeopleResponse",
@@ -17,24 +21,157 @@ class ParanuaraQuery:
         company = self.db.fetch_company_by_id(company_id)
         return self.db.fetch_people_by_company_id(company.id)
 
+    def query_company_employees_page(
+        self,
+        company_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        """
+            Employees in ascending id order after the `after_id` cursor. Raises
+            CompanyNotFound straight away, the people are fetched lazily.
+        """
+        company = self.db.fetch_company_by_id(company_id)
+        if self.db.supports_iter_people_by_company_id:
+            return self.db.iter_people_by_company_id(company.id, after_id, limit)
+
+        people = sorted(
+            self.db.fetch_people_by_company_id(company.id), key=lambda person: person.id
+        )
+        return islice(
+            (person for person in people if after_id is None or person.id > after_id),
+            limit,
+        )
+
+    def query_company_employees_where(
+        self,
+        company_id: int,
+        person_filter: PersonFilter,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        """
+            `query_company_employees_page` keeping only the employees matching
+            `person_filter`. Backends that cannot filter have the employees
+            checked here.
+        """
+        company = self.db.fetch_company_by_id(company_id)
+        if self.db.supports_iter_people_where:
+            return self.db.iter_people_where(person_filter, company.id, after_id, limit)
+        employees = self.query_company_employees_page(company.id, after_id)
+        return islice(
+            (person for person in employees if person_matches(person, person_filter)),
+            limit,
+        )
+
+    def query_people_where(
+        self,
+        person_filter: PersonFilter,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        """
+            Everyone matching `person_filter` in ascending id order. Only
+            backends that support `iter_people_where` can list people, check
+            for it before calling.
+        """
+        return self.db.iter_people_where(person_filter, None, after_id, limit)
+
+    def query_company_stats(self, company_id: int) -> CompanyStats:
+        """
+            Backends without precomputed stats count the employees instead
+        """
+        company = self.db.fetch_company_by_id(company_id)
+        if self.db.supports_fetch_company_stats:
+            return self.db.fetch_company_stats().get(company.id) or CompanyStats()
+        stats = CompanyStats()
+        for person in self.db.fetch_people_by_company_id(company.id):
+            stats.add(person)
+        return stats
+
     def query_join_friends(
         self, person1_id: int, person2_id: int
     ) -> JoinPeopleResponse:
-        person1 = self.db.fetch_person_by_id(person1_id)
-        person2 = self.db.fetch_person_by_id(person2_id)
-        friend_ids_in_common = set(person1.friends) & set(person2.friends)
-        friends_in_common_full = self.db.fetch_people_by_ids(list(friend_ids_in_common))
+        if self.db.supports_fetch_person_pair:
+            person1, person2 = self.db.fetch_person_pair(person1_id, person2_id)
+        else:
+            person1 = self.db.fetch_person_by_id(person1_id)
+            person2 = self.db.fetch_person_by_id(person2_id)
 
-        friends_in_common = [
-            friend
-            for friend in friends_in_common_full
-            if friend.eye_color == "brown"
-            and not friend.has_died
-        ]
+        friends_in_common = self._fetch_join_friends(
+            self._common_friend_ids(person1, person2)
+        )
 
         return JoinPeopleResponse(
             person1=person1, person2=person2, friends_in_common=friends_in_common
         )
 
+    def query_join_friends_batch(
+        self, pairs: List[Tuple[int, int]]
+    ) -> List[Optional[JoinPeopleResponse]]:
+        """
+            Joins many pairs with one fetch for all the people named in `pairs`
+            and one fetch for the deduplicated friends in common of every pair.
+            Pairs naming an unknown person are None in the result.
+        """
+        people = self.query_people([person_id for pair in pairs for person_id in pair])
+        common_friend_ids = [
+            self._common_friend_ids(people[person1_id], people[person2_id])
+            if person1_id in people and person2_id in people
+            else None
+            for person1_id, person2_id in pairs
+        ]
+        friend_ids = list(
+            dict.fromkeys(
+                friend_id
+                for friend_ids in common_friend_ids
+                if friend_ids is not None
+                for friend_id in friend_ids
+            )
+        )
+        friends = {
+            friend.id: friend
+            for friend in (self._fetch_join_friends(friend_ids) if friend_ids else [])
+        }
+
+        return [
+            None
+            if friend_ids is None
+            else JoinPeopleResponse(
+                person1=people[person1_id],
+                person2=people[person2_id],
+                friends_in_common=[
+                    friends[friend_id]
+                    for friend_id in friend_ids
+                    if friend_id in friends
+                ],
+            )
+            for (person1_id, person2_id), friend_ids in zip(pairs, common_friend_ids)
+        ]
+
     def query_person(self, person_id: int) -> Person:
         return self.db.fetch_person_by_id(person_id)
+
+    def query_people(self, person_ids: List[int]) -> Dict[int, Person]:
+        """
+            One fetch for the whole batch, unknown ids are missing from the result
+        """
+        people = self.db.fetch_people_by_ids(list(dict.fromkeys(person_ids)))
+        return {person.id: person for person in people}
+
+    def _common_friend_ids(self, person1: Person, person2: Person) -> List[int]:
+        if self.db.supports_fetch_common_friend_ids:
+            return self.db.fetch_common_friend_ids(person1.id, person2.id)
+        return sorted(set(person1.friends) & set(person2.friends))
+
+    def _fetch_join_friends(self, friend_ids: List[int]) -> List[Person]:
+        if self.db.supports_fetch_common_friend_ids:
+            # The backend already filtered, only fetch the people we return
+            return self.db.fetch_people_by_ids(friend_ids)
+        if self.db.supports_fetch_people_by_ids_where:
+            return self.db.fetch_people_by_ids_where(friend_ids, JOIN_FRIEND_FILTER)
+        return [
+            friend
+            for friend in self.db.fetch_people_by_ids(friend_ids)
+            if is_join_friend(friend)
+        ]
@@ -5,6 +5,7 @@ from unittest import TestCase
 from paranuara.company import Company
 from paranuara.db import CompanyNotFound, ParanuaraDB, PersonNotFound
 from paranuara.person import Person
+from paranuara.person_filter import JOIN_FRIEND_FILTER, PersonFilter
 from paranuara.query import JoinPeopleResponse, ParanuaraQuery
 
 
@@ -82,6 +83,113 @@ class ParanuaraQueryTest_query_company_employees(TestCase):
             query.query_company_employees(company_id=0)
 
 
+class ParanuaraQueryTest_query_company_employees_page(TestCase):
+    def test_fallback_pages_in_id_order(self):
+        people = [generate_person(id=id) for id in [5, 1, 3, 7]]
+        company = Company(id=0, name="test")
+        query = ParanuaraQuery(
+            db=ParanuaraDB(
+                fetch_company_by_id=lambda id: company,
+                fetch_people_by_company_id=lambda id: people,
+                fetch_people_by_ids=None,
+                fetch_person_by_id=None,
+            )
+        )
+
+        result = query.query_company_employees_page(company_id=0, after_id=1, limit=2)
+
+        self.assertEqual(list(result), [people[2], people[0]])
+
+    def test_uses_iter_people_by_company_id(self):
+        person = generate_person(id=1)
+        company = Company(id=0, name="test")
+        calls = []
+
+        def iter_people_by_company_id(company_id, after_id, limit):
+            calls.append((company_id, after_id, limit))
+            return iter([person])
+
+        query = ParanuaraQuery(
+            db=ParanuaraDB(
+                fetch_company_by_id=lambda id: company,
+                fetch_people_by_company_id=None,
+                fetch_people_by_ids=None,
+                fetch_person_by_id=None,
+                iter_people_by_company_id=iter_people_by_company_id,
+            )
+        )
+
+        result = query.query_company_employees_page(company_id=0, after_id=0, limit=5)
+
+        self.assertEqual(list(result), [person])
+        self.assertEqual(calls, [(0, 0, 5)])
+
+    def test_no_company_raises_before_iterating(self):
+        def fetch_company_by_id(id):
+            raise CompanyNotFound()
+
+        query = ParanuaraQuery(
+            db=ParanuaraDB(
+                fetch_company_by_id=fetch_company_by_id,
+                fetch_people_by_company_id=None,
+                fetch_people_by_ids=None,
+                fetch_person_by_id=None,
+            )
+        )
+
+        with self.assertRaises(CompanyNotFound):
+            query.query_company_employees_page(company_id=0)
+
+
+class ParanuaraQueryTest_query_company_employees_where(TestCase):
+    def test_fallback_filters_employees(self):
+        people = [
+            generate_person(id=id, eye_color=eye_color)
+            for id, eye_color in [(5, "brown"), (1, "brown"), (3, "blue"), (7, "brown")]
+        ]
+        company = Company(id=0, name="test")
+        query = ParanuaraQuery(
+            db=ParanuaraDB(
+                fetch_company_by_id=lambda id: company,
+                fetch_people_by_company_id=lambda id: people,
+                fetch_people_by_ids=None,
+                fetch_person_by_id=None,
+            )
+        )
+
+        result = query.query_company_employees_where(
+            0, PersonFilter(eye_color="brown"), after_id=1, limit=1
+        )
+
+        self.assertEqual(list(result), [people[0]])
+
+    def test_uses_iter_people_where(self):
+        person = generate_person(id=1)
+        company = Company(id=0, name="test")
+        calls = []
+
+        def iter_people_where(person_filter, company_id, after_id, limit):
+            calls.append((person_filter, company_id, after_id, limit))
+            return iter([person])
+
+        query = ParanuaraQuery(
+            db=ParanuaraDB(
+                fetch_company_by_id=lambda id: company,
+                fetch_people_by_company_id=None,
+                fetch_people_by_ids=None,
+                fetch_person_by_id=None,
+                iter_people_where=iter_people_where,
+            )
+        )
+
+        result = query.query_company_employees_where(
+            0, PersonFilter(gender="female"), limit=5
+        )
+
+        self.assertEqual(list(result), [person])
+        self.assertEqual(calls, [(PersonFilter(gender="female"), 0, None, 5)])
+
+
 class ParanuaraQueryTest_query_person(TestCase):
     def test_not_found(self):
         def fetch_person_by_id(id):
@@ -267,3 +375,118 @@ class ParanuaraQueryTest_query_join_friends(TestCase):
             result,
             JoinPeopleResponse(person1=person1, person2=person2, friends_in_common=[]),
         )
+
+    def test_fetch_common_friend_ids(self):
+        person1 = generate_person(1, friends=[3, 4])
+        person2 = generate_person(2, friends=[3, 4])
+        friend_in_common = generate_person(3, eye_color="brown", has_died=False)
+        people = {1: person1, 2: person2, 3: friend_in_common}
+        fetched_ids = []
+
+        def fetch_people_by_ids(ids):
+            fetched_ids.extend(ids)
+            return [people.get(id) for id in ids]
+
+        query = ParanuaraQuery(
+            db=ParanuaraDB(
+                fetch_company_by_id=None,
+                fetch_people_by_company_id=None,
+                fetch_people_by_ids=fetch_people_by_ids,
+                fetch_person_by_id=lambda id: people.get(id),
+                fetch_common_friend_ids=lambda id1, id2: [3],
+            )
+        )
+
+        result = query.query_join_friends(person1_id=1, person2_id=2)
+
+        self.assertEqual(
+            result,
+            JoinPeopleResponse(
+                person1=person1, person2=person2, friends_in_common=[friend_in_common]
+            ),
+        )
+        self.assertEqual(fetched_ids, [3])
+
+    def test_fetch_person_pair_and_people_by_ids_where(self):
+        person1 = generate_person(1, friends=[3, 4])
+        person2 = generate_person(2, friends=[3, 4, 5])
+        friend_in_common = generate_person(3, eye_color="brown", has_died=False)
+        people = {1: person1, 2: person2, 3: friend_in_common}
+        filters = []
+
+        def fetch_people_by_ids_where(ids, person_filter):
+            filters.append((sorted(ids), person_filter))
+            return [friend_in_common]
+
+        query = ParanuaraQuery(
+            db=ParanuaraDB(
+                fetch_company_by_id=None,
+                fetch_people_by_company_id=None,
+                fetch_people_by_ids=None,
+                fetch_person_by_id=None,
+                fetch_person_pair=lambda id1, id2: (people[id1], people[id2]),
+                fetch_people_by_ids_where=fetch_people_by_ids_where,
+            )
+        )
+
+        result = query.query_join_friends(person1_id=1, person2_id=2)
+
+        self.assertEqual(
+            result,
+            JoinPeopleResponse(
+                person1=person1, person2=person2, friends_in_common=[friend_in_common]
+            ),
+        )
+        self.assertEqual(filters, [([3, 4], JOIN_FRIEND_FILTER)])
+
+
+class ParanuaraQueryTest_batches(TestCase):
+    def generate_query(self, people, fetched_ids):
+        def fetch_people_by_ids(ids):
+            fetched_ids.append(list(ids))
+            return [people[id] for id in ids if id in people]
+
+        return ParanuaraQuery(
+            db=ParanuaraDB(
+                fetch_company_by_id=None,
+                fetch_people_by_company_id=None,
+                fetch_people_by_ids=fetch_people_by_ids,
+                fetch_person_by_id=None,
+            )
+        )
+
+    def test_query_people_single_fetch(self):
+        person1 = generate_person(1)
+        person2 = generate_person(2)
+        fetched_ids = []
+        query = self.generate_query({1: person1, 2: person2}, fetched_ids)
+
+        result = query.query_people([2, 9, 1, 2])
+
+        self.assertEqual(result, {1: person1, 2: person2})
+        self.assertEqual(fetched_ids, [[2, 9, 1]])
+
+    def test_query_join_friends_batch(self):
+        person1 = generate_person(1, friends=[3, 4])
+        person2 = generate_person(2, friends=[3, 4])
+        friend3 = generate_person(3, eye_color="brown")
+        friend4 = generate_person(4, eye_color="blue")
+        people = {1: person1, 2: person2, 3: friend3, 4: friend4}
+        fetched_ids = []
+        query = self.generate_query(people, fetched_ids)
+
+        result = query.query_join_friends_batch([(1, 2), (2, 1), (1, 9)])
+
+        self.assertEqual(
+            result,
+            [
+                JoinPeopleResponse(
+                    person1=person1, person2=person2, friends_in_common=[friend3]
+                ),
+                JoinPeopleResponse(
+                    person1=person2, person2=person1, friends_in_common=[friend3]
+                ),
+                None,
+            ],
+        )
+        self.assertEqual(fetched_ids, [[1, 2, 9], [3, 4]])
@@ -0,0 +1,67 @@
+from threading import Event, Lock, Thread
+from typing import Callable, Generic, List, Optional, TypeVar
+
+from paranuara.snapshot import FileStats, file_stats, source_checksum
+
+T = TypeVar("T")
+
+
+class Reloadable(Generic[T]):
+    """
+        Holds the value built from the contents of `paths` and rebuilds it
+        when they change. `build(version, previous)` runs on the thread that
+        noticed the change while `current` keeps serving the previous value,
+        which is then replaced in a single assignment. Readers that took a
+        reference to `current` keep using it until they let go.
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        version: str,
+        current: T,
+        build: Callable[[str, T], T],
+    ) -> None:
+        self.paths = paths
+        self.version = version
+        self.current = current
+        self.build = build
+        self.stats: Optional[FileStats] = file_stats(paths)
+        self.lock = Lock()
+        self.stopped = Event()
+
+    def reload_if_changed(self) -> bool:
+        """
+            Returns whether a new value was swapped in. The files are only
+            hashed once their modification time or size changed.
+        """
+        with self.lock:
+            stats = file_stats(self.paths)
+            if stats == self.stats:
+                return False
+            # Remembered before building, files that are still being written
+            # fail to build and are retried once they change again
+            self.stats = stats
+            version = source_checksum(self.paths)
+            if version == self.version:
+                return False
+            self.current = self.build(version, self.current)
+            self.version = version
+            return True
+
+    def start_polling(
+        self, interval: float, on_error: Callable[[Exception], None]
+    ) -> Thread:
+        def poll() -> None:
+            while not self.stopped.wait(interval):
+                try:
+                    self.reload_if_changed()
+                except Exception as error:
+                    on_error(error)
+
+        thread = Thread(target=poll, name="dataset-reloader", daemon=True)
+        thread.start()
+        return thread
+
+    def stop_polling(self) -> None:
+        self.stopped.set()
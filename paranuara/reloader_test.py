@@ -0,0 +1,65 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from paranuara.reloader import Reloadable
+from paranuara.snapshot import source_checksum
+
+
+class ReloadableTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "people.json")
+        self.write("[1]")
+        self.builds = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, contents):
+        with open(self.path, "w") as fp:
+            fp.write(contents)
+        # Filesystems with coarse timestamps would otherwise hide the change
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def build(self, version, previous):
+        self.builds.append((version, previous))
+        return previous + 1
+
+    def reloadable(self):
+        return Reloadable([self.path], source_checksum([self.path]), 0, self.build)
+
+    def test_unchanged(self):
+        reloadable = self.reloadable()
+
+        self.assertFalse(reloadable.reload_if_changed())
+        self.assertEqual(reloadable.current, 0)
+
+    def test_changed(self):
+        reloadable = self.reloadable()
+        self.write("[1, 2]")
+
+        self.assertTrue(reloadable.reload_if_changed())
+        self.assertEqual(reloadable.current, 1)
+        self.assertEqual(reloadable.version, source_checksum([self.path]))
+        self.assertFalse(reloadable.reload_if_changed())
+
+    def test_touched_with_same_contents(self):
+        reloadable = self.reloadable()
+        self.write("[1]")
+
+        self.assertFalse(reloadable.reload_if_changed())
+        self.assertEqual(self.builds, [])
+
+    def test_failed_build_keeps_current(self):
+        reloadable = self.reloadable()
+        reloadable.build = lambda version, previous: int("not json")
+        self.write("[1, ")
+
+        with self.assertRaises(ValueError):
+            reloadable.reload_if_changed()
+        self.assertEqual(reloadable.current, 0)
+        reloadable.build = self.build
+        self.write("[1, 2]")
+        self.assertTrue(reloadable.reload_if_changed())
@@ -0,0 +1,377 @@
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from itertools import groupby
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from paranuara.bitmap_index import iter_bitmap_ids
+from paranuara.company import Company
+from paranuara.person import Person
+
+TOKEN = re.compile(r"[^\W_]+")
+
+# Points a query token scores for the best field it matches a person in, twice
+# as many when it is the whole indexed term rather than a prefix of it
+FIELD_WEIGHTS = {"name": 8, "company": 4, "email": 4, "tags": 2, "address": 1}
+EXACT_MULTIPLIER = 2
+
+# Terms searched for a query token that prefixes many, alphabetically first
+PREFIX_TERMS_MAX = 100
+
+# Terms held by at least one in this many people also get a bitmap, at most 8
+# times the size of their posting list
+DENSE_SHARE = 256
+
+# Ids a query's rarest token may match for the other tokens to be looked up
+# for each of them, when every token matches more they are intersected as
+# bitmaps
+DICT_MAX = 10000
+
+# Roughly how many ids can be looked up in a dict in the time of one bisect
+BISECT_COST = 10
+
+SearchResult = NamedTuple("SearchResult", [("id", int), ("score", int)])
+
+# An indexed term a query token matches: the score it is worth, the sorted ids
+# of the people holding it and, for dense terms, the same ids as a bitmap
+Hit = NamedTuple(
+    "Hit", [("score", int), ("ids", Sequence[int]), ("bitmap", Optional[int])]
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+# The terms a person is indexed under, per searchable field. People are found
+# by company name through `company_id`, see `SearchIndexBuilder.build`
+PERSON_FIELDS: Dict[str, Callable[[Person], Iterable[str]]] = {
+    "name": lambda person: tokenize(person.name),
+    "email": lambda person: tokenize(person.email),
+    "tags": lambda person: [term for tag in person.tags for term in tokenize(tag)],
+    "address": lambda person: tokenize(person.address),
+}
+
+
+def hits_size(hits: List[Hit]) -> int:
+    return sum(len(hit.ids) for hit in hits)
+
+
+def contains(ids: Sequence[int], person_id: int) -> bool:
+    i = bisect_left(ids, person_id)
+    return i < len(ids) and ids[i] == person_id
+
+
+def best_scores(hits: List[Hit]) -> Dict[int, int]:
+    """
+        The best score of every person in `hits`, which are sorted best first
+    """
+    scores: Dict[int, int] = {}
+    for hit in reversed(hits):
+        scores.update(dict.fromkeys(hit.ids, hit.score))
+    return scores
+
+
+def candidate_scores(hits: List[Hit], candidates: Dict[int, int]) -> Dict[int, int]:
+    """
+        `best_scores` of only the people in `candidates`. Short posting lists
+        are looked up in the candidates, the candidates in long ones.
+    """
+    scores: Dict[int, int] = {}
+    for hit in reversed(hits):
+        if len(hit.ids) <= len(candidates) * BISECT_COST:
+            matched: Iterable[int] = candidates.keys() & hit.ids
+        else:
+            matched = [
+                person_id for person_id in candidates if contains(hit.ids, person_id)
+            ]
+        scores.update(dict.fromkeys(matched, hit.score))
+    return scores
+
+
+def rank_hits(hits: List[Hit], limit: int) -> List[SearchResult]:
+    """
+        The best `limit` people for a single token. The posting lists of each
+        score are merged in id order, best score first, skipping the people
+        already listed with a better one. A score is only reached when every
+        person with a better one was listed, so only the ids returned and the
+        ones skipped are read.
+    """
+    results: List[SearchResult] = []
+    listed: Set[int] = set()
+    for score, tier in groupby(hits, key=attrgetter("score")):
+        for person_id in heapq.merge(*(hit.ids for hit in tier)):
+            if person_id not in listed:
+                listed.add(person_id)
+                results.append(SearchResult(person_id, score))
+                if len(results) == limit:
+                    return results
+    return results
+
+
+class FieldIndex:
+    """
+        The people holding each term of a field, as a compressed sparse row
+        table like `FriendGraph`. The ids of the people with `terms[i]` are
+        `postings[offsets[i]:offsets[i + 1]]`, sorted and without duplicates,
+        and are also in `bitmaps[i]` when the term is dense.
+    """
+
+    def __init__(
+        self,
+        terms: List[str],
+        offsets: Sequence[int],
+        postings: Sequence[int],
+        bitmaps: Dict[int, int],
+    ) -> None:
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.bitmaps = bitmaps
+        # Slices of a memoryview share the postings instead of copying them.
+        # Any as the stubs of the pinned mypy neither take an array as a
+        # buffer nor treat the view as a sequence of ints
+        buffer: Any = postings
+        self.view: Any = memoryview(buffer)
+
+    @classmethod
+    def from_postings(
+        cls, postings: Mapping[str, Sequence[int]], ascending: bool, dense_min: int
+    ) -> "FieldIndex":
+        terms = sorted(postings)
+        offsets = array("q", [0])
+        ids = array("I")
+        bitmaps = {}
+        for i, term in enumerate(terms):
+            term_ids = postings[term] if ascending else sorted(postings[term])
+            ids.extend(term_ids)
+            offsets.append(len(ids))
+            if len(term_ids) >= dense_min:
+                bits = bytearray(term_ids[-1] // 8 + 1)
+                for person_id in term_ids:
+                    bits[person_id >> 3] |= 1 << (person_id & 7)
+                bitmaps[i] = int.from_bytes(bits, "little")
+        return cls(terms, offsets, ids, bitmaps)
+
+    def matching(
+        self, token: str
+    ) -> Iterator[Tuple[bool, Sequence[int], Optional[int]]]:
+        """
+            (whether the term is `token`, people with the term, their bitmap)
+            for the first `PREFIX_TERMS_MAX` terms starting with `token`
+        """
+        start = bisect_left(self.terms, token)
+        for i in range(start, min(start + PREFIX_TERMS_MAX, len(self.terms))):
+            term = self.terms[i]
+            if not term.startswith(token):
+                return
+            ids = self.view[self.offsets[i] : self.offsets[i + 1]]
+            yield term == token, ids, self.bitmaps.get(i)
+
+
+class SearchIndex:
+    """
+        Full text and prefix search over the name, company name, email, tags
+        and address of people. Every query token must prefix a term of one of
+        the fields, and people are ranked by the sum of the best
+        `FIELD_WEIGHTS` score of each token, then by id.
+
+        Several tokens are intersected rarest first. When the rarest matches
+        few people the others are only looked up for them, otherwise every
+        token is split into one bitmap per score and the bitmaps are
+        intersected, keeping one bitmap per score total.
+    """
+
+    def __init__(
+        self, fields: Dict[str, FieldIndex], bitmap_bytes: int, dict_max: int
+    ) -> None:
+        self.fields = fields
+        # Bytes in a bitmap of every indexed id
+        self.bitmap_bytes = bitmap_bytes
+        self.dict_max = dict_max
+
+    def hits(self, token: str) -> List[Hit]:
+        hits = [
+            Hit(FIELD_WEIGHTS[field] * (EXACT_MULTIPLIER if exact else 1), ids, bitmap)
+            for field, index in self.fields.items()
+            for exact, ids, bitmap in index.matching(token)
+        ]
+        hits.sort(key=attrgetter("score"), reverse=True)
+        return hits
+
+    def search(self, query: str, limit: int) -> List[SearchResult]:
+        """
+            The `limit` best scoring people matching every token of `query`
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        token_hits = sorted((self.hits(token) for token in tokens), key=hits_size)
+        if not token_hits[0]:
+            return []
+        if len(token_hits) == 1:
+            return rank_hits(token_hits[0], limit)
+        if hits_size(token_hits[0]) > self.dict_max:
+            return self._intersect_bitmaps(token_hits, limit)
+
+        scores = best_scores(token_hits[0])
+        for hits in token_hits[1:]:
+            token_scores = candidate_scores(hits, scores)
+            scores = {
+                person_id: score + token_scores[person_id]
+                for person_id, score in scores.items()
+                if person_id in token_scores
+            }
+            if not scores:
+                return []
+        best = heapq.nsmallest(
+            limit, scores.items(), key=lambda item: (-item[1], item[0])
+        )
+        return [SearchResult(person_id, score) for person_id, score in best]
+
+    def score_bitmaps(self, hits: List[Hit]) -> List[Tuple[int, int]]:
+        """
+            (score, bitmap of the people it is the best score of) for a token,
+            best score first. Sparse terms are set in one bytearray per score.
+        """
+        scores = []
+        better = 0
+        for score, tier in groupby(hits, key=attrgetter("score")):
+            bits = bytearray(self.bitmap_bytes)
+            dense = 0
+            for hit in tier:
+                if hit.bitmap is None:
+                    for person_id in hit.ids:
+                        bits[person_id >> 3] |= 1 << (person_id & 7)
+                else:
+                    dense |= hit.bitmap
+            bitmap = (int.from_bytes(bits, "little") | dense) & ~better
+            better |= bitmap
+            if bitmap:
+                scores.append((score, bitmap))
+        return scores
+
+    def _intersect_bitmaps(
+        self, token_hits: List[List[Hit]], limit: int
+    ) -> List[SearchResult]:
+        # The people matching the tokens so far, by their score total. -1 has
+        # every bit set
+        totals: Dict[int, int] = {0: -1}
+        for hits in token_hits:
+            token_totals: Dict[int, int] = defaultdict(int)
+            for score, token_bitmap in self.score_bitmaps(hits):
+                for total, bitmap in totals.items():
+                    matched = bitmap & token_bitmap
+                    if matched:
+                        token_totals[total + score] |= matched
+            if not token_totals:
+                return []
+            totals = token_totals
+
+        results: List[SearchResult] = []
+        for total in sorted(totals, reverse=True):
+            for person_id in iter_bitmap_ids(totals[total]):
+                results.append(SearchResult(person_id, total))
+                if len(results) == limit:
+                    return results
+        return results
+
+
+class SearchIndexBuilder:
+    """
+        Collects the terms of the companies and people streamed through
+        `add_companies` and `add_people` while a backend loads them, so the
+        json is only parsed once. Companies may be streamed before or after
+        their employees.
+    """
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, Dict[str, array]] = {
+            field: {} for field in PERSON_FIELDS
+        }
+        self.company_names: Dict[int, str] = {}
+        self.company_members: Dict[int, array] = {}
+        self.max_id = -1
+        # Postings only need sorting when people did not arrive in id order
+        self.ascending = True
+        self.companies_read = False
+        self.people_read = False
+
+    @property
+    def complete(self) -> bool:
+        """
+            Whether both streams were read to the end, backends that skip
+            loading an already loaded dataset leave them unread
+        """
+        return self.companies_read and self.people_read
+
+    def add_companies(self, companies: Iterable[Company]) -> Iterator[Company]:
+        for company in companies:
+            self.company_names[company.id] = company.name
+            yield company
+        self.companies_read = True
+
+    def add_person(self, person: Person) -> None:
+        if person.id <= self.max_id:
+            self.ascending = False
+        self.max_id = max(self.max_id, person.id)
+        for field, terms_of in PERSON_FIELDS.items():
+            postings = self.postings[field]
+            for term in set(terms_of(person)):
+                ids = postings.get(term)
+                if ids is None:
+                    ids = postings[term] = array("I")
+                ids.append(person.id)
+        if person.company_id is not None:
+            members = self.company_members.get(person.company_id)
+            if members is None:
+                members = self.company_members[person.company_id] = array("I")
+            members.append(person.id)
+
+    def add_people(self, people: Iterable[Person]) -> Iterator[Person]:
+        for person in people:
+            self.add_person(person)
+            yield person
+        self.people_read = True
+
+    def build(
+        self, dense_min: Optional[int] = None, dict_max: int = DICT_MAX
+    ) -> SearchIndex:
+        """
+            Terms held by at least `dense_min` people get a bitmap, by default
+            one in `DENSE_SHARE` of the ids
+        """
+        if dense_min is None:
+            dense_min = max(1, (self.max_id + 1) // DENSE_SHARE)
+        fields = {
+            field: FieldIndex.from_postings(postings, self.ascending, dense_min)
+            for field, postings in self.postings.items()
+        }
+        # Each company name term holds the employees of the companies named
+        # with it, a person is in one company so they are listed once
+        company_postings: Dict[str, List[int]] = {}
+        for company_id, name in self.company_names.items():
+            members = self.company_members.get(company_id)
+            if members:
+                for term in set(tokenize(name)):
+                    company_postings.setdefault(term, []).extend(members)
+        fields["company"] = FieldIndex.from_postings(
+            company_postings, ascending=False, dense_min=dense_min
+        )
+        return SearchIndex(fields, self.max_id // 8 + 1, dict_max)
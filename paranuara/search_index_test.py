@@ -0,0 +1,136 @@
+import random
+from unittest import TestCase
+
+from paranuara.company import Company
+from paranuara.query_test import generate_person
+from paranuara.search_index import (
+    EXACT_MULTIPLIER,
+    FIELD_WEIGHTS,
+    SearchIndexBuilder,
+    SearchResult,
+    tokenize,
+)
+
+WORDS = ["ann", "anna", "annex", "bo", "bob", "carl", "carla", "dee", "x"]
+
+
+def generate_people(count, seed):
+    rng = random.Random(seed)
+    people = []
+    for person_id in rng.sample(range(count * 2), count):
+        name, surname = rng.choice(WORDS), rng.choice(WORDS)
+        people.append(
+            generate_person(id=person_id)._replace(
+                name="{} {}".format(name.title(), surname.title()),
+                email="{}{}@{}.com".format(name, surname, rng.choice(WORDS)),
+                address="{} {} Street, {}".format(
+                    rng.randrange(10), rng.choice(WORDS).title(), rng.choice(WORDS)
+                ),
+                tags=rng.sample(WORDS, 2),
+                company_id=rng.choice([None, 0, 1, 2]),
+            )
+        )
+    return people
+
+
+def brute_force_search(people, companies, query, limit):
+    names = {company.id: company.name for company in companies}
+    tokens = set(tokenize(query))
+    results = []
+    for person in people:
+        fields = {
+            "name": tokenize(person.name),
+            "email": tokenize(person.email),
+            "tags": [term for tag in person.tags for term in tokenize(tag)],
+            "address": tokenize(person.address),
+            "company": tokenize(names.get(person.company_id, "")),
+        }
+        scores = [
+            max(
+                [
+                    FIELD_WEIGHTS[field] * (EXACT_MULTIPLIER if term == token else 1)
+                    for field, terms in fields.items()
+                    for term in terms
+                    if term.startswith(token)
+                ],
+                default=0,
+            )
+            for token in tokens
+        ]
+        if tokens and all(scores):
+            results.append(SearchResult(person.id, sum(scores)))
+    results.sort(key=lambda result: (-result.score, result.id))
+    return results[:limit]
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        self.companies = [
+            Company(id=0, name="Anna Corp"),
+            Company(id=1, name="Bob-x"),
+            Company(id=2, name="Unemployed"),
+        ]
+        self.people = generate_people(300, seed=1)
+        self.builder = SearchIndexBuilder()
+        # People first, the company names are only needed when building
+        for _ in self.builder.add_people(self.people):
+            pass
+        for _ in self.builder.add_companies(self.companies):
+            pass
+
+    def test_complete(self):
+        builder = SearchIndexBuilder()
+        self.assertFalse(builder.complete)
+        list(builder.add_companies(self.companies))
+        self.assertFalse(builder.complete)
+        list(builder.add_people(self.people))
+        self.assertTrue(builder.complete)
+
+    def test_ranking(self):
+        builder = SearchIndexBuilder()
+        people = [
+            generate_person(id=0)._replace(name="Carla Dee"),
+            generate_person(id=1)._replace(name="Carl Dee"),
+            generate_person(id=2)._replace(name="Bo Dee", tags=["carl"]),
+        ]
+        list(builder.add_people(people))
+        list(builder.add_companies([]))
+        index = builder.build()
+
+        self.assertEqual(
+            index.search("carl", 10),
+            [SearchResult(1, 16), SearchResult(0, 8), SearchResult(2, 4)],
+        )
+        self.assertEqual(index.search("CARL dee!", 1), [SearchResult(1, 32)])
+        self.assertEqual(index.search("  ", 10), [])
+        self.assertEqual(index.search("carl zed", 10), [])
+
+    def test_matches_brute_force(self):
+        queries = [
+            "a",
+            "ann",
+            "anna",
+            "bob x",
+            "Carl Street",
+            "ca de",
+            "anna corp",
+            "bo@x.com",
+            "unemp",
+            "3 x",
+            "a b c",
+            "zed",
+        ]
+        # Every term sparse or dense, and the rarest token always or never
+        # small enough to be looked up by id
+        for dense_min in (1, 10, len(self.people) + 1):
+            for dict_max in (0, 10 ** 9):
+                index = self.builder.build(dense_min=dense_min, dict_max=dict_max)
+                for query in queries:
+                    for limit in (1, 7, 1000):
+                        self.assertEqual(
+                            index.search(query, limit),
+                            brute_force_search(
+                                self.people, self.companies, query, limit
+                            ),
+                            (query, limit, dense_min, dict_max),
+                        )
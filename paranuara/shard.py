@@ -0,0 +1,277 @@
+import multiprocessing
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from queue import Empty, LifoQueue
+from threading import Thread
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from paranuara.company import Company
+from paranuara.company_stats import CompanyStats, company_stats_from_people
+from paranuara.db import CompanyNotFound, PersonNotFound
+from paranuara.person import Person
+from paranuara.person_filter import PersonFilter, person_matches
+
+# Methods of `Shard` a client may call
+SHARD_METHODS = frozenset(
+    [
+        "describe",
+        "fetch_company_by_id",
+        "fetch_company_stats",
+        "fetch_employee_ids",
+        "fetch_employee_ids_page",
+        "fetch_person_by_id",
+        "fetch_people_by_ids",
+        "fetch_people_by_ids_where",
+    ]
+)
+
+Address = Tuple[str, int]
+
+# Raised by a pooled connection to a shard that restarted since it was pooled
+STALE_CONNECTION_ERRORS = (EOFError, OSError)
+
+
+class ShardMisconfigured(Exception):
+    pass
+
+
+def shard_of(key: int, shard_count: int) -> int:
+    """
+        The shard owning the person, or company, with id `key`
+    """
+    return key % shard_count
+
+
+class Shard:
+    """
+        The slice of the dataset one shard process holds: the people whose id
+        it owns, and the companies it owns along with the ids of all of their
+        employees, wherever those people are held. `version` identifies the
+        files the slice was read from. Company stats only count the people
+        the shard holds, the router adds up those of every shard.
+    """
+
+    def __init__(
+        self,
+        companies: Iterable[Company],
+        people: Iterable[Person],
+        shard: int,
+        shard_count: int,
+        version: str,
+    ) -> None:
+        self.shard = shard
+        self.shard_count = shard_count
+        self.version = version
+        self.companies = {
+            company.id: company
+            for company in companies
+            if shard_of(company.id, shard_count) == shard
+        }
+        self.people: Dict[int, Person] = {}
+        # company id -> employee ids in the order the people were loaded
+        self.employee_ids: Dict[int, List[int]] = {}
+        for person in people:
+            if shard_of(person.id, shard_count) == shard:
+                self.people[person.id] = person
+            if (
+                person.company_id is not None
+                and shard_of(person.company_id, shard_count) == shard
+            ):
+                self.employee_ids.setdefault(person.company_id, []).append(person.id)
+        self.sorted_employee_ids = {
+            company_id: sorted(person_ids)
+            for company_id, person_ids in self.employee_ids.items()
+        }
+        self.company_stats = company_stats_from_people(self.people.values())
+
+    def describe(self) -> Tuple[int, int, str]:
+        return self.shard, self.shard_count, self.version
+
+    def fetch_company_by_id(self, company_id: int) -> Company:
+        try:
+            return self.companies[company_id]
+        except KeyError:
+            raise CompanyNotFound
+
+    def fetch_company_stats(self) -> Dict[int, CompanyStats]:
+        return self.company_stats
+
+    def fetch_employee_ids(self, company_id: int) -> List[int]:
+        return self.employee_ids.get(company_id, [])
+
+    def fetch_employee_ids_page(
+        self, company_id: int, after_id: Optional[int], limit: Optional[int]
+    ) -> List[int]:
+        person_ids = self.sorted_employee_ids.get(company_id, [])
+        if after_id is not None:
+            person_ids = [person_id for person_id in person_ids if person_id > after_id]
+        return person_ids[:limit]
+
+    def fetch_person_by_id(self, person_id: int) -> Person:
+        try:
+            return self.people[person_id]
+        except KeyError:
+            raise PersonNotFound
+
+    def fetch_people_by_ids(self, person_ids: List[int]) -> List[Person]:
+        return [
+            self.people[person_id]
+            for person_id in person_ids
+            if person_id in self.people
+        ]
+
+    def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        return [
+            person
+            for person in self.fetch_people_by_ids(person_ids)
+            if person_matches(person, person_filter)
+        ]
+
+
+def handle_connection(shard: Shard, connection: Connection) -> None:
+    try:
+        while True:
+            try:
+                method, args = connection.recv()
+            except EOFError:
+                return
+            try:
+                if method not in SHARD_METHODS:
+                    raise ShardMisconfigured("Unknown shard method {}".format(method))
+                reply = ("ok", getattr(shard, method)(*args))
+            except Exception as error:
+                reply = ("error", error)
+            connection.send(reply)
+    finally:
+        connection.close()
+
+
+def serve_shard(shard: Shard, listener: Listener) -> None:
+    """
+        Answer calls from every client of `listener`, one thread per
+        connection, until the process exits.
+    """
+    while True:
+        try:
+            connection = listener.accept()
+        except (AuthenticationError, EOFError, OSError):
+            # A client that failed the authkey handshake or went away mid-way
+            continue
+        Thread(target=handle_connection, args=(shard, connection), daemon=True).start()
+
+
+class ShardClient:
+    """
+        Calls a shard process at `address`. Connections are pooled, each call
+        holds one for its round trip, so the client can be shared by threads.
+    """
+
+    def __init__(self, address: Address, authkey: bytes) -> None:
+        self.address = address
+        self.authkey = authkey
+        self.idle: "LifoQueue[Connection]" = LifoQueue()
+
+    def start(self, method: str, *args: Any) -> Callable[[], Any]:
+        """
+            Send the call straight away and return a function waiting for its
+            result, so calls to several shards are in flight at once. The
+            returned function must be called exactly once.
+        """
+        try:
+            connection = self.idle.get_nowait()
+        except Empty:
+            return self.send(self.connect(), method, args, pooled=False)
+        return self.send(connection, method, args, pooled=True)
+
+    def connect(self) -> Connection:
+        return Client(self.address, authkey=self.authkey)
+
+    def send(
+        self, connection: Connection, method: str, args: Tuple, pooled: bool
+    ) -> Callable[[], Any]:
+        """
+            A `pooled` connection fails once its shard restarted, the pool is
+            then emptied and the call sent again on a new connection. Shard
+            methods only read, so repeating a call is safe.
+        """
+
+        def retry(error: Exception) -> bool:
+            connection.close()
+            if pooled and isinstance(error, STALE_CONNECTION_ERRORS):
+                self.close()
+                return True
+            return False
+
+        try:
+            connection.send((method, args))
+        except Exception as error:
+            if retry(error):
+                return self.send(self.connect(), method, args, pooled=False)
+            raise
+
+        def result() -> Any:
+            try:
+                status, value = connection.recv()
+            except Exception as error:
+                if retry(error):
+                    return self.send(self.connect(), method, args, pooled=False)()
+                raise
+            self.idle.put(connection)
+            if status == "error":
+                raise value
+            return value
+
+        return result
+
+    def call(self, method: str, *args: Any) -> Any:
+        return self.start(method, *args)()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except Empty:
+                return
+
+
+def run_local_shard(
+    companies: List[Company],
+    people: List[Person],
+    shard: int,
+    shard_count: int,
+    version: str,
+    authkey: bytes,
+    addresses: Any,
+) -> None:
+    listener = Listener(("localhost", 0), authkey=authkey)
+    addresses.put((shard, listener.address))
+    serve_shard(Shard(companies, people, shard, shard_count, version), listener)
+
+
+def start_local_shards(
+    companies: List[Company],
+    people: List[Person],
+    shard_count: int,
+    version: str,
+    authkey: bytes,
+) -> Tuple[List[multiprocessing.Process], List[Address]]:
+    """
+        Start `shard_count` shard processes listening on localhost, returns
+        them with their addresses in shard order.
+    """
+    context = multiprocessing.get_context("spawn")
+    addresses = context.Queue()
+    processes = [
+        context.Process(
+            target=run_local_shard,
+            args=(companies, people, shard, shard_count, version, authkey, addresses),
+            daemon=True,
+        )
+        for shard in range(shard_count)
+    ]
+    for process in processes:
+        process.start()
+    shard_addresses = dict(addresses.get(timeout=60) for _ in processes)
+    return processes, [shard_addresses[shard] for shard in range(shard_count)]
@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from paranuara.company import Company
+from paranuara.db import CompanyNotFound
+from paranuara.person_filter import PersonFilter
+from paranuara.query_test import generate_person
+from paranuara.shard import Shard
+
+
+class ShardTest(TestCase):
+    def setUp(self):
+        self.people = [
+            generate_person(id=4)._replace(company_id=1),
+            generate_person(id=2, eye_color="brown")._replace(company_id=1),
+            generate_person(id=3)._replace(company_id=2),
+            generate_person(id=1)._replace(company_id=1),
+        ]
+        self.shard = Shard(
+            [Company(id=1, name="one"), Company(id=2, name="two")],
+            self.people,
+            shard=0,
+            shard_count=2,
+            version="v1",
+        )
+
+    def test_keeps_owned_people(self):
+        self.assertEqual(
+            self.shard.fetch_people_by_ids([1, 2, 3, 4]),
+            [self.people[1], self.people[0]],
+        )
+        self.assertEqual(
+            self.shard.fetch_people_by_ids_where(
+                [2, 4], PersonFilter(eye_color="brown")
+            ),
+            [self.people[1]],
+        )
+
+    def test_keeps_employees_of_owned_companies(self):
+        self.assertEqual(self.shard.fetch_company_by_id(2).name, "two")
+        with self.assertRaises(CompanyNotFound):
+            self.shard.fetch_company_by_id(1)
+        self.assertEqual(self.shard.fetch_employee_ids(2), [3])
+        self.assertEqual(self.shard.fetch_employee_ids(1), [])
+
+    def test_employee_pages(self):
+        shard = Shard([], self.people, shard=1, shard_count=2, version="v1")
+
+        self.assertEqual(shard.fetch_employee_ids(1), [4, 2, 1])
+        self.assertEqual(shard.fetch_employee_ids_page(1, None, 2), [1, 2])
+        self.assertEqual(shard.fetch_employee_ids_page(1, 1, None), [2, 4])
@@ -0,0 +1,298 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from paranuara.columnar import (
+    Categorical,
+    PeopleColumns,
+    PeopleColumnsBuilder,
+    StringHeap,
+    friend_graph_from_columns,
+)
+from paranuara.company import Company, company_from_json
+from paranuara.friend_graph import FriendGraph
+from paranuara.json_stream import iter_json_array
+from paranuara.person import person_from_json
+
+# Bump whenever the layout below changes, old snapshots are then ignored
+SNAPSHOT_VERSION = 2
+
+MAGIC = b"PARANSNP"
+# magic, version, length of the json header
+PREAMBLE = struct.Struct("<8sIQ")
+ALIGNMENT = 8
+
+PEOPLE_ARRAYS = (
+    "ids",
+    "has_died",
+    "balance_cents",
+    "age",
+    "eye_color",
+    "gender",
+    "company_id",
+    "registered_epoch",
+    "registered_offset",
+    "tag_offsets",
+    "tags",
+    "friend_offsets",
+    "friends",
+    "food_offsets",
+    "foods",
+    "sorted_ids",
+    "sorted_rows",
+    "company_ids",
+    "company_offsets",
+    "company_rows",
+)
+PEOPLE_CATEGORICALS = ("eye_colors", "genders", "tag_values", "food_values")
+FRIEND_GRAPH_ARRAYS = ("ids", "offsets", "neighbours", "join_friends")
+
+Snapshot = NamedTuple(
+    "Snapshot",
+    [
+        ("companies", List[Company]),
+        ("people", PeopleColumns),
+        ("friend_graph", FriendGraph),
+    ],
+)
+
+
+# Modification time and size of each file
+FileStats = List[Tuple[int, int]]
+
+
+def file_stats(paths: List[str]) -> FileStats:
+    stats = []
+    for path in paths:
+        stat = os.stat(path)
+        stats.append((stat.st_mtime_ns, stat.st_size))
+    return stats
+
+
+def source_checksum(paths: Iterable[str]) -> str:
+    """
+        sha256 over the contents of the json files a snapshot was compiled from
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as fp:
+            for block in iter(lambda: fp.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def dataset_checksum(paths: List[str], snapshot_path: Optional[str] = None) -> str:
+    """
+        `source_checksum` of `paths`, read from the snapshot at `snapshot_path`
+        instead when the files still have the modification times and sizes
+        they had when it was compiled, so workers starting from a snapshot do
+        not read the json files at all.
+    """
+    if snapshot_path:
+        stats = [list(stat) for stat in file_stats(paths)]
+        try:
+            with open(snapshot_path, "rb") as fp:
+                header = _read_header(fp)
+        except FileNotFoundError:
+            header = None
+        if header is not None and header[0].get("source_stats") == stats:
+            return header[0]["source_checksum"]
+    return source_checksum(paths)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _read_header(fp) -> Optional[Tuple[Dict[str, Any], int]]:
+    """
+        The json header of the snapshot open in `fp` and its length, None when
+        it is not a snapshot of this version
+    """
+    preamble = fp.read(PREAMBLE.size)
+    if len(preamble) != PREAMBLE.size:
+        return None
+    magic, version, header_length = PREAMBLE.unpack(preamble)
+    if magic != MAGIC or version != SNAPSHOT_VERSION:
+        return None
+    return json.loads(fp.read(header_length).decode("utf-8")), header_length
+
+
+def _is_native(header: Dict[str, Any]) -> bool:
+    return header["byteorder"] == sys.byteorder and all(
+        struct.calcsize(spec["format"]) == spec["itemsize"]
+        for spec in header["sections"].values()
+    )
+
+
+def write_snapshot(
+    path: str,
+    companies: Iterable[Company],
+    people: PeopleColumns,
+    friend_graph: FriendGraph,
+    checksum: str,
+    source_stats: Optional[FileStats] = None,
+) -> None:
+    """
+        Write the snapshot next to `path` and rename it into place, so workers
+        never map a half written file. `source_stats` are the `file_stats` of
+        the json files when `checksum` was taken.
+    """
+    sections: Dict[str, Any] = {}
+    buffers = []
+    offset = 0
+
+    def add_section(name: str, values) -> None:
+        nonlocal offset
+        # Any as the stubs of the pinned mypy lack `nbytes`, written as raw
+        # bytes whatever the format
+        view: Any = memoryview(values)
+        sections[name] = {
+            "format": view.format,
+            "itemsize": view.itemsize,
+            "offset": offset,
+            "nbytes": view.nbytes,
+        }
+        buffers.append(view)
+        offset = _aligned(offset + view.nbytes)
+
+    for name in PEOPLE_ARRAYS:
+        add_section("people." + name, getattr(people, name))
+    add_section("people.strings.data", people.strings.data)
+    add_section("people.strings.offsets", people.strings.offsets)
+    for name in FRIEND_GRAPH_ARRAYS:
+        add_section("friend_graph." + name, getattr(friend_graph, name))
+
+    header = json.dumps(
+        {
+            "source_checksum": checksum,
+            "source_stats": source_stats,
+            "byteorder": sys.byteorder,
+            "companies": [[company.id, company.name] for company in companies],
+            "categoricals": {
+                name: getattr(people, name).values for name in PEOPLE_CATEGORICALS
+            },
+            "sections": sections,
+        }
+    ).encode("utf-8")
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fp:
+        fp.write(PREAMBLE.pack(MAGIC, SNAPSHOT_VERSION, len(header)))
+        fp.write(header)
+        data_start = _aligned(PREAMBLE.size + len(header))
+        fp.write(b"\0" * (data_start - fp.tell()))
+        for name, buffer in zip(sections, buffers):
+            fp.write(b"\0" * (data_start + sections[name]["offset"] - fp.tell()))
+            fp.write(buffer)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, checksum: str) -> Optional[Snapshot]:
+    """
+        Memory map the snapshot at `path`. Returns None when it is missing,
+        was written by another version, or was compiled from other json files.
+        The arrays are views over the mapping, nothing is copied.
+    """
+    try:
+        fp = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with fp:
+        read = _read_header(fp)
+        if read is None:
+            return None
+        header, header_length = read
+        if header["source_checksum"] != checksum or not _is_native(header):
+            return None
+        mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # Any as the stubs of the pinned mypy lack `memoryview.cast` and do not
+    # take an mmap as a buffer
+    buffer: Any = mapping
+    data: Any = memoryview(buffer)[_aligned(PREAMBLE.size + header_length) :]
+
+    def section(name: str):
+        spec = header["sections"][name]
+        return data[spec["offset"] : spec["offset"] + spec["nbytes"]].cast(
+            spec["format"]
+        )
+
+    columns: Dict[str, Any] = {
+        name: section("people." + name) for name in PEOPLE_ARRAYS
+    }
+    columns.update(
+        (name, Categorical(header["categoricals"][name]))
+        for name in PEOPLE_CATEGORICALS
+    )
+    people = PeopleColumns(
+        strings=StringHeap(
+            section("people.strings.data"), section("people.strings.offsets")
+        ),
+        **columns
+    )
+    friend_graph = FriendGraph(
+        **{name: section("friend_graph." + name) for name in FRIEND_GRAPH_ARRAYS}
+    )
+    companies = [Company(id=id, name=name) for id, name in header["companies"]]
+    return Snapshot(companies=companies, people=people, friend_graph=friend_graph)
+
+
+def compile_snapshot(
+    companies_path: str, people_path: str, path: str, checksum: Optional[str] = None
+) -> int:
+    """
+        Parse the json files and write their snapshot to `path`, returns the
+        number of people written.
+    """
+    # Taken first, so files changed while compiling do not match the snapshot
+    source_stats = file_stats([companies_path, people_path])
+    if checksum is None:
+        checksum = source_checksum([companies_path, people_path])
+    with open(companies_path) as companies_file:
+        companies = [
+            company_from_json(company_dict)
+            for company_dict in iter_json_array(companies_file)
+        ]
+    with open(people_path) as people_file:
+        people = (
+            PeopleColumnsBuilder()
+            .add_all(
+                person_from_json(person_dict)
+                for person_dict in iter_json_array(people_file)
+            )
+            .build()
+        )
+    write_snapshot(
+        path,
+        companies,
+        people,
+        friend_graph_from_columns(people),
+        checksum,
+        source_stats,
+    )
+    return len(people)
+
+
+def ensure_snapshot(
+    companies_path: str, people_path: str, path: str, checksum: Optional[str] = None
+) -> bool:
+    """
+        Compile the snapshot unless an up to date one is already at `path`,
+        returns whether it was compiled. Processes asking at the same time
+        take turns on a lock file, so one compiles and the others find its
+        snapshot up to date.
+    """
+    if checksum is None:
+        checksum = dataset_checksum([companies_path, people_path], path)
+    with open(path + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if load_snapshot(path, checksum) is not None:
+            return False
+        compile_snapshot(companies_path, people_path, path, checksum)
+        return True
@@ -0,0 +1,132 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from paranuara.columnar import PeopleColumnsBuilder, friend_graph_from_columns
+from paranuara.columnar_test import generate_stored_person
+from paranuara.company import Company
+from paranuara.snapshot import (
+    dataset_checksum,
+    ensure_snapshot,
+    load_snapshot,
+    source_checksum,
+    write_snapshot,
+)
+from paranuara.synthetic import (
+    SyntheticConfig,
+    generate_companies,
+    generate_people,
+    write_json_array,
+)
+
+
+class SnapshotTest(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.snapshot")
+        self.companies = [Company(id=1, name="NETBOOK")]
+        self.people = [
+            generate_stored_person(id=1, company_id=1, friends=[0, 2]),
+            generate_stored_person(id=0, friends=[1]),
+            generate_stored_person(id=2, company_id=1, friends=[1])._replace(
+                eye_color="brown"
+            ),
+        ]
+        columns = PeopleColumnsBuilder().add_all(self.people).build()
+        write_snapshot(
+            self.path,
+            self.companies,
+            columns,
+            friend_graph_from_columns(columns),
+            checksum="abc",
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        snapshot = load_snapshot(self.path, checksum="abc")
+
+        self.assertEqual(snapshot.companies, self.companies)
+        self.assertEqual(list(snapshot.people.iter_people()), self.people)
+        self.assertEqual(snapshot.people.row_of_id(2), 2)
+        self.assertEqual(list(snapshot.people.rows_of_company(1)), [0, 2])
+        self.assertEqual(list(snapshot.friend_graph.friend_ids(1)), [0, 2])
+        self.assertEqual(snapshot.friend_graph.common_join_friend_ids(1, 1), [2])
+        self.assertEqual(snapshot.friend_graph.common_join_friend_ids(1, 0), [])
+
+    def test_stale(self):
+        self.assertIsNone(load_snapshot(self.path, checksum="def"))
+
+    def test_missing(self):
+        self.assertIsNone(load_snapshot(self.path + ".missing", checksum="abc"))
+
+
+class EnsureSnapshotTest(TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.companies_path = os.path.join(self.directory.name, "companies.json")
+        self.people_path = os.path.join(self.directory.name, "people.json")
+        self.path = os.path.join(self.directory.name, "test.snapshot")
+        self.write_people(SyntheticConfig(people=20, companies=3))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_people(self, config):
+        with open(self.companies_path, "w") as fp:
+            write_json_array(fp, generate_companies(config))
+        with open(self.people_path, "w") as fp:
+            write_json_array(fp, generate_people(config))
+
+    def checksum(self):
+        return source_checksum([self.companies_path, self.people_path])
+
+    def test_compiles_missing(self):
+        self.assertTrue(
+            ensure_snapshot(self.companies_path, self.people_path, self.path)
+        )
+
+        snapshot = load_snapshot(self.path, self.checksum())
+        self.assertEqual(len(snapshot.companies), 3)
+        self.assertEqual(len(snapshot.people), 20)
+
+    def test_keeps_up_to_date(self):
+        ensure_snapshot(self.companies_path, self.people_path, self.path)
+        modified = os.stat(self.path).st_mtime_ns
+
+        self.assertFalse(
+            ensure_snapshot(self.companies_path, self.people_path, self.path)
+        )
+        self.assertEqual(os.stat(self.path).st_mtime_ns, modified)
+
+    def test_recompiles_stale(self):
+        ensure_snapshot(self.companies_path, self.people_path, self.path)
+        self.write_people(SyntheticConfig(people=30, companies=3))
+
+        self.assertTrue(
+            ensure_snapshot(self.companies_path, self.people_path, self.path)
+        )
+        self.assertEqual(len(load_snapshot(self.path, self.checksum()).people), 30)
+
+    def test_checksum_read_from_snapshot(self):
+        ensure_snapshot(self.companies_path, self.people_path, self.path)
+        checksum = self.checksum()
+        stat = os.stat(self.people_path)
+        # Same size and modification time, so the files are not hashed again
+        with open(self.people_path, "r+") as fp:
+            fp.write(" " * stat.st_size)
+        os.utime(self.people_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        paths = [self.companies_path, self.people_path]
+        self.assertEqual(dataset_checksum(paths, self.path), checksum)
+        self.assertNotEqual(dataset_checksum(paths), checksum)
+
+    def test_checksum_hashed_once_changed(self):
+        ensure_snapshot(self.companies_path, self.people_path, self.path)
+        self.write_people(SyntheticConfig(people=30, companies=3))
+
+        self.assertEqual(
+            dataset_checksum([self.companies_path, self.people_path], self.path),
+            self.checksum(),
+        )
@@ -0,0 +1,176 @@
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, TextIO
+
+from paranuara.person import ALL_FOODS
+
+SyntheticConfig = NamedTuple(
+    "SyntheticConfig",
+    [
+        ("people", int),
+        ("companies", int),
+        # Share of people with brown eyes that are alive, the friends_join filter
+        ("brown_alive_ratio", float),
+        # Pareto shape of the friend count, smaller is more skewed
+        ("friend_exponent", float),
+        ("max_friends", int),
+        # The first `huge_companies` companies employ `huge_company_share` of
+        # all people between them
+        ("huge_companies", int),
+        ("huge_company_share", float),
+        ("seed", int),
+    ],
+)
+SyntheticConfig.__new__.__defaults__ = (  # type: ignore
+    1000,
+    100,
+    0.27,
+    1.2,
+    1000,
+    3,
+    0.2,
+    0,
+)
+
+FIRST_NAMES = (
+    "Carmella",
+    "Decker",
+    "Kathleen",
+    "Bonnie",
+    "Rosemary",
+    "Grimes",
+    "Mindy",
+    "Walls",
+    "Alvarado",
+    "Estela",
+)
+LAST_NAMES = (
+    "Lambert",
+    "Mckenzie",
+    "Clarke",
+    "Bass",
+    "Hayes",
+    "Beck",
+    "Beasley",
+    "Wise",
+    "Mullins",
+    "Rowe",
+)
+STREETS = ("Sumner Place", "Hewes Street", "Linden Boulevard", "Vanderbilt Avenue")
+TOWNS = ("Sperryville", "Elizaville", "Lydia", "Greenbush", "Carbonville")
+WORDS = (
+    "id",
+    "quis",
+    "ullamco",
+    "consequat",
+    "laborum",
+    "sint",
+    "velit",
+    "veniam",
+    "irure",
+    "mollit",
+    "sunt",
+    "amet",
+    "fugiat",
+    "ex",
+)
+FOODS = sorted(ALL_FOODS)
+REGISTERED_START = datetime(2014, 1, 1)
+
+
+def company_name(company_id: int) -> str:
+    return "COMPANY{}".format(company_id)
+
+
+def generate_companies(config: SyntheticConfig) -> Iterator[Dict[str, Any]]:
+    for company_id in range(config.companies):
+        yield {"index": company_id, "company": company_name(company_id)}
+
+
+def generate_people(config: SyntheticConfig) -> Iterator[Dict[str, Any]]:
+    """
+        People in the people.json schema, the same `config` always generates
+        the same people.
+    """
+    rng = random.Random(config.seed)
+    huge_companies = min(config.huge_companies, config.companies)
+    for person_id in range(config.people):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        name = "{} {}".format(first_name, last_name)
+
+        if rng.random() < config.brown_alive_ratio:
+            eye_color, has_died = "brown", False
+        else:
+            eye_color = rng.choice(("blue", "green", "brown"))
+            has_died = eye_color == "brown" or rng.random() < 0.5
+
+        if huge_companies and rng.random() < config.huge_company_share:
+            company_id = rng.randrange(huge_companies)
+        else:
+            company_id = rng.randrange(config.companies)
+
+        friend_count = min(
+            int(rng.paretovariate(config.friend_exponent)),
+            config.max_friends,
+            config.people,
+        )
+        friends = sorted(rng.sample(range(config.people), friend_count))
+
+        offset = timedelta(hours=rng.randrange(-12, 13))
+        registered = (
+            REGISTERED_START + timedelta(seconds=rng.randrange(5 * 365 * 24 * 3600))
+        ).replace(tzinfo=timezone(offset))
+
+        yield {
+            "_id": "{:024x}".format(rng.getrandbits(96)),
+            "index": person_id,
+            "guid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "has_died": has_died,
+            "balance": "${:,.2f}".format(rng.randrange(100000, 400000) / 100),
+            "picture": "http://placehold.it/32x32",
+            "age": rng.randrange(10, 90),
+            "eyeColor": eye_color,
+            "name": name,
+            "gender": rng.choice(("female", "male")),
+            "company_id": company_id,
+            "email": "{}{}{}@{}.com".format(
+                first_name, last_name, person_id, company_name(company_id)
+            ).lower(),
+            "phone": "+1 ({}) {}-{}".format(
+                rng.randrange(800, 1000), rng.randrange(100, 1000), rng.randrange(10000)
+            ),
+            "address": "{} {}, {}, {}".format(
+                rng.randrange(100, 1000),
+                rng.choice(STREETS),
+                rng.choice(TOWNS),
+                rng.randrange(1000, 10000),
+            ),
+            "about": " ".join(rng.choice(WORDS) for _ in range(20)).capitalize() + ".",
+            "registered": registered.strftime("%Y-%m-%dT%H:%M:%S ")
+            + registered.strftime("%z")[:3]
+            + ":00",
+            "tags": [rng.choice(WORDS) for _ in range(7)],
+            "friends": [{"index": friend_id} for friend_id in friends],
+            "greeting": "Hello, {}! You have {} unread messages.".format(
+                name, rng.randrange(1, 11)
+            ),
+            "favouriteFood": rng.sample(FOODS, rng.randrange(1, 5)),
+        }
+
+
+def write_json_array(fp: TextIO, values: Iterable[Any]) -> int:
+    """
+        Write `values` as a json array one element at a time, returns the
+        number written.
+    """
+    count = 0
+    fp.write("[")
+    for value in values:
+        fp.write(",\n" if count else "\n")
+        json.dump(value, fp)
+        count += 1
+    fp.write("\n]\n")
+    return count
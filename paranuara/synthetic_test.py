@@ -0,0 +1,72 @@
+import io
+from collections import Counter
+from unittest import TestCase
+
+from paranuara.json_stream import iter_json_array
+from paranuara.person import person_from_json
+from paranuara.synthetic import (
+    SyntheticConfig,
+    generate_companies,
+    generate_people,
+    write_json_array,
+)
+
+
+class SyntheticTest(TestCase):
+    def test_people_parse(self):
+        config = SyntheticConfig(people=50, companies=5)
+
+        people = [person_from_json(value) for value in generate_people(config)]
+
+        self.assertEqual([person.id for person in people], list(range(50)))
+        for person in people:
+            self.assertIn(person.company_id, range(5))
+            self.assertTrue(all(friend in range(50) for friend in person.friends))
+
+    def test_same_seed_same_people(self):
+        config = SyntheticConfig(people=20, seed=3)
+
+        self.assertEqual(list(generate_people(config)), list(generate_people(config)))
+        self.assertNotEqual(
+            list(generate_people(config)),
+            list(generate_people(config._replace(seed=4))),
+        )
+
+    def test_brown_alive_ratio(self):
+        people = list(
+            generate_people(SyntheticConfig(people=2000, brown_alive_ratio=0.5))
+        )
+
+        brown_alive = sum(
+            1
+            for person in people
+            if person["eyeColor"] == "brown" and not person["has_died"]
+        )
+        self.assertAlmostEqual(brown_alive / len(people), 0.5, delta=0.05)
+
+    def test_huge_companies(self):
+        config = SyntheticConfig(
+            people=2000, companies=100, huge_companies=2, huge_company_share=0.5
+        )
+
+        employees = Counter(person["company_id"] for person in generate_people(config))
+
+        self.assertEqual(
+            {company_id for company_id, _ in employees.most_common(2)}, {0, 1}
+        )
+        self.assertGreater(employees[0] + employees[1], 900)
+
+    def test_write_json_array(self):
+        companies = list(generate_companies(SyntheticConfig(companies=3)))
+        fp = io.StringIO()
+
+        self.assertEqual(write_json_array(fp, companies), 3)
+        fp.seek(0)
+        self.assertEqual(list(iter_json_array(fp)), companies)
+
+    def test_write_empty_json_array(self):
+        fp = io.StringIO()
+
+        write_json_array(fp, [])
+        fp.seek(0)
+        self.assertEqual(list(iter_json_array(fp)), [])
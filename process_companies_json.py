@@ -1,8 +1,7 @@
-import json
-import os
 from argparse import ArgumentParser
 
 from paranuara.company import company_from_json
+from paranuara.json_stream import iter_json_array
 from cli_util import add_companies_arg
 
 
@@ -10,8 +9,7 @@ def main():
     parser = ArgumentParser(description="Process companies.json files")
     add_companies_arg(parser)
     args = parser.parse_args()
-    companies = json.load(args.companies)
-    for company_dict in companies:
+    for company_dict in iter_json_array(args.companies):
         company = company_from_json(company_dict)
         print(company)
 
@@ -1,28 +1,139 @@
 import json
 import os
+import sys
+import time
 from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Iterable, Iterator, List, NamedTuple, TextIO, Tuple
 
 from flanker.addresslib import address
 
+from paranuara.json_stream import iter_json_array_texts
 from paranuara.person import person_from_json
 from cli_util import add_people_arg
 
+# Characters of json sent to a worker at a time, about 800 people
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 5.0
+
+ChunkResult = NamedTuple(
+    "ChunkResult",
+    [
+        ("people", int),
+        # Of every person in the chunk, in order, so the sets are built with
+        # the same operations as a serial run
+        ("favourite_foods", List[List[str]]),
+        # (username, domain) of every parsed email, in order
+        ("emails", List[Tuple[str, str]]),
+        ("unparsed_emails", int),
+    ],
+)
+
+
+def process_chunk(people_text: str) -> ChunkResult:
+    person_dicts = json.loads("[" + people_text + "]")
+    favourite_foods = []
+    emails = []
+    unparsed_emails = 0
+    for person_dict in person_dicts:
+        person = person_from_json(person_dict)
+        favourite_foods.append(person.favourite_food)
+        email_parsed = address.parse(person.email)
+        if email_parsed:
+            emails.append((email_parsed.mailbox, email_parsed.hostname))
+        else:
+            unparsed_emails += 1
+    return ChunkResult(len(person_dicts), favourite_foods, emails, unparsed_emails)
+
+
+def process_chunks(people_texts: Iterable[str], workers: int) -> Iterator[ChunkResult]:
+    """
+        Results in chunk order. Chunks are the json text of several people, so
+        the workers do all of the decoding and only strings are pickled. With
+        several workers at most two chunks per worker are in flight, so the
+        input is read no faster than it is processed.
+    """
+    if workers == 1:
+        yield from map(process_chunk, people_texts)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for chunk in people_texts:
+            pending.append(executor.submit(process_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class Progress:
+    def __init__(self, out: TextIO) -> None:
+        self.out = out
+        self.started = self.reported = time.perf_counter()
+        self.people = 0
+
+    def add(self, people: int) -> None:
+        self.people += people
+        now = time.perf_counter()
+        if now - self.reported >= PROGRESS_INTERVAL:
+            self.reported = now
+            self.report()
+
+    def report(self) -> None:
+        seconds = time.perf_counter() - self.started
+        print(
+            "Processed {} people in {:.1f}s, {:.0f} people/s".format(
+                self.people, seconds, self.people / seconds if seconds else 0
+            ),
+            file=self.out,
+        )
+
 
 def main():
     parser = ArgumentParser(description="Process people.json files")
     add_people_arg(parser)
+    parser.add_argument(
+        "--workers",
+        metavar="n",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="processes parsing people, 1 parses them in this process",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        metavar="n",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="characters of json sent to a worker at a time",
+    )
     args = parser.parse_args()
-    people = json.load(args.people)
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1")
+
+    # A set prints in an order that depends on every update made to it, so
+    # the workers only parse and the sets are updated here person by person,
+    # the same way as the serial script did, whatever the worker count
     foods = set()
     email_domains = set()
     email_usernames = set()
-    for person_dict in people:
-        person = person_from_json(person_dict)
-        foods |= set(person.favourite_food)
-        email_parsed = address.parse(person.email)
-        if email_parsed:
-            email_usernames |= set([email_parsed.mailbox])
-            email_domains |= set([email_parsed.hostname])
+    unparsed_emails = 0
+    progress = Progress(sys.stderr)
+    for result in process_chunks(
+        iter_json_array_texts(args.people, args.chunk_size), args.workers
+    ):
+        for favourite_food in result.favourite_foods:
+            foods |= set(favourite_food)
+        for email_username, email_domain in result.emails:
+            email_usernames |= set([email_username])
+            email_domains |= set([email_domain])
+        unparsed_emails += result.unparsed_emails
+        progress.add(result.people)
+    progress.report()
+    if unparsed_emails:
+        print("{} emails could not be parsed".format(unparsed_emails), file=sys.stderr)
     print(foods)
     print(email_domains)
     print(len(email_usernames))
@@ -0,0 +1,144 @@
+import os
+from typing import Optional
+
+from pymongo import MongoClient
+from quart import Quart, Response, abort, jsonify
+
+from async_mongo_db import AsyncMongoDB
+from flaskr import (
+    DBNotConfigured,
+    json_bytes_from_join_people_response,
+    json_bytes_from_people,
+    load_db,
+    person_to_simple_json,
+    username_from_email,
+)
+from mongo_db import DEFAULT_BATCH_SIZE, load_mongo
+from paranuara.async_db import AsyncDBAdapter
+from paranuara.async_query import AsyncParanuaraQuery
+from paranuara.cache import FragmentCache
+from paranuara.company import company_from_json
+from paranuara.db import CompanyNotFound, PersonNotFound
+from paranuara.json_stream import iter_json_array
+from paranuara.person import Person, json_bytes_from_person, person_from_json
+from paranuara.person_summary import (
+    DEFAULT_MAX_ENTRIES as PERSON_SUMMARY_MAX_ENTRIES,
+    PersonSummaries,
+)
+from paranuara.snapshot import source_checksum
+
+
+def json_response(body: bytes) -> Response:
+    return Response(body + b"\n", mimetype="application/json")
+
+
+def load_mongo_from_json(app, person_summaries: PersonSummaries, checksum: str):
+    with open(app.config["COMPANIES_FILE"]) as companies_file, open(
+        app.config["PEOPLE_FILE"]
+    ) as people_file:
+        load_mongo(
+            MongoClient(app.config["MONGO_URI"]).get_database(),
+            (
+                company_from_json(company_dict)
+                for company_dict in iter_json_array(companies_file)
+            ),
+            person_summaries.add_all(
+                person_from_json(person_dict)
+                for person_dict in iter_json_array(people_file)
+            ),
+            fingerprint=checksum,
+            batch_size=app.config.get("MONGO_BATCH_SIZE", DEFAULT_BATCH_SIZE),
+        )
+
+
+def create_app(test_config=None):
+    """
+        The async counterpart of `flaskr.create_app`, an ASGI app serving the
+        same /company and /person routes from an `AsyncParanuaraQuery`.
+    """
+    app = Quart(__name__, instance_relative_config=True)
+    app.config.from_mapping(SECRET_KEY="dev")
+
+    if test_config is None:
+        # load the instance config, if it exists, when not testing
+        app.config.from_object("config.DevConfig")
+    else:
+        # load the test config if passed in
+        app.config.from_mapping(test_config)
+
+    # ensure the instance folder exists
+    try:
+        os.makedirs(app.instance_path)
+    except OSError:
+        pass
+
+    person_summaries = PersonSummaries(
+        username_from_email,
+        on_rejected_email=lambda person: app.logger.warning(
+            "Person %d has an email that cannot be parsed: %r", person.id, person.email
+        ),
+        max_entries=app.config.get(
+            "PERSON_SUMMARY_MAX_ENTRIES", PERSON_SUMMARY_MAX_ENTRIES
+        ),
+    )
+    dataset_version = source_checksum(
+        [app.config["COMPANIES_FILE"], app.config["PEOPLE_FILE"]]
+    )
+    query: Optional[AsyncParanuaraQuery] = None
+    if app.config["DB"] in ("inmemory", "columnar"):
+        query = AsyncParanuaraQuery(
+            db=AsyncDBAdapter(load_db(app, person_summaries, dataset_version))
+        )
+    elif app.config["DB"] == "mongo":
+        assert app.config["MONGO_URI"]
+        if app.config.get("MONGO_LOAD_ON_START", True):
+            load_mongo_from_json(app, person_summaries, dataset_version)
+    else:
+        raise DBNotConfigured()
+
+    def current_query() -> AsyncParanuaraQuery:
+        nonlocal query
+        if query is None:
+            # motor clients are bound to the event loop they are created on,
+            # so the mongo one is created by the first request, and only the
+            # mongo backend needs motor installed
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            client = AsyncIOMotorClient(app.config["MONGO_URI"])
+            query = AsyncParanuaraQuery(db=AsyncMongoDB(client.get_database()))
+        return query
+
+    person_fragments = FragmentCache(app.config.get("PERSON_CACHE_MAX_BYTES", 0))
+
+    def person_json(person: Person) -> bytes:
+        return person_fragments.get(person.id, lambda: json_bytes_from_person(person))
+
+    @app.route("/company/<int:company_id>/employees")
+    async def company_employees(company_id):
+        try:
+            people = await current_query().query_company_employees(company_id)
+            return json_response(json_bytes_from_people(people, person_json))
+        except CompanyNotFound:
+            return abort(404)
+
+    @app.route("/person/<int:person_id>")
+    async def person(person_id):
+        try:
+            result = await current_query().query_person(person_id)
+            return jsonify(person_to_simple_json(result, person_summaries.get(result)))
+        except PersonNotFound:
+            return abort(404)
+
+    @app.route("/person/<int:person1_id>/friends_join/<int:person2_id>")
+    async def friends_join(person1_id, person2_id):
+        try:
+            query_result = await current_query().query_join_friends(
+                person1_id, person2_id
+            )
+            return json_response(
+                json_bytes_from_join_people_response(query_result, person_json)
+            )
+        except PersonNotFound:
+            return abort(404)
+
+    return app
@@ -0,0 +1,54 @@
+from argparse import ArgumentParser
+from multiprocessing.connection import Listener
+
+from cli_util import add_companies_arg, add_people_arg
+from paranuara.company import company_from_json
+from paranuara.json_stream import iter_json_array
+from paranuara.person import person_from_json
+from paranuara.shard import Shard, serve_shard
+from paranuara.snapshot import source_checksum
+
+
+def main():
+    parser = ArgumentParser(
+        description="Serve one shard of companies.json and people.json to ShardedDB"
+    )
+    add_companies_arg(parser)
+    add_people_arg(parser)
+    parser.add_argument(
+        "--shard", metavar="i", type=int, required=True, help="shard number, from 0"
+    )
+    parser.add_argument(
+        "--shards", metavar="n", type=int, required=True, help="number of shards"
+    )
+    parser.add_argument("--host", default="localhost", help="address to listen on")
+    parser.add_argument("--port", type=int, required=True, help="port to listen on")
+    # Shards unpickle whatever an authenticated client sends, so the key is
+    # never defaulted
+    parser.add_argument(
+        "--authkey",
+        required=True,
+        help="shared secret, the same as SHARD_AUTHKEY in config.py",
+    )
+    args = parser.parse_args()
+    companies = (
+        company_from_json(company_dict)
+        for company_dict in iter_json_array(args.companies)
+    )
+    people = (
+        person_from_json(person_dict) for person_dict in iter_json_array(args.people)
+    )
+    version = source_checksum([args.companies.name, args.people.name])
+    shard = Shard(companies, people, args.shard, args.shards, version)
+    listener = Listener((args.host, args.port), authkey=args.authkey.encode("utf-8"))
+    print(
+        "Shard {} of {} holds {} people, listening on {}:{}".format(
+            args.shard, args.shards, len(shard.people), args.host, args.port
+        ),
+        flush=True,
+    )
+    serve_shard(shard, listener)
+
+
+if __name__ == "__main__":
+    main()
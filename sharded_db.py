@@ -0,0 +1,193 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from paranuara.company import Company
+from paranuara.company_stats import CompanyStats
+from paranuara.db import ParanuaraDB, PersonNotFound
+from paranuara.person import Person
+from paranuara.person_filter import PersonFilter
+from paranuara.shard import Address, ShardClient, ShardMisconfigured, shard_of
+
+# People fetched per scatter while iterating over a company's employees
+ITER_BATCH_SIZE = 1000
+
+
+class ShardedDB(ParanuaraDB):
+    """
+        Routes every lookup to the shard processes (see `paranuara.shard`)
+        owning the people or company involved. Lookups spanning several
+        shards are sent to all of them before any reply is awaited.
+
+        No friend graph is kept, friends_join intersects the two people's
+        friend lists and only asks the shards owning the friends in common.
+
+        Every shard counts the company stats of the people it holds when it
+        loads, they are gathered and added up on the first request for them.
+    """
+
+    supports_fetch_person_pair = True
+    supports_fetch_people_by_ids_where = True
+    supports_iter_people_by_company_id = True
+    supports_fetch_company_stats = True
+
+    def __init__(self, shards: List[ShardClient]) -> None:
+        self.shards = shards
+        # Checksum of the files the shards loaded, set by `check_shards`
+        self.version: Optional[str] = None
+        # The stats gathered from the shards and the version they were read at
+        self.company_stats: Optional[
+            Tuple[Optional[str], Dict[int, CompanyStats]]
+        ] = None
+
+    def check_shards(self) -> None:
+        """
+            Raises ShardMisconfigured unless the shards were started with
+            the same shard count, in the same order, as this router, and
+            from the same files. Records the version of those files.
+        """
+        described = self.scatter(
+            {shard: ("describe", ()) for shard in range(len(self.shards))}
+        )
+        for shard, (started_as, shard_count, _) in described.items():
+            if (started_as, shard_count) != (shard, len(self.shards)):
+                raise ShardMisconfigured(
+                    "{} is shard {} of {}, expected shard {} of {}".format(
+                        self.shards[shard].address,
+                        started_as,
+                        shard_count,
+                        shard,
+                        len(self.shards),
+                    )
+                )
+        versions = {version for _, _, version in described.values()}
+        if len(versions) != 1:
+            raise ShardMisconfigured(
+                "Shards were started from different files, restart them all"
+            )
+        self.version = versions.pop()
+
+    def shard_of(self, key: int) -> ShardClient:
+        return self.shards[shard_of(key, len(self.shards))]
+
+    def scatter(self, calls: Dict[int, Tuple[str, Tuple[Any, ...]]]) -> Dict[int, Any]:
+        """
+            Make the `calls` to each shard concurrently and gather their
+            results. Every reply is read before the first error is raised,
+            including the replies to the calls sent before one failed to send,
+            so their connections are returned to the pool.
+        """
+        pending = {}
+        error: Optional[Exception] = None
+        for shard, (method, args) in calls.items():
+            try:
+                pending[shard] = self.shards[shard].start(method, *args)
+            except Exception as shard_error:
+                error = shard_error
+                break
+        results = {}
+        for shard, result in pending.items():
+            try:
+                results[shard] = result()
+            except Exception as shard_error:
+                error = error or shard_error
+        if error is not None:
+            raise error
+        return results
+
+    def scatter_people(
+        self, person_ids: List[int], method: str, *args: Any
+    ) -> List[Person]:
+        by_shard: Dict[int, List[int]] = {}
+        for person_id in dict.fromkeys(person_ids):
+            by_shard.setdefault(shard_of(person_id, len(self.shards)), []).append(
+                person_id
+            )
+        people = {
+            person.id: person
+            for shard_people in self.scatter(
+                {
+                    shard: (method, (shard_ids,) + args)
+                    for shard, shard_ids in by_shard.items()
+                }
+            ).values()
+            for person in shard_people
+        }
+        return [people[person_id] for person_id in person_ids if person_id in people]
+
+    def fetch_company_by_id(self, company_id: int) -> Company:
+        return self.shard_of(company_id).call("fetch_company_by_id", company_id)
+
+    def fetch_people_by_company_id(self, company_id: int) -> List[Person]:
+        return self.fetch_people_by_ids(
+            self.shard_of(company_id).call("fetch_employee_ids", company_id)
+        )
+
+    def iter_people_by_company_id(
+        self,
+        company_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        person_ids = self.shard_of(company_id).call(
+            "fetch_employee_ids_page", company_id, after_id, limit
+        )
+        return (
+            person
+            for start in range(0, len(person_ids), ITER_BATCH_SIZE)
+            for person in self.fetch_people_by_ids(
+                person_ids[start : start + ITER_BATCH_SIZE]
+            )
+        )
+
+    def fetch_person_by_id(self, person_id: int) -> Person:
+        return self.shard_of(person_id).call("fetch_person_by_id", person_id)
+
+    def fetch_people_by_ids(self, person_ids: List[int]) -> List[Person]:
+        return self.scatter_people(person_ids, "fetch_people_by_ids")
+
+    def fetch_person_pair(
+        self, person1_id: int, person2_id: int
+    ) -> Tuple[Person, Person]:
+        people = {
+            person.id: person
+            for person in self.fetch_people_by_ids([person1_id, person2_id])
+        }
+        try:
+            return people[person1_id], people[person2_id]
+        except KeyError:
+            raise PersonNotFound
+
+    def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        return self.scatter_people(
+            person_ids, "fetch_people_by_ids_where", person_filter
+        )
+
+    def fetch_company_stats(self) -> Dict[int, CompanyStats]:
+        version = self.version
+        if self.company_stats is None or self.company_stats[0] != version:
+            company_stats: Dict[int, CompanyStats] = {}
+            for shard_stats in self.scatter(
+                {
+                    shard: ("fetch_company_stats", ())
+                    for shard in range(len(self.shards))
+                }
+            ).values():
+                for company_id, stats in shard_stats.items():
+                    company_stats.setdefault(company_id, CompanyStats()).merge(stats)
+            self.company_stats = (version, company_stats)
+        return self.company_stats[1]
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.close()
+
+
+def connect_shards(addresses: List[Address], authkey: bytes) -> ShardedDB:
+    db = ShardedDB([ShardClient(address, authkey) for address in addresses])
+    try:
+        db.check_shards()
+    except Exception:
+        db.close()
+        raise
+    return db
@@ -0,0 +1,194 @@
+import multiprocessing
+from multiprocessing.connection import Listener
+from unittest import TestCase
+
+from paranuara.company import Company
+from paranuara.company_stats import company_stats_from_people, json_from_company_stats
+from paranuara.db import CompanyNotFound, PersonNotFound
+from paranuara.query import ParanuaraQuery
+from paranuara.query_test import generate_person
+from paranuara.shard import (
+    Shard,
+    ShardClient,
+    ShardMisconfigured,
+    serve_shard,
+    start_local_shards,
+)
+from sharded_db import ShardedDB, connect_shards
+
+AUTHKEY = b"test"
+
+
+def generate_employee(id, company_id, eye_color="red", friends=[]):
+    return generate_person(id=id, eye_color=eye_color, friends=friends)._replace(
+        company_id=company_id
+    )
+
+
+def restart_shard(companies, people, version, address, ready):
+    listener = Listener(address, authkey=AUTHKEY)
+    ready.set()
+    serve_shard(Shard(companies, people, 0, 1, version), listener)
+
+
+class ShardedDBTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.companies = [Company(id=1, name="one"), Company(id=2, name="two")]
+        cls.people = [
+            generate_employee(id=5, company_id=1, friends=[1, 2, 4]),
+            generate_employee(id=1, company_id=1, eye_color="brown"),
+            generate_employee(id=2, company_id=2, eye_color="brown"),
+            generate_employee(id=4, company_id=1, eye_color="brown"),
+            generate_employee(id=3, company_id=2, friends=[2, 4, 0]),
+            generate_employee(id=0, company_id=None),
+        ]
+        cls.processes, cls.addresses = start_local_shards(
+            cls.companies, cls.people, shard_count=3, version="v1", authkey=AUTHKEY
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        for process in cls.processes:
+            process.terminate()
+            process.join()
+
+    def setUp(self):
+        self.db = connect_shards(self.addresses, AUTHKEY)
+        self.calls = []
+        for shard, client in enumerate(self.db.shards):
+            client.start = self.recording(shard, client.start)
+
+    def tearDown(self):
+        self.db.close()
+
+    def recording(self, shard, start):
+        def recorded_start(method, *args):
+            self.calls.append((shard, method))
+            return start(method, *args)
+
+        return recorded_start
+
+    def person(self, person_id):
+        return next(person for person in self.people if person.id == person_id)
+
+    def test_records_version(self):
+        self.assertEqual(self.db.version, "v1")
+
+    def test_fetch_by_id(self):
+        self.assertEqual(self.db.fetch_company_by_id(2), self.companies[1])
+        self.assertEqual(self.db.fetch_person_by_id(4), self.person(4))
+        with self.assertRaises(CompanyNotFound):
+            self.db.fetch_company_by_id(3)
+        with self.assertRaises(PersonNotFound):
+            self.db.fetch_person_by_id(9)
+
+    def test_fetch_people_by_ids_keeps_order(self):
+        self.assertEqual(
+            self.db.fetch_people_by_ids([4, 9, 0, 5, 1]),
+            [self.person(4), self.person(0), self.person(5), self.person(1)],
+        )
+
+    def test_fetch_people_by_company_id_in_load_order(self):
+        self.assertEqual(
+            self.db.fetch_people_by_company_id(1),
+            [self.person(5), self.person(1), self.person(4)],
+        )
+        self.assertEqual(self.db.fetch_people_by_company_id(4), [])
+
+    def test_iter_people_by_company_id(self):
+        self.assertEqual(
+            list(self.db.iter_people_by_company_id(1, after_id=1, limit=1)),
+            [self.person(4)],
+        )
+
+    def test_fetch_person_pair(self):
+        self.assertEqual(
+            self.db.fetch_person_pair(5, 3), (self.person(5), self.person(3))
+        )
+        with self.assertRaises(PersonNotFound):
+            self.db.fetch_person_pair(5, 9)
+
+    def test_join_only_reaches_common_friend_shards(self):
+        join = ParanuaraQuery(self.db).query_join_friends(5, 3)
+
+        self.assertEqual(join.friends_in_common, [self.person(2), self.person(4)])
+        # The pair lives on shards 2 and 0, friends 2 and 4 on shards 2 and 1
+        self.assertEqual(
+            sorted(self.calls),
+            [
+                (0, "fetch_people_by_ids"),
+                (1, "fetch_people_by_ids_where"),
+                (2, "fetch_people_by_ids"),
+                (2, "fetch_people_by_ids_where"),
+            ],
+        )
+
+    def test_company_stats_gathered_once(self):
+        expected = company_stats_from_people(self.people)
+
+        for _ in range(2):
+            self.assertEqual(
+                {
+                    company_id: json_from_company_stats(stats)
+                    for company_id, stats in self.db.fetch_company_stats().items()
+                },
+                {
+                    company_id: json_from_company_stats(stats)
+                    for company_id, stats in expected.items()
+                },
+            )
+        self.assertEqual(
+            sorted(self.calls), [(shard, "fetch_company_stats") for shard in range(3)]
+        )
+
+    def test_misconfigured_shards(self):
+        db = ShardedDB(
+            [ShardClient(address, AUTHKEY) for address in reversed(self.addresses)]
+        )
+        with self.assertRaises(ShardMisconfigured):
+            db.check_shards()
+        db.close()
+
+    def test_scatter_drains_sent_calls_on_error(self):
+        def failing_start(method, *args):
+            raise ConnectionRefusedError()
+
+        self.db.shards[1].start = failing_start
+        with self.assertRaises(ConnectionRefusedError):
+            self.db.scatter({0: ("describe", ()), 1: ("describe", ())})
+
+        # The call sent to shard 0 was answered and its connection reused
+        self.assertEqual(self.db.shards[0].idle.qsize(), 1)
+        self.assertEqual(self.db.shards[0].call("describe"), (0, 3, "v1"))
+
+
+class ShardClientTest(TestCase):
+    def test_reconnects_after_shard_restart(self):
+        companies = [Company(id=1, name="one")]
+        people = [generate_employee(id=1, company_id=1)]
+        processes, addresses = start_local_shards(
+            companies, people, shard_count=1, version="v1", authkey=AUTHKEY
+        )
+        client = ShardClient(addresses[0], AUTHKEY)
+        self.assertEqual(client.call("describe"), (0, 1, "v1"))
+        processes[0].terminate()
+        processes[0].join()
+
+        context = multiprocessing.get_context("spawn")
+        ready = context.Event()
+        process = context.Process(
+            target=restart_shard,
+            args=(companies, people, "v2", addresses[0], ready),
+            daemon=True,
+        )
+        process.start()
+        try:
+            self.assertTrue(ready.wait(60))
+            # The connection pooled before the restart is dropped
+            self.assertEqual(client.call("describe"), (0, 1, "v2"))
+            self.assertEqual(client.idle.qsize(), 1)
+        finally:
+            client.close()
+            process.terminate()
+            process.join()
@@ -0,0 +1,732 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from decimal import Decimal
+from itertools import islice
+from queue import Empty, LifoQueue
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from paranuara.company import Company
+from paranuara.company_stats import CompanyStats
+from paranuara.dataset_diff import PeopleDiff, diff_people
+from paranuara.db import CompanyNotFound, ParanuaraDB, PersonNotFound
+from paranuara.person import (
+    Person,
+    datetime_from_json,
+    fruits_from_foods,
+    json_from_datetime,
+    json_from_decimal,
+    vegetables_from_foods,
+)
+from paranuara.person_filter import JOIN_FRIEND_FILTER, PersonFilter
+
+DEFAULT_BATCH_SIZE = 1000
+
+# People read per query while iterating over a company's employees
+ITER_BATCH_SIZE = 1000
+
+# Seconds a connection waits on another's write lock, long enough for the
+# other workers to wait out the first one's load
+LOCK_TIMEOUT = 600.0
+
+# Friends, tags and favourite foods are kept in their own tables, in list
+# order, so people can be looked up by any of them
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS company (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS person (
+    id INTEGER PRIMARY KEY,
+    mongo_id TEXT NOT NULL,
+    guid TEXT NOT NULL,
+    has_died INTEGER NOT NULL,
+    balance TEXT NOT NULL,
+    picture TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    eye_color TEXT NOT NULL,
+    name TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    company_id INTEGER,
+    email TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    address TEXT NOT NULL,
+    about TEXT NOT NULL,
+    registered TEXT NOT NULL,
+    greeting TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS person_company_id ON person (company_id, id);
+CREATE TABLE IF NOT EXISTS friend (
+    person_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    friend_id INTEGER NOT NULL,
+    PRIMARY KEY (person_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS person_tag (
+    person_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (person_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS person_tag_tag ON person_tag (tag, person_id);
+CREATE TABLE IF NOT EXISTS person_food (
+    person_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    food TEXT NOT NULL,
+    PRIMARY KEY (person_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS person_food_food ON person_food (food, person_id);
+CREATE TABLE IF NOT EXISTS company_stats (
+    company_id INTEGER PRIMARY KEY,
+    headcount INTEGER NOT NULL,
+    dead INTEGER NOT NULL,
+    age_sum INTEGER NOT NULL,
+    balance_cents INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS company_stats_count (
+    company_id INTEGER NOT NULL,
+    breakdown TEXT NOT NULL,
+    key TEXT NOT NULL,
+    employees INTEGER NOT NULL,
+    PRIMARY KEY (company_id, breakdown, key)
+) WITHOUT ROWID;
+"""
+
+# Stored next to the fingerprint, files written with another schema are
+# loaded again
+SCHEMA_VERSION = "2"
+
+# The CompanyStats counters kept in company_stats_count, one row per key
+STATS_BREAKDOWNS = ("ages_by_decade", "eye_colors", "fruits", "vegetables")
+
+PERSON_COLUMNS = (
+    "id",
+    "mongo_id",
+    "guid",
+    "has_died",
+    "balance",
+    "picture",
+    "age",
+    "eye_color",
+    "name",
+    "gender",
+    "company_id",
+    "email",
+    "phone",
+    "address",
+    "about",
+    "registered",
+    "greeting",
+)
+
+SELECT_PEOPLE = "SELECT {} FROM person".format(", ".join(PERSON_COLUMNS))
+
+INSERT_PERSON = "INSERT OR REPLACE INTO person ({}) VALUES ({})".format(
+    ", ".join(PERSON_COLUMNS), ", ".join("?" * len(PERSON_COLUMNS))
+)
+
+# Child tables of person, with the list column each one holds
+PERSON_LISTS = (
+    ("friend", "friend_id", "friends"),
+    ("person_tag", "tag", "tags"),
+    ("person_food", "food", "favourite_food"),
+)
+
+# Binds a list of ids as one parameter, whatever its length
+IN_IDS = "IN (SELECT value FROM json_each(?))"
+
+
+def batches(items: Iterable[Any], batch_size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+        Transactions are begun explicitly, see `transaction`
+    """
+    connection = sqlite3.connect(
+        path, timeout=LOCK_TIMEOUT, isolation_level=None, check_same_thread=False
+    )
+    connection.execute("PRAGMA journal_mode = WAL")
+    # Durable at checkpoints rather than every commit, safe with WAL
+    connection.execute("PRAGMA synchronous = NORMAL")
+    return connection
+
+
+@contextmanager
+def transaction(
+    connection: sqlite3.Connection, immediate: bool = False
+) -> Iterator[sqlite3.Connection]:
+    """
+        With `immediate` the write lock is taken up front, so what is read in
+        the transaction is not changed by another writer before it writes
+    """
+    connection.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def sql_from_filter(person_filter: PersonFilter) -> Tuple[str, List[Any]]:
+    """
+        WHERE conditions on the person table and their parameters
+    """
+    conditions = ["1"]
+    parameters: List[Any] = []
+    for column in ("eye_color", "has_died", "gender"):
+        value = getattr(person_filter, column)
+        if value is not None:
+            conditions.append("{} = ?".format(column))
+            parameters.append(value)
+    if person_filter.min_age is not None:
+        conditions.append("age >= ?")
+        parameters.append(person_filter.min_age)
+    if person_filter.max_age is not None:
+        conditions.append("age <= ?")
+        parameters.append(person_filter.max_age)
+    for tag in person_filter.tags:
+        conditions.append("id IN (SELECT person_id FROM person_tag WHERE tag = ?)")
+        parameters.append(tag)
+    for food in person_filter.favourite_food:
+        conditions.append("id IN (SELECT person_id FROM person_food WHERE food = ?)")
+        parameters.append(food)
+    return " AND ".join(conditions), parameters
+
+
+def person_row(person: Person) -> Tuple[Any, ...]:
+    return (
+        person.id,
+        person.mongo_id,
+        person.guid,
+        person.has_died,
+        json_from_decimal(person.balance),
+        person.picture,
+        person.age,
+        person.eye_color,
+        person.name,
+        person.gender,
+        person.company_id,
+        person.email,
+        person.phone,
+        person.address,
+        person.about,
+        json_from_datetime(person.registered),
+        person.greeting,
+    )
+
+
+def insert_people(connection: sqlite3.Connection, people: List[Person]) -> None:
+    """
+        Replaces the people and their lists when they are already written
+    """
+    connection.executemany(INSERT_PERSON, map(person_row, people))
+    ids = json.dumps([person.id for person in people])
+    for table, column, field in PERSON_LISTS:
+        connection.execute(
+            "DELETE FROM {} WHERE person_id {}".format(table, IN_IDS), (ids,)
+        )
+        connection.executemany(
+            "INSERT INTO {} (person_id, position, {}) VALUES (?, ?, ?)".format(
+                table, column
+            ),
+            (
+                (person.id, position, value)
+                for person in people
+                for position, value in enumerate(getattr(person, field))
+            ),
+        )
+
+
+def delete_people(connection: sqlite3.Connection, person_ids: List[int]) -> None:
+    ids = json.dumps(person_ids)
+    connection.execute("DELETE FROM person WHERE id {}".format(IN_IDS), (ids,))
+    for table, _, _ in PERSON_LISTS:
+        connection.execute(
+            "DELETE FROM {} WHERE person_id {}".format(table, IN_IDS), (ids,)
+        )
+
+
+def replace_companies(connection: sqlite3.Connection, companies: List[Company]) -> None:
+    connection.execute("DELETE FROM company")
+    connection.executemany(
+        "INSERT INTO company (id, name) VALUES (?, ?)",
+        ((company.id, company.name) for company in companies),
+    )
+
+
+def write_fingerprint(connection: sqlite3.Connection, fingerprint: str) -> None:
+    connection.execute(
+        "INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)",
+        (fingerprint,),
+    )
+
+
+def write_company_stats(
+    connection: sqlite3.Connection,
+    company_ids: List[int],
+    stats: Dict[int, CompanyStats],
+) -> None:
+    """
+        Replaces the stored stats of `company_ids` by theirs in `stats`,
+        companies missing from it no longer have employees
+    """
+    ids = json.dumps(company_ids)
+    for table in ("company_stats", "company_stats_count"):
+        connection.execute(
+            "DELETE FROM {} WHERE company_id {}".format(table, IN_IDS), (ids,)
+        )
+    written = [company_id for company_id in company_ids if company_id in stats]
+    connection.executemany(
+        "INSERT INTO company_stats "
+        "(company_id, headcount, dead, age_sum, balance_cents) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                company_id,
+                stats[company_id].headcount,
+                stats[company_id].dead,
+                stats[company_id].age_sum,
+                stats[company_id].balance_cents,
+            )
+            for company_id in written
+        ),
+    )
+    connection.executemany(
+        "INSERT INTO company_stats_count (company_id, breakdown, key, employees) "
+        "VALUES (?, ?, ?, ?)",
+        (
+            (company_id, breakdown, str(key), employees)
+            for company_id in written
+            for breakdown in STATS_BREAKDOWNS
+            for key, employees in getattr(stats[company_id], breakdown).items()
+        ),
+    )
+
+
+def read_company_stats(connection: sqlite3.Connection) -> Dict[int, CompanyStats]:
+    stats: Dict[int, CompanyStats] = {}
+    for company_id, headcount, dead, age_sum, balance_cents in connection.execute(
+        "SELECT company_id, headcount, dead, age_sum, balance_cents "
+        "FROM company_stats"
+    ):
+        company_stats = stats[company_id] = CompanyStats()
+        company_stats.headcount = headcount
+        company_stats.dead = dead
+        company_stats.age_sum = age_sum
+        company_stats.balance_cents = balance_cents
+    for company_id, breakdown, key, employees in connection.execute(
+        "SELECT company_id, breakdown, key, employees FROM company_stats_count"
+    ):
+        if breakdown == "ages_by_decade":
+            key = int(key)
+        getattr(stats[company_id], breakdown)[key] = employees
+    return stats
+
+
+def load_sqlite(
+    path: str,
+    companies: Iterable[Company],
+    people: Iterable[Person],
+    fingerprint: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> bool:
+    """
+        Write the dataset to the sqlite file at `path` with one `executemany`
+        per `batch_size` people, all in one transaction. Loading is skipped,
+        and False returned, when the dataset `fingerprint` stored by the last
+        load matches.
+
+        The fingerprint is checked once the write lock is held, so when
+        several workers start on the same file one loads it and the others
+        wait for it then skip loading. An interrupted load is rolled back.
+    """
+    connection = connect(path)
+    try:
+        connection.executescript(SCHEMA)
+        with transaction(connection, immediate=True):
+            meta = dict(connection.execute("SELECT key, value FROM meta"))
+            if (
+                meta.get("fingerprint") == fingerprint
+                and meta.get("schema_version") == SCHEMA_VERSION
+            ):
+                return False
+
+            connection.execute("DELETE FROM meta")
+            for table in (
+                "person",
+                "friend",
+                "person_tag",
+                "person_food",
+                "company_stats",
+                "company_stats_count",
+            ):
+                connection.execute("DELETE FROM {}".format(table))
+            replace_companies(connection, list(companies))
+            # Counted as the people stream in, so opening the file only reads
+            # the stats back
+            stats: Dict[int, CompanyStats] = {}
+            for batch in batches(people, batch_size):
+                insert_people(connection, batch)
+                for person in batch:
+                    if person.company_id is not None:
+                        stats.setdefault(person.company_id, CompanyStats()).add(person)
+            write_company_stats(connection, list(stats), stats)
+            connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('schema_version', ?)",
+                (SCHEMA_VERSION,),
+            )
+            write_fingerprint(connection, fingerprint)
+        return True
+    finally:
+        connection.close()
+
+
+def company_stats_from_sqlite(
+    connection: sqlite3.Connection, company_ids: List[int]
+) -> Dict[int, CompanyStats]:
+    """
+        Counts the stats of `company_ids` again with one GROUP BY per
+        breakdown, reading only their employees through the company_id index.
+        Balances are summed as whole cents.
+    """
+    ids = json.dumps(company_ids)
+    stats: Dict[int, CompanyStats] = {}
+    for company_id, headcount, dead, age_sum, balance_cents in connection.execute(
+        "SELECT company_id, COUNT(*), SUM(has_died), SUM(age), "
+        "SUM(CAST(ROUND(CAST(balance AS REAL) * 100) AS INTEGER)) "
+        "FROM person WHERE company_id {} GROUP BY company_id".format(IN_IDS),
+        (ids,),
+    ):
+        company_stats = stats.setdefault(company_id, CompanyStats())
+        company_stats.headcount = headcount
+        company_stats.dead = dead
+        company_stats.age_sum = age_sum
+        company_stats.balance_cents = balance_cents
+
+    for company_id, decade, employees in connection.execute(
+        "SELECT company_id, age - age % 10, COUNT(*) FROM person "
+        "WHERE company_id {} GROUP BY 1, 2".format(IN_IDS),
+        (ids,),
+    ):
+        stats[company_id].ages_by_decade[decade] = employees
+    for company_id, eye_color, employees in connection.execute(
+        "SELECT company_id, eye_color, COUNT(*) FROM person "
+        "WHERE company_id {} GROUP BY 1, 2".format(IN_IDS),
+        (ids,),
+    ):
+        stats[company_id].eye_colors[eye_color] = employees
+    for company_id, food, employees in connection.execute(
+        "SELECT person.company_id, person_food.food, COUNT(*) FROM person_food "
+        "JOIN person ON person.id = person_food.person_id "
+        "WHERE person.company_id {} GROUP BY 1, 2".format(IN_IDS),
+        (ids,),
+    ):
+        if fruits_from_foods([food]):
+            stats[company_id].fruits[food] = employees
+        if vegetables_from_foods([food]):
+            stats[company_id].vegetables[food] = employees
+    return stats
+
+
+class SQLiteDB(ParanuaraDB):
+    """
+        Reads a file written by `load_sqlite`. Only the people a request
+        returns are held in memory.
+
+        Each lookup borrows a connection from a pool, so every thread reads
+        through its own connection, and runs in one read transaction. In WAL
+        mode readers see the last committed dataset while `apply_changes`
+        writes the next one.
+
+        Company stats are counted by `load_sqlite` and kept in the file, which
+        `apply_changes` updates for the companies whose employees changed.
+        They are read back when the db is opened and by
+        `refresh_company_stats`, when another worker sharing the file applied
+        the changes.
+    """
+
+    supports_fetch_common_friend_ids = True
+    supports_fetch_person_pair = True
+    supports_fetch_people_by_ids_where = True
+    supports_iter_people_by_company_id = True
+    supports_iter_people_where = True
+    supports_apply_changes = True
+    supports_fetch_company_stats = True
+    supports_fetch_companies = True
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.idle: "LifoQueue[sqlite3.Connection]" = LifoQueue()
+        with self.read() as connection:
+            self.company_stats = read_company_stats(connection)
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        try:
+            connection = self.idle.get_nowait()
+        except Empty:
+            connection = connect(self.path)
+        try:
+            with transaction(connection):
+                yield connection
+        finally:
+            self.idle.put(connection)
+
+    def stored_fingerprint(self) -> Optional[str]:
+        with self.read() as connection:
+            row = connection.execute(
+                "SELECT value FROM meta WHERE key = 'fingerprint'"
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def record_fingerprint(self, fingerprint: str) -> None:
+        connection = connect(self.path)
+        try:
+            with transaction(connection):
+                write_fingerprint(connection, fingerprint)
+        finally:
+            connection.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except Empty:
+                return
+
+    def fetch_company_by_id(self, company_id: int) -> Company:
+        with self.read() as connection:
+            row = connection.execute(
+                "SELECT id, name FROM company WHERE id = ?", (company_id,)
+            ).fetchone()
+        if row is None:
+            raise CompanyNotFound
+        return Company(*row)
+
+    def fetch_companies(self) -> List[Company]:
+        with self.read() as connection:
+            return [
+                Company(*row)
+                for row in connection.execute(
+                    "SELECT id, name FROM company ORDER BY id"
+                )
+            ]
+
+    def fetch_people_by_company_id(self, company_id: int) -> List[Person]:
+        with self.read() as connection:
+            return self._people(
+                connection, "WHERE company_id = ? ORDER BY id", [company_id]
+            )
+
+    def iter_people_by_company_id(
+        self,
+        company_id: int,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        return self.iter_people_where(PersonFilter(), company_id, after_id, limit)
+
+    def fetch_person_by_id(self, person_id: int) -> Person:
+        people = self.fetch_people_by_ids([person_id])
+        if not people:
+            raise PersonNotFound
+        return people[0]
+
+    def fetch_people_by_ids(self, person_ids: List[int]) -> List[Person]:
+        # Unknown ids are skipped, the same as the mongo `$in` lookup
+        return self.fetch_people_by_ids_where(person_ids, PersonFilter())
+
+    def fetch_person_pair(
+        self, person1_id: int, person2_id: int
+    ) -> Tuple[Person, Person]:
+        people = {
+            person.id: person
+            for person in self.fetch_people_by_ids([person1_id, person2_id])
+        }
+        try:
+            return people[person1_id], people[person2_id]
+        except KeyError:
+            raise PersonNotFound
+
+    def fetch_people_by_ids_where(
+        self, person_ids: List[int], person_filter: PersonFilter
+    ) -> List[Person]:
+        where, parameters = sql_from_filter(person_filter)
+        with self.read() as connection:
+            people = {
+                person.id: person
+                for person in self._people(
+                    connection,
+                    "WHERE id {} AND {}".format(IN_IDS, where),
+                    [json.dumps(person_ids)] + parameters,
+                )
+            }
+        return [people[person_id] for person_id in person_ids if person_id in people]
+
+    def iter_people_where(
+        self,
+        person_filter: PersonFilter,
+        company_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Person]:
+        """
+            Read `ITER_BATCH_SIZE` people per query as the iterator is
+            consumed, each query resuming after the last id read
+        """
+        where, parameters = sql_from_filter(person_filter)
+        if company_id is not None:
+            where += " AND company_id = ?"
+            parameters.append(company_id)
+        while limit is None or limit > 0:
+            batch_size = (
+                ITER_BATCH_SIZE if limit is None else min(limit, ITER_BATCH_SIZE)
+            )
+            with self.read() as connection:
+                people = self._people(
+                    connection,
+                    "WHERE {} AND id > ? ORDER BY id LIMIT ?".format(where),
+                    parameters + [-1 if after_id is None else after_id, batch_size],
+                )
+            yield from people
+            if len(people) < batch_size:
+                return
+            after_id = people[-1].id
+            if limit is not None:
+                limit -= len(people)
+
+    def fetch_common_friend_ids(self, person1_id: int, person2_id: int) -> List[int]:
+        where, parameters = sql_from_filter(JOIN_FRIEND_FILTER)
+        with self.read() as connection:
+            return [
+                row[0]
+                for row in connection.execute(
+                    "SELECT id FROM person WHERE id IN ("
+                    "SELECT friend_id FROM friend WHERE person_id = ? INTERSECT "
+                    "SELECT friend_id FROM friend WHERE person_id = ?"
+                    ") AND {} ORDER BY id".format(where),
+                    [person1_id, person2_id] + parameters,
+                )
+            ]
+
+    def fetch_company_stats(self) -> Dict[int, CompanyStats]:
+        return self.company_stats
+
+    def refresh_company_stats(self) -> None:
+        """
+            Reads the stats again, after another process changed the people
+        """
+        with self.read() as connection:
+            self.company_stats = read_company_stats(connection)
+
+    def apply_changes(
+        self,
+        companies: List[Company],
+        people: Iterable[Person],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Tuple["SQLiteDB", PeopleDiff]:
+        """
+            Writes the differences in place in one transaction, requests
+            running meanwhile read the previous dataset until it commits.
+            Companies are few and all rewritten.
+        """
+        with self.read() as connection:
+            old_ids = [row[0] for row in connection.execute("SELECT id FROM person")]
+        diff = diff_people(old_ids, self.fetch_people_by_ids, people, batch_size)
+        # Companies whose stats change, the new ones of the upserted people
+        # and the old ones read before the people are rewritten
+        changed_company_ids: Set[int] = {
+            person.company_id
+            for person in diff.upserted
+            if person.company_id is not None
+        }
+        connection = connect(self.path)
+        try:
+            with transaction(connection, immediate=True):
+                for batch in batches(
+                    [person.id for person in diff.upserted] + diff.removed_ids,
+                    batch_size,
+                ):
+                    changed_company_ids.update(
+                        row[0]
+                        for row in connection.execute(
+                            "SELECT DISTINCT company_id FROM person "
+                            "WHERE id {} AND company_id IS NOT NULL".format(IN_IDS),
+                            (json.dumps(batch),),
+                        )
+                    )
+                replace_companies(connection, companies)
+                for batch in batches(diff.upserted, batch_size):
+                    insert_people(connection, batch)
+                for batch in batches(diff.removed_ids, batch_size):
+                    delete_people(connection, batch)
+                changed_stats = company_stats_from_sqlite(
+                    connection, list(changed_company_ids)
+                )
+                write_company_stats(
+                    connection, list(changed_company_ids), changed_stats
+                )
+                # Until the caller records the new fingerprint, a restart
+                # loads the file from scratch
+                connection.execute("DELETE FROM meta WHERE key = 'fingerprint'")
+        finally:
+            connection.close()
+        company_stats = {
+            company_id: stats
+            for company_id, stats in self.company_stats.items()
+            if company_id not in changed_company_ids
+        }
+        company_stats.update(changed_stats)
+        self.company_stats = company_stats
+        return self, diff
+
+    def _people(
+        self, connection: sqlite3.Connection, where: str, parameters: List[Any]
+    ) -> List[Person]:
+        rows = connection.execute(
+            "{} {}".format(SELECT_PEOPLE, where), parameters
+        ).fetchall()
+        if not rows:
+            return []
+        ids = json.dumps([row[0] for row in rows])
+        lists: Dict[str, Dict[int, List[Any]]] = {}
+        for table, column, field in PERSON_LISTS:
+            values: Dict[int, List[Any]] = {}
+            for person_id, value in connection.execute(
+                "SELECT person_id, {} FROM {} WHERE person_id {} "
+                "ORDER BY person_id, position".format(column, table, IN_IDS),
+                (ids,),
+            ):
+                values.setdefault(person_id, []).append(value)
+            lists[field] = values
+        return [
+            Person(
+                id=row[0],
+                mongo_id=row[1],
+                guid=row[2],
+                has_died=bool(row[3]),
+                balance=Decimal(row[4]),
+                picture=row[5],
+                age=row[6],
+                eye_color=row[7],
+                name=row[8],
+                gender=row[9],
+                company_id=row[10],
+                email=row[11],
+                phone=row[12],
+                address=row[13],
+                about=row[14],
+                registered=datetime_from_json(row[15]),
+                tags=lists["tags"].get(row[0], []),
+                friends=lists["friends"].get(row[0], []),
+                greeting=row[16],
+                favourite_food=lists["favourite_food"].get(row[0], []),
+            )
+            for row in rows
+        ]
@@ -0,0 +1,220 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from threading import Barrier, Thread
+from unittest import TestCase
+
+from paranuara.company import Company
+from paranuara.company_stats import company_stats_from_people, json_from_company_stats
+from paranuara.db import CompanyNotFound, PersonNotFound
+from paranuara.person_filter import PersonFilter
+from paranuara.query_test import generate_person
+from sqlite_db import SQLiteDB, load_sqlite
+
+
+def generate_people():
+    return [
+        generate_person(id=0, eye_color="brown", friends=[2, 1])._replace(
+            company_id=1,
+            balance=Decimal("1234.56"),
+            registered=datetime(
+                2016, 7, 13, 12, 29, 7, tzinfo=timezone(-timedelta(hours=10))
+            ),
+            tags=["b", "a"],
+            favourite_food=["apple", "celery"],
+        ),
+        generate_person(id=1, eye_color="brown", friends=[0, 2])._replace(
+            company_id=1, tags=[]
+        ),
+        generate_person(id=2, eye_color="brown")._replace(company_id=2, age=40),
+    ]
+
+
+class SQLiteDBTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "paranuara.sqlite")
+        self.companies = [Company(id=1, name="ONE"), Company(id=2, name="TWO")]
+        self.people = generate_people()
+        self.assertTrue(
+            load_sqlite(self.path, self.companies, self.people, "abc", batch_size=2)
+        )
+        self.db = SQLiteDB(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        self.assertEqual(self.db.fetch_person_by_id(0), self.people[0])
+        self.assertEqual(self.db.fetch_company_by_id(2), self.companies[1])
+        self.assertEqual(self.db.fetch_companies(), self.companies)
+        self.assertEqual(
+            self.db.fetch_people_by_ids([2, 9, 0]), [self.people[2], self.people[0]]
+        )
+        with self.assertRaises(PersonNotFound):
+            self.db.fetch_person_by_id(9)
+        with self.assertRaises(CompanyNotFound):
+            self.db.fetch_company_by_id(9)
+        with self.assertRaises(PersonNotFound):
+            self.db.fetch_person_pair(0, 9)
+
+    def test_skips_loaded_fingerprint(self):
+        self.assertFalse(load_sqlite(self.path, [], [], "abc"))
+        self.assertEqual(self.db.fetch_people_by_company_id(1), self.people[:2])
+
+    def test_employees(self):
+        self.assertEqual(self.db.fetch_people_by_company_id(3), [])
+        self.assertEqual(
+            list(self.db.iter_people_by_company_id(1, after_id=0)), [self.people[1]]
+        )
+        self.assertEqual(
+            list(self.db.iter_people_by_company_id(1, limit=1)), [self.people[0]]
+        )
+
+    def test_filters(self):
+        self.assertEqual(
+            list(self.db.iter_people_where(PersonFilter(tags=("a",), max_age=10))),
+            [self.people[0]],
+        )
+        self.assertEqual(
+            self.db.fetch_people_by_ids_where([0, 1, 2], PersonFilter(min_age=40)),
+            [self.people[2]],
+        )
+
+    def test_fetch_common_friend_ids(self):
+        self.assertEqual(self.db.fetch_common_friend_ids(0, 1), [2])
+        self.assertEqual(self.db.fetch_common_friend_ids(0, 2), [])
+
+    def test_apply_changes(self):
+        moved = self.people[1]._replace(company_id=2, friends=[2])
+        added = generate_person(id=5)._replace(company_id=1)
+
+        db, diff = self.db.apply_changes(
+            [self.companies[0]], [self.people[0], moved, added]
+        )
+
+        self.assertEqual(diff.upserted, [moved, added])
+        self.assertEqual(diff.removed_ids, [2])
+        self.assertEqual(db.fetch_people_by_company_id(1), [self.people[0], added])
+        self.assertEqual(db.fetch_person_by_id(1), moved)
+        with self.assertRaises(CompanyNotFound):
+            db.fetch_company_by_id(2)
+        # The fingerprint is cleared until the new one is recorded
+        self.assertTrue(load_sqlite(self.path, self.companies, self.people, "abc"))
+
+    def test_company_stats(self):
+        self.assertEqual(
+            {
+                company_id: json_from_company_stats(stats)
+                for company_id, stats in self.db.fetch_company_stats().items()
+            },
+            {
+                company_id: json_from_company_stats(stats)
+                for company_id, stats in company_stats_from_people(self.people).items()
+            },
+        )
+
+        moved = self.people[1]._replace(company_id=2)
+        self.db.apply_changes(self.companies, [self.people[0], moved, self.people[2]])
+
+        self.assertEqual(self.db.fetch_company_stats()[1].headcount, 1)
+        self.assertEqual(self.db.fetch_company_stats()[2].headcount, 2)
+        # Read from the file, whichever worker wrote the changes
+        db = SQLiteDB(self.path)
+        self.assertEqual(
+            {
+                company_id: json_from_company_stats(stats)
+                for company_id, stats in db.fetch_company_stats().items()
+            },
+            {
+                company_id: json_from_company_stats(stats)
+                for company_id, stats in company_stats_from_people(
+                    [self.people[0], moved, self.people[2]]
+                ).items()
+            },
+        )
+        db.close()
+
+    def test_reloads_older_schema(self):
+        # Files written before the stats were stored are loaded again
+        connection = sqlite3.connect(self.path)
+        with connection:
+            connection.execute("DELETE FROM meta WHERE key = 'schema_version'")
+        connection.close()
+        self.assertTrue(load_sqlite(self.path, self.companies, self.people, "abc"))
+        db = SQLiteDB(self.path)
+        self.assertEqual(db.fetch_company_stats()[1].headcount, 2)
+        db.close()
+
+    def test_changes_applied_by_another_worker(self):
+        self.assertEqual(self.db.stored_fingerprint(), "abc")
+        other = SQLiteDB(self.path)
+        moved = self.people[1]._replace(company_id=2)
+        other.apply_changes(self.companies, [self.people[0], moved, self.people[2]])
+        other.record_fingerprint("def")
+        other.close()
+
+        self.assertEqual(self.db.stored_fingerprint(), "def")
+        self.assertEqual(self.db.fetch_company_stats()[2].headcount, 1)
+        self.db.refresh_company_stats()
+        self.assertEqual(self.db.fetch_company_stats()[2].headcount, 2)
+
+    def test_concurrent_reads(self):
+        errors = []
+
+        def read():
+            try:
+                for _ in range(20):
+                    self.assertEqual(self.db.fetch_person_by_id(0), self.people[0])
+            except Exception as error:
+                errors.append(error)
+
+        threads = [Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+    def test_concurrent_loads(self):
+        path = os.path.join(self.directory, "concurrent.sqlite")
+        people = [generate_person(id=id)._replace(company_id=1) for id in range(200)]
+        start = Barrier(8)
+        loaded = []
+        errors = []
+
+        def load():
+            start.wait()
+            try:
+                loaded.append(
+                    load_sqlite(path, self.companies, people, "abc", batch_size=10)
+                )
+            except Exception as error:
+                errors.append(error)
+
+        threads = [Thread(target=load) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(loaded), [False] * 7 + [True])
+        db = SQLiteDB(path)
+        self.assertEqual(db.fetch_people_by_company_id(1), people)
+        db.close()
+
+    def test_apply_changes_twice(self):
+        # Every worker applies the same changes to the shared file
+        moved = self.people[0]._replace(friends=[1], tags=["c"])
+        self.db.apply_changes(self.companies, [moved] + self.people[1:])
+        db, diff = SQLiteDB(self.path).apply_changes(
+            self.companies, [moved] + self.people[1:]
+        )
+        self.assertEqual(db.fetch_person_by_id(0), moved)
+        db.close()